@@ -0,0 +1,265 @@
+"""Joystick axis conditioning: calibration, trim, deadband, response
+ curves and inversion
+
+Each axis's conditioning is compiled into a lookup table once, so
+ conditioning costs the same per tick whatever the curve. NumPy is used
+ to condition every axis of every joystick in one go when it's
+ installed, plain Python otherwise.
+"""
+
+from array import array
+
+from joysticks import JoystickSnapshot
+
+# Lookup table entries covering axis positions -1 to 1. Odd, so center
+#  has an entry of its own, and fine enough that lookup error stays well
+#  under the smallest axis change worth publishing
+TABLE_SIZE = 4097
+TABLE_HALF = (TABLE_SIZE - 1) / 2
+
+# Response curves, `expo` blends linear and cubic by `AxisProfile.expo`
+CURVES = ('linear', 'expo', 'cubic')
+
+
+def _load_numpy():
+    """Returns the numpy module, or `None` if it isn't installed"""
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return numpy
+
+
+class AxisProfile:
+    """How one joystick axis is conditioned
+
+    In order: `trim` is subtracted, `minimum` and `maximum` (the
+     furthest the axis reaches each way) are stretched to -1 and 1,
+     positions within `deadband` of center become 0 and the rest are
+     rescaled to start from 0, `curve` is applied, then the axis is
+     negated if `invert`.
+    """
+
+    __slots__ = ('deadband', 'curve', 'expo', 'invert', 'trim', 'minimum',
+                 'maximum')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, deadband=0.0, curve='linear', expo=0.0, invert=False,
+                 trim=0.0, minimum=-1.0, maximum=1.0):
+        if curve not in CURVES:
+            raise ValueError("Unknown axis curve: " + str(curve))
+        if not 0.0 <= deadband < 1.0:
+            raise ValueError("Axis deadband must be from 0 up to 1, got: " +
+                             str(deadband))
+        if minimum >= 0.0 or maximum <= 0.0:
+            raise ValueError("Axis calibration must span center, got: "
+                             "{} to {}".format(minimum, maximum))
+
+        self.deadband = deadband
+        self.curve = curve
+        self.expo = expo
+        self.invert = invert
+        self.trim = trim
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def is_identity(self) -> bool:
+        """Does the profile leave axis positions unchanged"""
+        return (self.deadband == 0.0 and self.trim == 0.0 and
+                not self.invert and self.minimum == -1.0 and
+                self.maximum == 1.0 and
+                (self.curve == 'linear' or
+                 (self.curve == 'expo' and self.expo == 0.0)))
+
+    def value(self, position: float) -> float:
+        """Returns conditioned axis value for raw axis `position`"""
+        position -= self.trim
+        if position < 0.0:
+            position /= -self.minimum
+        else:
+            position /= self.maximum
+        position = max(-1.0, min(1.0, position))
+
+        magnitude = abs(position)
+        if magnitude <= self.deadband:
+            return 0.0
+        magnitude = (magnitude - self.deadband) / (1.0 - self.deadband)
+
+        if self.curve == 'cubic':
+            magnitude = magnitude ** 3
+        elif self.curve == 'expo':
+            magnitude = ((1.0 - self.expo) * magnitude +
+                         self.expo * magnitude ** 3)
+
+        if (position < 0.0) != self.invert:
+            return -magnitude
+        return magnitude
+
+    def table(self) -> array:
+        """Returns lookup table of `TABLE_SIZE` conditioned values for
+         positions evenly spaced from -1 to 1"""
+        return array('d', (self.value(index / TABLE_HALF - 1.0)
+                           for index in range(TABLE_SIZE)))
+
+
+class AxisPipeline:
+    """Conditions joystick axes in a `JoystickSnapshot` by the
+     `AxisProfile` of each axis, chosen by joystick GUID
+
+    Joysticks without a profile, and axes with an identity profile,
+     pass through unchanged.
+    """
+
+    def __init__(self, profiles: dict, use_numpy=None):
+        """Initialize axis pipeline
+
+        `profiles`: `AxisProfile` by axis number, by joystick GUID
+        `use_numpy`: Condition axes with NumPy, by default when it's
+         installed
+        """
+        self.profiles = {
+            guid: {axis: profile for axis, profile in axis_profiles.items()
+                   if not profile.is_identity}
+            for guid, axis_profiles in profiles.items()}
+        self._tables = {}
+
+        numpy = _load_numpy() if use_numpy is not False else None
+        if use_numpy and numpy is None:
+            raise ValueError("NumPy isn't installed")
+        self._numpy = numpy
+
+        self._output = JoystickSnapshot()
+        # Joystick layout conditioning is set up for
+        self._layout = None
+
+    def _table(self, profile):
+        """Returns lookup table of `profile`, shared by equal profiles"""
+        key = tuple(getattr(profile, name) for name in AxisProfile.__slots__)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = profile.table()
+        return table
+
+    def _build(self, snapshot, layout):
+        """Set up conditioning for the joysticks in `snapshot`"""
+        self._layout = layout
+        output_axes = []
+        # `(raw axes, conditioned axes, ((axis, table), ...))` of each
+        #  joystick with axes to condition
+        self._sticks = []
+        for stick, raw_axes in enumerate(snapshot.axes):
+            axis_profiles = self.profiles.get(snapshot.guids[stick])
+            axes = [(axis, self._table(profile))
+                    for axis, profile in sorted(axis_profiles.items())
+                    if axis < len(raw_axes)] if axis_profiles else []
+            if axes:
+                output = array('d', raw_axes)
+                self._sticks.append((raw_axes, output, tuple(axes)))
+                output_axes.append(output)
+            else:
+                # Unconditioned axes are passed on as they are
+                output_axes.append(raw_axes)
+        self._output.axes = output_axes
+
+        if self._numpy is not None and self._sticks:
+            self._build_numpy()
+
+    def _build_numpy(self):
+        """Set up buffers to condition every axis in one go"""
+        numpy = self._numpy
+        raw_views = []
+        # `(conditioned axes, start, end)` of each joystick in the buffers
+        self._slices = []
+        rows = []
+        exact = []
+        tables = []
+        for raw_axes, output, axes in self._sticks:
+            raw_views.append(numpy.frombuffer(raw_axes, dtype=numpy.float64))
+            start = len(rows)
+            axis_tables = dict(axes)
+            for axis in range(len(raw_axes)):
+                table = axis_tables.get(axis)
+                # Unconditioned axes are copied over the lookup afterwards
+                exact.append(table is None)
+                if table is None:
+                    rows.append(0)
+                else:
+                    rows.append(len(tables) * TABLE_SIZE)
+                    tables.append(table)
+            self._slices.append((
+                numpy.frombuffer(output, dtype=numpy.float64), start,
+                len(rows)))
+
+        self._raw_views = raw_views
+        self._table_rows = numpy.array(rows, dtype=numpy.intp)
+        self._exact = numpy.array(exact, dtype=bool) if any(exact) else None
+        self._all_tables = numpy.concatenate(
+            [numpy.frombuffer(table, dtype=numpy.float64)
+             for table in tables])
+        self._raw = numpy.empty(len(rows))
+        self._positions = numpy.empty(len(rows))
+        self._indexes = numpy.empty(len(rows), dtype=numpy.intp)
+        self._values = numpy.empty(len(rows))
+
+    def apply(self, snapshot) -> JoystickSnapshot:
+        """Returns `snapshot` with axes conditioned
+
+        The returned snapshot shares everything but conditioned axes
+         with `snapshot`, and is reused by the next call.
+        """
+        layout = tuple(map(id, snapshot.axes)) + tuple(snapshot.guids)
+        if layout != self._layout:
+            self._build(snapshot, layout)
+
+        output = self._output
+        output.timestamp = snapshot.timestamp
+        output.sequence = snapshot.sequence
+        output.buttons = snapshot.buttons
+        output.num_buttons = snapshot.num_buttons
+        output.povs = snapshot.povs
+        output.connected = snapshot.connected
+        output.guids = snapshot.guids
+
+        if not self._sticks:
+            return output
+        if self._numpy is not None:
+            self._apply_numpy()
+            return output
+
+        # Plain Python looks up one axis at a time
+
+        for raw_axes, conditioned, axes in self._sticks:
+            conditioned[:] = raw_axes
+            for axis, table in axes:
+                position = raw_axes[axis]
+                if position <= -1.0:
+                    conditioned[axis] = table[0]
+                elif position >= 1.0:
+                    conditioned[axis] = table[-1]
+                else:
+                    conditioned[axis] = table[
+                        int((position + 1.0) * TABLE_HALF + 0.5)]
+        return output
+
+    def _apply_numpy(self):
+        numpy = self._numpy
+        raw = self._raw
+        positions = self._positions
+        indexes = self._indexes
+        values = self._values
+
+        numpy.concatenate(self._raw_views, out=raw)
+        numpy.clip(raw, -1.0, 1.0, out=positions)
+        # Same rounding as the plain Python lookup
+        positions *= TABLE_HALF
+        positions += TABLE_HALF + 0.5
+        numpy.floor(positions, out=positions)
+        numpy.copyto(indexes, positions, casting='unsafe')
+        indexes += self._table_rows
+        numpy.take(self._all_tables, indexes, out=values)
+        if self._exact is not None:
+            numpy.copyto(values, raw, where=self._exact)
+
+        for conditioned, start, end in self._slices:
+            conditioned[:] = values[start:end]
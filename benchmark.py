@@ -0,0 +1,466 @@
+"""Benchmark for the driver station update path
+
+Runs `ControlLoop.tick` (joystick poll and publish) headless against fake
+pygame joysticks and a NetworkTables stand-in that counts writes, and
+prints results as JSON so runs from different commits can be compared.
+
+With `--loopback`, runs the control loop in real time against the
+`loopback` NetworkTables stand-in instead, measuring how long joystick
+values take to reach the robot side, entries sent per second and CPU
+time per tick, for each stick count, publish mode and tick rate.
+
+Usage: `python benchmark.py [--loopback] [--output results.json]
+ [--compare old.json]`
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from control_loop import ControlLoop
+from joysticks import Joysticks
+from loopback import DEFAULT_UPDATE_RATE, LoopbackNetworkTables, \
+    LoopbackServer, ProbeSubscriber
+from network import Network
+
+# (axes, buttons, hats) of each kind of benchmarked joystick
+LAYOUTS = {
+    'flight_stick': (4, 12, 1),
+    'gamepad': (6, 10, 1),
+    'wheel': (8, 24, 0)
+}
+STICK_COUNTS = (1, 2, 4, 8)
+PUBLISH_MODES = ('channels', 'packed')
+TICK_RATES = (50, 100, 200)
+
+# Virtual time between ticks, in seconds
+TICK_PERIOD = 0.01
+
+# CPU time of the calling thread, Python 3.6 only has wall time
+THREAD_TIME = getattr(time, 'thread_time', time.perf_counter)
+
+
+class FakeJoystick:
+    """Stand-in for `pygame.joystick.Joystick`
+
+    Each tick `move` changes a random `activity` fraction of
+     the joystick's channels, from a fixed seed.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, instance_id, num_axes, num_buttons, num_hats,
+                 activity, seed):
+        self.instance_id = instance_id
+        self.axes = [0.0] * num_axes
+        self.buttons = [0] * num_buttons
+        self.hats = [(0, 0)] * num_hats
+        self.activity = activity
+        self._random = random.Random(seed)
+
+    def move(self):
+        """Move some of the joystick's axes and buttons"""
+        rand = self._random
+        for axis in range(len(self.axes)):
+            if rand.random() < self.activity:
+                self.axes[axis] = round(rand.uniform(-1.0, 1.0), 3)
+        for button in range(len(self.buttons)):
+            if rand.random() < self.activity:
+                self.buttons[button] ^= 1
+
+    # pylint: disable=missing-docstring
+    def init(self):
+        pass
+
+    def quit(self):
+        pass
+
+    def get_instance_id(self):
+        return self.instance_id
+
+    def get_guid(self):
+        return "fake-{}-{}".format(len(self.axes), len(self.buttons))
+
+    def get_numaxes(self):
+        return len(self.axes)
+
+    def get_axis(self, axis):
+        return self.axes[axis]
+
+    def get_numbuttons(self):
+        return len(self.buttons)
+
+    def get_button(self, button):
+        return self.buttons[button]
+
+    def get_numhats(self):
+        return len(self.hats)
+
+    def get_hat(self, hat):
+        return self.hats[hat]
+
+
+class FakePygame:  # (Too few public methods) pylint: disable=R0903
+    """Stand-in for the parts of `pygame` used by `Joysticks`"""
+
+    JOYAXISMOTION, JOYBUTTONDOWN, JOYBUTTONUP, JOYHATMOTION, \
+        JOYDEVICEADDED, JOYDEVICEREMOVED, NOEVENT = range(7)
+
+    def __init__(self, fake_joysticks):
+        fakes = list(fake_joysticks)
+
+        class _Joystick:  # pylint: disable=too-few-public-methods
+            get_count = staticmethod(lambda: len(fakes))
+            Joystick = staticmethod(fakes.__getitem__)
+
+        class _Event:  # pylint: disable=too-few-public-methods
+            get = staticmethod(list)
+
+        self.joystick = _Joystick
+        self.event = _Event
+
+    # pylint: disable=missing-docstring
+    def init(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+class CountingTable:
+    """Stand-in for a NetworkTables table that counts writes"""
+
+    def __init__(self):
+        self.puts = 0
+
+    # pylint: disable=invalid-name,unused-argument,missing-docstring
+    def putNumber(self, key, value):
+        self.puts += 1
+
+    def putBoolean(self, key, value):
+        self.puts += 1
+
+    def putString(self, key, value):
+        self.puts += 1
+
+    def putNumberArray(self, key, value):
+        self.puts += 1
+
+
+class CountingNetworkTables:
+    """Stand-in for `NetworkTables` handing out a `CountingTable`"""
+
+    def __init__(self):
+        self.table = CountingTable()
+
+    # pylint: disable=invalid-name,unused-argument,missing-docstring
+    def initialize(self, server=None):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def getTable(self, name):
+        return self.table
+
+    def isConnected(self):
+        return True
+
+
+class VirtualClock:  # (Too few public methods) pylint: disable=R0903
+    """Clock advanced by hand, so keyframes happen on the same
+     ticks in every run"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def run_case(num_sticks, layout, publish_mode, ticks=2000, activity=0.1,
+             seed=0):
+    """Benchmark `ticks` control loop ticks, returns dict of results"""
+    num_axes, num_buttons, num_hats = LAYOUTS[layout]
+    fakes = [FakeJoystick(stick, num_axes, num_buttons, num_hats, activity,
+                          seed + stick)
+             for stick in range(num_sticks)]
+
+    clock = VirtualClock()
+    networktables = CountingNetworkTables()
+    joysticks = Joysticks(FakePygame(fakes), clock=clock)
+    network = Network(networktables, 'driver_station', None,
+                      axis_threshold=0.01, clock=clock,
+                      publish_mode=publish_mode)
+    loop = ControlLoop(joysticks, network, clock=clock)
+
+    def advance():
+        clock.now += TICK_PERIOD
+        for fake in fakes:
+            fake.move()
+
+    def run(num_ticks):
+        for _ in range(num_ticks):
+            advance()
+            loop.tick()
+
+    # Warm up, so channels and buffers are built
+    run(10)
+
+    puts_before = networktables.table.puts
+    start = time.perf_counter()
+    run(ticks)
+    elapsed = time.perf_counter() - start
+    puts = networktables.table.puts - puts_before
+
+    tracemalloc.start()
+
+    # Memory still held after the run, i.e. leaks and growing caches
+    before = tracemalloc.take_snapshot()
+    run(ticks)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    retained_blocks = sum(stat.count_diff
+                          for stat in after.compare_to(before, 'filename'))
+
+    # Memory allocated by each tick, including what's freed again before
+    #  the tick ends. Clearing traces zeroes the traced and peak memory,
+    #  so the peak after a tick is the most memory the tick's own
+    #  allocations held at once, a lower bound on what it allocated
+    alloc_bytes = 0
+    max_alloc_bytes = 0
+    for _ in range(ticks):
+        advance()
+        tracemalloc.clear_traces()
+        loop.tick()
+        _, tick_peak = tracemalloc.get_traced_memory()
+        alloc_bytes += tick_peak
+        max_alloc_bytes = max(max_alloc_bytes, tick_peak)
+    tracemalloc.stop()
+
+    return {
+        'sticks': num_sticks,
+        'layout': layout,
+        'publish_mode': publish_mode,
+        'ticks': ticks,
+        'ticks_per_sec': round(ticks / elapsed, 1),
+        'us_per_tick': round(elapsed / ticks * 1e6, 2),
+        'puts_per_tick': round(puts / ticks, 3),
+        'alloc_bytes_per_tick': round(alloc_bytes / ticks, 1),
+        'max_alloc_bytes_per_tick': max_alloc_bytes,
+        'retained_blocks_per_tick': round(retained_blocks / ticks, 4),
+        'peak_traced_bytes': peak
+    }
+
+
+def run_sweep(ticks=2000, activity=0.1):
+    """Benchmark every combination of stick count, layout and
+     publish mode, returns dict of metadata and results"""
+    results = [run_case(num_sticks, layout, publish_mode, ticks, activity)
+               for num_sticks in STICK_COUNTS
+               for layout in LAYOUTS
+               for publish_mode in PUBLISH_MODES]
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'activity': activity,
+        'results': results
+    }
+
+
+def _percentile(values, percent: float) -> float:
+    """Returns value below which `percent` percent of `values` fall"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def run_loopback_case(num_sticks, publish_mode, rate, duration=1.0,
+                      layout='gamepad', activity=0.1,
+                      update_rate=DEFAULT_UPDATE_RATE, latency=0.0, seed=0):
+    """Run the control loop at `rate` for `duration` seconds against a
+     `loopback.LoopbackServer`, returns dict of results
+
+    Axis 0 of joystick 0 gets a new value every tick, timed from being
+     set until it or a later value arrives at the server. Values
+     replaced before the next send never arrive themselves,
+     `delivered` is the fraction that did.
+
+    `cpu_us_per_tick` is the control loop thread's CPU time inside
+     `ControlLoop.tick` only, moving the fake joysticks isn't counted.
+    """
+    num_axes, num_buttons, num_hats = LAYOUTS[layout]
+    fakes = [FakeJoystick(stick, num_axes, num_buttons, num_hats, activity,
+                          seed + stick)
+             for stick in range(num_sticks)]
+
+    server = LoopbackServer()
+    networktables = LoopbackNetworkTables(server, update_rate, latency)
+    network = Network(networktables, 'driver_station', 'loopback',
+                      axis_threshold=0.01, publish_mode=publish_mode)
+    if publish_mode == 'packed':
+        probe = ProbeSubscriber(server, "/joystick-0/axes", 0)
+    else:
+        probe = ProbeSubscriber(server, "/joystick-0/axis-0")
+    loop = ControlLoop(Joysticks(FakePygame(fakes)), network, rate=rate)
+
+    ticks = 0
+    cpu_time = 0.0
+    tick = loop.tick
+
+    def probed_tick(lateness=0.0):
+        nonlocal ticks, cpu_time
+        for fake in fakes:
+            fake.move()
+        # Unique over 99 ticks, and always moved past the threshold
+        value = (ticks % 99 - 49) / 50.0
+        fakes[0].axes[0] = value
+        probe.expect(value, time.perf_counter())
+        start = THREAD_TIME()
+        tick(lateness)
+        cpu_time += THREAD_TIME() - start
+        ticks += 1
+
+    loop.tick = probed_tick
+    writes_before = networktables.writes
+    entries_before = server.entries_received
+    loop.start()
+    time.sleep(duration)
+    loop.stop()
+    # Let the last values arrive
+    network.shutdown()
+
+    latencies = probe.latencies
+    return {
+        'sticks': num_sticks,
+        'layout': layout,
+        'publish_mode': publish_mode,
+        'rate': rate,
+        'update_rate': update_rate,
+        'one_way_latency': latency,
+        'ticks': ticks,
+        'missed_ticks': loop.missed_ticks,
+        'cpu_us_per_tick': round(cpu_time / max(ticks, 1) * 1e6, 2),
+        'writes_per_sec': round(
+            (networktables.writes - writes_before) / duration, 1),
+        'entries_per_sec': round(
+            (server.entries_received - entries_before) / duration, 1),
+        'latency_ms': {
+            'p50': round(_percentile(latencies, 50) * 1e3, 3),
+            'p99': round(_percentile(latencies, 99) * 1e3, 3),
+            'max': round(max(latencies, default=0.0) * 1e3, 3)
+        },
+        'delivered': round(probe.delivered_count /
+                           max(probe.expected_count, 1), 3)
+    }
+
+
+def run_loopback_sweep(duration=1.0, update_rate=DEFAULT_UPDATE_RATE,
+                       latency=0.0):
+    """Run the loopback benchmark for every combination of stick
+     count, publish mode and tick rate, returns dict of metadata and
+     results"""
+    results = [run_loopback_case(num_sticks, publish_mode, rate, duration,
+                                 update_rate=update_rate, latency=latency)
+               for num_sticks in STICK_COUNTS
+               for publish_mode in PUBLISH_MODES
+               for rate in TICK_RATES]
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'loopback': True,
+        'results': results
+    }
+
+
+def compare(old, new):
+    """Returns lines describing the change of each case's
+     speed and puts, or CPU time and latency for loopback runs,
+     from `old` sweep to `new` sweep"""
+    def case_key(result):
+        return (result['sticks'], result['layout'], result['publish_mode'],
+                result.get('rate'))
+
+    old_results = {case_key(result): result for result in old['results']}
+    lines = []
+    for result in new['results']:
+        old_result = old_results.get(case_key(result))
+        if old_result is None:
+            continue
+        if 'rate' in result:
+            lines.append(
+                "{} sticks, {}, {} Hz: {:+.1f}% CPU us/tick, "
+                "{:+.3f} ms p50 latency".format(
+                    result['sticks'], result['publish_mode'], result['rate'],
+                    (result['cpu_us_per_tick'] /
+                     old_result['cpu_us_per_tick'] - 1) * 100,
+                    result['latency_ms']['p50'] -
+                    old_result['latency_ms']['p50']))
+            continue
+        line = "{} sticks, {}, {}: {:+.1f}% us/tick, {:+.3f} puts/tick".format(
+            result['sticks'], result['layout'], result['publish_mode'],
+            (result['us_per_tick'] / old_result['us_per_tick'] - 1) * 100,
+            result['puts_per_tick'] - old_result['puts_per_tick'])
+        # Runs from before allocations were measured don't have them
+        if 'alloc_bytes_per_tick' in result and \
+                'alloc_bytes_per_tick' in old_result:
+            line += ", {:+.1f} alloc bytes/tick".format(
+                result['alloc_bytes_per_tick'] -
+                old_result['alloc_bytes_per_tick'])
+        lines.append(line)
+    return lines
+
+
+def main(argv=None):
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=2000,
+                        help="ticks per benchmark case")
+    parser.add_argument('--activity', type=float, default=0.1,
+                        help="fraction of channels moved each tick")
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', metavar='OLD_JSON',
+                        help="compare results against an earlier run")
+    parser.add_argument('--loopback', action='store_true',
+                        help="run in real time against a NetworkTables "
+                        "stand-in, measuring end to end latency")
+    parser.add_argument('--duration', type=float, default=1.0,
+                        help="with --loopback, seconds per case")
+    parser.add_argument('--update-rate', type=float,
+                        default=DEFAULT_UPDATE_RATE,
+                        help="with --loopback, seconds between "
+                        "NetworkTables sends")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="with --loopback, one way network latency "
+                        "in seconds")
+    args = parser.parse_args(argv)
+
+    if args.loopback:
+        sweep = run_loopback_sweep(args.duration, args.update_rate,
+                                   args.latency)
+    else:
+        sweep = run_sweep(args.ticks, args.activity)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(sweep, output_file, indent=2)
+    else:
+        json.dump(sweep, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as old_file:
+            for line in compare(json.load(old_file), sweep):
+                print(line, file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Fixed-rate control loop for driver station"""
+
+import collections
+import threading
+import time
+
+# Range of supported control loop rates, in Hz
+MIN_RATE = 50
+MAX_RATE = 200
+
+
+def next_deadline(deadline: float, now: float, period: float):
+    """Returns `(deadline, missed)`, the deadline of the tick after
+     one due at `deadline`, and how many ticks were skipped because
+     `now` is already past them
+
+    Deadlines advance by whole periods from the previous deadline
+     rather than from `now`, so scheduling error doesn't accumulate.
+    """
+    deadline += period
+    missed = 0
+    if now > deadline:
+        missed = int((now - deadline) / period) + 1
+        deadline += missed * period
+    return deadline, missed
+
+
+class DisplayState:  # (Too few public methods) pylint: disable=R0903
+    """State handed from the control loop to the GUI"""
+
+    __slots__ = ('connected', 'sequence', 'timestamp', 'num_joysticks',
+                 'links', 'connected_joysticks')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, connected, sequence, timestamp, num_joysticks,
+                 links=None, connected_joysticks=0):
+        self.connected = connected
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.num_joysticks = num_joysticks
+        self.connected_joysticks = connected_joysticks
+        # `link_monitor.LinkState` by robot name, `None` for one robot
+        self.links = links if links is not None else {}
+
+
+class ControlLoop:
+    """Polls joysticks and publishes them over the network at a fixed
+     rate, on a thread of its own so GUI work can't delay it
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, joysticks, network, rate=100, clock=time.monotonic,
+                 stats=None, recorder=None, link_monitors=None,
+                 shared_state=None):
+        """Initialize control loop
+
+        `joysticks`: `Joysticks` to poll
+        `network`: `Network` to publish joysticks to
+        `rate` - `float`: Ticks per second, between `MIN_RATE`
+         and `MAX_RATE`
+        `clock`: Monotonic time source, in seconds
+        `stats`: `instrumentation.LoopStats` to record tick timings in,
+         or `None` to skip timing
+        `recorder`: `recording.Recorder` to record each published
+         snapshot with, or `None`
+        `link_monitors`: `link_monitor.LinkMonitor` by robot name, as
+         returned by `link_monitor.monitor_network`, to send heartbeats
+         with each tick. Joysticks are published less often while the
+         link is degraded.
+        `shared_state`: `shared_state.SharedJoystickState` to write each
+         published snapshot to for other local processes, or `None`
+        """
+        if not MIN_RATE <= rate <= MAX_RATE:
+            raise ValueError("Control loop rate must be between {} and {} Hz,"
+                             " got: {}".format(MIN_RATE, MAX_RATE, rate))
+
+        self.joysticks = joysticks
+        self.network = network
+        self.period = 1.0 / rate
+        self._clock = clock
+        self.stats = stats
+        self.recorder = recorder
+        self.shared_state = shared_state
+        self.link_monitors = link_monitors if link_monitors else {}
+        # Throttles publishing when driving one robot, a `RobotFleet`
+        #  throttles each robot itself
+        self._link_monitor = self.link_monitors.get(None)
+        self._link_states = {name: monitor.state for name, monitor
+                              in self.link_monitors.items()}
+
+        # Ticks skipped because a tick overran its deadline
+        self.missed_ticks = 0
+        # When the latest tick finished, by `clock`
+        self.last_tick_time = None
+
+        # Latest display state, appending and reading a full-length
+        #  deque are atomic so the GUI can read it without locking
+        self._display_state = collections.deque(maxlen=1)
+
+        # Copy of a recent snapshot for display, only made when asked
+        #  for so ticks don't copy snapshots nobody looks at
+        self._snapshot_wanted = False
+        self._display_snapshot = collections.deque(maxlen=1)
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start running the control loop on its own thread"""
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name="ControlLoop", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the control loop and wait for its thread to finish"""
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        """Is the control loop thread running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest_display_state(self):
+        """Returns the most recent `DisplayState`, or `None`
+         if the loop hasn't ticked yet
+        """
+        try:
+            return self._display_state[-1]
+        except IndexError:
+            return None
+
+    def tick(self, lateness=0.0):
+        """Poll joysticks once and publish them
+
+        `lateness` - `float`: Seconds this tick started after its deadline
+        """
+        stats = self.stats
+        if stats is not None:
+            start = time.perf_counter()
+            puts = self.network.write_stats.published
+
+        self.joysticks.update()
+        snapshot = self.joysticks.snapshot()
+
+        if stats is not None:
+            polled = time.perf_counter()
+
+        if self._link_monitor is None or self._link_monitor.should_publish():
+            self.network.publish_snapshot(snapshot)
+        if self.recorder is not None:
+            self.recorder.record_snapshot(snapshot)
+        if self.shared_state is not None:
+            self.shared_state.write(snapshot)
+
+        if stats is not None:
+            stats.record_tick(lateness, polled - start,
+                              time.perf_counter() - polled,
+                              self.network.write_stats.published - puts)
+
+        if self.link_monitors:
+            self._tick_link_monitors()
+
+        if self._snapshot_wanted:
+            self._snapshot_wanted = False
+            self._display_snapshot.append(snapshot.copy())
+
+        self.last_tick_time = self._clock()
+        self._display_state.append(DisplayState(
+            self.network.connected(), snapshot.sequence, snapshot.timestamp,
+            len(snapshot.axes), self._link_states,
+            snapshot.connected.count(True)))
+
+    def _tick_link_monitors(self):
+        now = self._clock()
+        changed = False
+        for monitor in self.link_monitors.values():
+            changed |= monitor.tick(now)
+        if changed:
+            # A new dict, the GUI may be reading the old one
+            self._link_states = {name: monitor.state for name, monitor
+                                 in self.link_monitors.items()}
+
+    def _run(self):
+        deadline = self._clock()
+        while not self._stop_event.is_set():
+            self.tick(self._clock() - deadline)
+
+            now = self._clock()
+            deadline, missed = next_deadline(deadline, now, self.period)
+            self.missed_ticks += missed
+
+            if self.joysticks.event_driven:
+                self.wait_for_input(deadline)
+            else:
+                self._stop_event.wait(deadline - now)
+
+    def request_snapshot(self):
+        """Ask for a copy of the next tick's snapshot, returned by
+         `latest_snapshot` once it's made"""
+        self._snapshot_wanted = True
+
+    def latest_snapshot(self):
+        """Returns copy of the latest snapshot asked for with
+         `request_snapshot`, or `None`
+
+        The copy isn't changed by later ticks, it can be read from any
+         thread without locking.
+        """
+        try:
+            return self._display_snapshot[-1]
+        except IndexError:
+            return None
+
+    def wait_for_input(self, deadline: float):
+        """Publish joystick changes as their events arrive, until `deadline`
+
+        Events that arrive together are published together, once
+         per changed joystick.
+        """
+        remaining = deadline - self._clock()
+        while remaining > 0 and not self._stop_event.is_set():
+            changed = self.joysticks.wait_for_events(remaining)
+            if changed:
+                snapshot = self.joysticks.snapshot()
+                # Changes skipped on a degraded link go with the next
+                #  tick that publishes
+                if (self._link_monitor is None or
+                        not self._link_monitor.degraded):
+                    self.network.publish_snapshot(snapshot, changed)
+                if self.recorder is not None:
+                    self.recorder.record_snapshot(snapshot)
+                if self.shared_state is not None:
+                    self.shared_state.write(snapshot)
+            remaining = deadline - self._clock()
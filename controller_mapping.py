@@ -0,0 +1,269 @@
+"""Controller mappings: each model of controller's axes, buttons and
+ POVs rearranged into one layout, so robot code sees the same numbers
+ whatever controller is plugged in
+
+Mappings are kept in a JSON file by joystick GUID (its name with
+ pygame 1), each listing the raw index behind every mapped axis, button
+ and POV, `null` for ones the controller doesn't have:
+
+    {"030000005e0400008e02000014010000": {
+        "name": "Xbox 360 Controller",
+        "axes": [0, 1, 2, 3, 4, 5],
+        "buttons": [0, 1, 2, 3, 4, 5, 6, 7, 9, 10],
+        "povs": [0]}}
+
+Kinds left out are passed through unchanged. The file is only read
+ once a joystick is plugged in, and read again if it changed when a
+ joystick without a mapping is plugged in.
+
+Mappings are compiled into index tables when a joystick is plugged in,
+ so each snapshot is remapped with one gather per joystick and kind.
+"""
+
+import json
+import operator
+import os
+from array import array
+
+from joysticks import JoystickSnapshot
+
+KINDS = ('axes', 'buttons', 'povs')
+
+
+def _gather(indexes):
+    """Returns function taking a sequence to a tuple of its items at
+     `indexes`"""
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda values: (values[index],)
+    if not indexes:
+        return lambda values: ()
+    return operator.itemgetter(*indexes)
+
+
+class ControllerMapping:  # (Too few public methods) pylint: disable=R0903
+    """Raw index behind each mapped axis, button and POV of one model
+     of controller
+
+    `axes`, `buttons` and `povs` are lists of raw indexes, with `None`
+     for a mapped input the controller doesn't have, or `None` to pass
+     that kind through unchanged.
+    """
+
+    __slots__ = ('name',) + KINDS
+
+    def __init__(self, name='', axes=None, buttons=None, povs=None):
+        for kind, indexes in zip(KINDS, (axes, buttons, povs)):
+            if indexes is not None and any(
+                    index is not None and (not isinstance(index, int) or
+                                           index < 0)
+                    for index in indexes):
+                raise ValueError("Mapping {} has a bad {} index: {}".format(
+                    name, kind, indexes))
+        if buttons is not None and len(buttons) > 64:
+            raise ValueError("Mapping {} has more than 64 buttons".format(
+                name))
+
+        self.name = name
+        self.axes = axes
+        self.buttons = buttons
+        self.povs = povs
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Returns mapping read from JSON object `data`"""
+        return cls(data.get('name', ''), data.get('axes'),
+                   data.get('buttons'), data.get('povs'))
+
+    def to_dict(self) -> dict:
+        """Returns mapping as a JSON object"""
+        data = {'name': self.name}
+        for kind in KINDS:
+            if getattr(self, kind) is not None:
+                data[kind] = getattr(self, kind)
+        return data
+
+
+class MappingStore:
+    """Controller mappings by GUID, kept in JSON file `file_name`"""
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self._mappings = None
+        self._mtime = None
+
+    def _mtime_now(self):
+        try:
+            return os.stat(self.file_name).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """Read the mappings file, if any"""
+        self._mtime = self._mtime_now()
+        self._mappings = {}
+        if self._mtime is None:
+            return
+        with open(self.file_name) as mappings_file:
+            data = json.load(mappings_file)
+        self._mappings = {guid: ControllerMapping.from_dict(mapping)
+                          for guid, mapping in data.items()}
+
+    def get(self, guid: str):
+        """Returns `ControllerMapping` of joysticks with `guid`, or `None`
+
+        The file is read on first use, and again if it changed since
+         when `guid` has no mapping.
+        """
+        if self._mappings is None or (guid not in self._mappings and
+                                      self._mtime_now() != self._mtime):
+            self._load()
+        return self._mappings.get(guid)
+
+    def put(self, guid: str, mapping: ControllerMapping):
+        """Set the mapping of joysticks with `guid` and save the file"""
+        if self._mappings is None:
+            self._load()
+        self._mappings[guid] = mapping
+        with open(self.file_name, 'w') as mappings_file:
+            json.dump({guid: mapping.to_dict() for guid, mapping
+                       in sorted(self._mappings.items())},
+                      mappings_file, indent=4)
+        self._mtime = self._mtime_now()
+
+
+class _CompiledMapping:  # (Too few public methods) pylint: disable=R0903
+    """A `ControllerMapping` compiled for a joystick with a given
+     number of raw axes, buttons and POVs"""
+
+    __slots__ = ('axes', 'povs', 'button_tables', 'num_buttons')
+
+    def __init__(self, mapping, num_axes, num_buttons, num_povs):
+        # Raw values are copied into a buffer one longer than the raw
+        #  values, so inputs the controller doesn't have read its end
+        self.axes = None
+        if mapping.axes is not None:
+            self.axes = _gather([
+                num_axes if index is None or index >= num_axes else index
+                for index in mapping.axes])
+
+        self.povs = None
+        if mapping.povs is not None:
+            self.povs = _gather([
+                num_povs if index is None or index >= num_povs else index
+                for index in mapping.povs])
+
+        # Mapped bits of each byte value, for each raw byte of buttons
+        self.button_tables = None
+        self.num_buttons = num_buttons
+        if mapping.buttons is not None:
+            self.num_buttons = len(mapping.buttons)
+            self.button_tables = []
+            for raw_byte in range((num_buttons + 7) // 8):
+                bits = [(1 << mapped, index - raw_byte * 8)
+                        for mapped, index in enumerate(mapping.buttons)
+                        if index is not None and index < num_buttons and
+                        index // 8 == raw_byte]
+                self.button_tables.append(tuple(
+                    sum(mapped_bit for mapped_bit, raw_bit in bits
+                        if value >> raw_bit & 1)
+                    for value in range(256)))
+
+
+class ControllerMapper:
+    """Remaps joysticks in a `JoystickSnapshot` by the
+     `ControllerMapping` of each joystick's GUID in a `MappingStore`
+
+    Joysticks without a mapping pass through unchanged.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        # `(ControllerMapping, _CompiledMapping)` by GUID and raw layout
+        self._compiled = {}
+
+        self._output = JoystickSnapshot()
+        # Joystick layout mapping is set up for
+        self._layout = None
+        self._sticks = ()
+
+    def _compile(self, guid, num_axes, num_buttons, num_povs):
+        """Returns `_CompiledMapping` for a joystick, or `None`"""
+        mapping = self.store.get(guid)
+        if mapping is None:
+            return None
+        key = (guid, num_axes, num_buttons, num_povs)
+        cached = self._compiled.get(key)
+        if cached is None or cached[0] is not mapping:
+            cached = self._compiled[key] = (
+                mapping,
+                _CompiledMapping(mapping, num_axes, num_buttons, num_povs))
+        return cached[1]
+
+    def _build(self, snapshot, layout):
+        """Set up mapping for the joysticks in `snapshot`"""
+        self._layout = layout
+        output = self._output
+        output.axes = list(snapshot.axes)
+        output.povs = list(snapshot.povs)
+        output.num_buttons = list(snapshot.num_buttons)
+        output.buttons = list(snapshot.buttons)
+        # `(stick, compiled mapping, raw axes buffer, raw POVs buffer)`
+        #  of each joystick with a mapping
+        sticks = []
+        for stick, guid in enumerate(snapshot.guids):
+            compiled = self._compile(guid, len(snapshot.axes[stick]),
+                                     snapshot.num_buttons[stick],
+                                     len(snapshot.povs[stick]))
+            if compiled is None:
+                continue
+            axes = povs = None
+            if compiled.axes is not None:
+                axes = array('d', bytes(8 * (len(snapshot.axes[stick]) + 1)))
+                output.axes[stick] = array('d', compiled.axes(axes))
+            if compiled.povs is not None:
+                povs = array('h', [-1] * (len(snapshot.povs[stick]) + 1))
+                output.povs[stick] = array('h', compiled.povs(povs))
+            output.num_buttons[stick] = compiled.num_buttons
+            sticks.append((stick, compiled, axes, povs))
+        self._sticks = tuple(sticks)
+
+    def apply(self, snapshot) -> JoystickSnapshot:
+        """Returns `snapshot` with joysticks remapped
+
+        The returned snapshot shares everything but mapped joysticks
+         with `snapshot`, and is reused by the next call.
+        """
+        layout = (tuple(map(id, snapshot.axes)) +
+                  tuple(map(id, snapshot.povs)) + tuple(snapshot.guids) +
+                  tuple(snapshot.num_buttons))
+        if layout != self._layout:
+            self._build(snapshot, layout)
+
+        output = self._output
+        output.timestamp = snapshot.timestamp
+        output.sequence = snapshot.sequence
+        output.connected = snapshot.connected
+        output.guids = snapshot.guids
+        if not self._sticks:
+            output.buttons = snapshot.buttons
+            return output
+
+        output.buttons[:] = snapshot.buttons
+        for stick, compiled, axes, povs in self._sticks:
+            if axes is not None:
+                raw_axes = snapshot.axes[stick]
+                axes[:len(raw_axes)] = raw_axes
+                output.axes[stick][:] = array('d', compiled.axes(axes))
+            if povs is not None:
+                raw_povs = snapshot.povs[stick]
+                povs[:len(raw_povs)] = raw_povs
+                output.povs[stick][:] = array('h', compiled.povs(povs))
+            if compiled.button_tables is not None:
+                raw_buttons = snapshot.buttons[stick]
+                buttons = 0
+                for table in compiled.button_tables:
+                    buttons |= table[raw_buttons & 0xff]
+                    raw_buttons >>= 8
+                output.buttons[stick] = buttons
+        return output
@@ -0,0 +1,471 @@
+"""Qt GUI for the driver station
+
+Imported only when the GUI is used, so headless runs never load Qt.
+"""
+
+import sys
+import time
+
+# No name ... in module ... - pylint seems to have trouble with PyQt
+# pylint: disable=E0611
+from PyQt5.QtWidgets import QAction, QApplication
+from PyQt5.QtCore import QObject, QTimer, QRect, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QColor, QPalette
+# pylint: enable=E0611
+
+from axis_processing import AxisPipeline
+from control_loop import ControlLoop
+from instrumentation import LoopStats
+from joystick_panel import JoystickPanel
+from link_monitor import monitor_network
+from recording import ReplayJoysticks
+from safety_watchdog import Watchdog
+from sampling_profiler import DEFAULT_DURATION, SamplingProfiler
+from ui_refresh import DISPLAY_RATE, RefreshPipeline
+from driverstation_ui.driverstation_ui import Ui_MainWindow
+
+
+class StatusIndicator:  # (Too few public methods) pylint: disable=R0903
+    """Controller for status indicator"""
+
+    def __init__(self, indicator_widget, status_colors):
+        self.widget = indicator_widget
+        self.status_colors = status_colors
+
+        # A palette per status, built once, so changing status doesn't
+        #  parse a style sheet
+        self.palettes = {}
+        for status, color in status_colors.items():
+            palette = QPalette(self.widget.palette())
+            palette.setColor(QPalette.Window, color)
+            self.palettes[status] = palette
+        self.widget.setAutoFillBackground(True)
+
+        self.status = False
+        self.update_color()
+
+    def update(self, new_status):
+        """Update status indicator with new status
+
+        Indicator widget color will be updated
+         to correspond with new status
+        """
+        # Once status is updated, don't update again to avoid unecessary
+        #  redraws
+        new_status = bool(new_status)
+        if new_status != self.status:
+            self.status = new_status
+            self.update_color()
+
+    def update_color(self):
+        """Update status color of widget"""
+        self.widget.setPalette(self.palettes[self.status])
+
+
+class _ReplayBridge(QObject):
+    """Carries replayed mode and enabled changes from the control loop
+     thread to handlers on the GUI thread"""
+
+    mode_changed = pyqtSignal(str)
+    enabled_changed = pyqtSignal(bool)
+
+    def __init__(self, on_mode, on_enabled):
+        super(_ReplayBridge, self).__init__()
+        self._on_mode = on_mode
+        self._on_enabled = on_enabled
+        # Signals emitted from another thread are queued to this one
+        self.mode_changed.connect(self.apply_mode)
+        self.enabled_changed.connect(self.apply_enabled)
+
+    @pyqtSlot(str)
+    def apply_mode(self, mode):
+        """Pass a replayed mode change on"""
+        self._on_mode(mode)
+
+    @pyqtSlot(bool)
+    def apply_enabled(self, enabled):
+        """Pass a replayed enabled change on"""
+        self._on_enabled(enabled)
+
+
+class _WatchdogBridge(QObject):
+    """Carries watchdog trips from the watchdog thread to a handler
+     on the GUI thread"""
+
+    # Reason, and the only robot disabled or '' for every robot
+    tripped = pyqtSignal(str, str)
+
+    def __init__(self, on_trip):
+        super(_WatchdogBridge, self).__init__()
+        self._on_trip = on_trip
+        self.tripped.connect(self.apply_trip)
+
+    @pyqtSlot(str, str)
+    def apply_trip(self, reason, robot):
+        """Pass a trip on"""
+        self._on_trip(reason, robot or None)
+
+
+# (Too many instance attributes) pylint: disable=R0902
+class PyDriverStation(Ui_MainWindow):
+    """Python-based driver station to communicate with the Raspberry Pi
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, qmain_window, network, config, joysticks,
+                 recorder=None, shared_state=None):
+        super(PyDriverStation, self).__init__()
+
+        self.main_window = qmain_window
+        self.setupUi(self.main_window)
+        self.scale_window()
+
+        self.config = config
+        self.network = network
+        self.joysticks = joysticks
+        self.recorder = recorder
+        self.shared_state = shared_state
+        self._closed = False
+
+        # Joysticks are polled and published on the control loop thread,
+        #  the GUI timer only refreshes indicators
+        self.loop_stats = LoopStats() if config.instrumentation else None
+        self.control_loop = ControlLoop(joysticks, network,
+                                        rate=config.loop_rate,
+                                        stats=self.loop_stats,
+                                        recorder=recorder,
+                                        link_monitors=monitor_network(network),
+                                        shared_state=shared_state)
+
+        # Set exit shortcut to 'Ctrl+Q'
+        exit_act = QAction('Exit', self.main_window)
+        exit_act.setShortcut('Ctrl+Q')
+        exit_act.setStatusTip('Exit application')
+        exit_act.triggered.connect(self.close_application)
+        self.main_window.addAction(exit_act)
+
+        # Set timing dump shortcut to 'Ctrl+D'
+        dump_act = QAction('Dump timings', self.main_window)
+        dump_act.setShortcut('Ctrl+D')
+        dump_act.setStatusTip('Write control loop timings to a file')
+        dump_act.triggered.connect(self.dump_timings)
+        self.main_window.addAction(dump_act)
+
+        # Set profile capture shortcut to 'Ctrl+P'
+        self.profiler = SamplingProfiler()
+        profile_act = QAction('Profile', self.main_window)
+        profile_act.setShortcut('Ctrl+P')
+        profile_act.setStatusTip('Sample what the driver station is doing '
+                                 'into a file')
+        profile_act.triggered.connect(lambda: self.profile())
+        self.main_window.addAction(profile_act)
+
+        self.connect_buttons()
+        self.setup_remote_ip_selector()
+
+        self.set_network()
+
+        status_colors = {True: QColor(0, 180, 0), False: QColor(200, 0, 0)}
+        self.connection_indicator = StatusIndicator(self.ConnectStatus,
+                                                    status_colors)
+
+        # Indicators are set from the latest display state, widgets are
+        #  only touched when what they show changes, at most at display
+        #  rate
+        self.ui_refresh = RefreshPipeline()
+        self.ui_refresh.bind('connected', self.connection_indicator.update,
+                             False)
+        self.ui_refresh.bind('links', self.LinkLabel.setText,
+                             self.LinkLabel.text())
+        self.ui_refresh.bind('diagnostics', self.DiagnosticsLabel.setText,
+                             self.DiagnosticsLabel.text())
+
+        # Drawn from copies of snapshots the control loop makes when
+        #  asked, so the control loop is never held up by drawing
+        self.joystick_panel = JoystickPanel(self.JoystickPanelLayout)
+        self.shown_snapshot = None
+        self.control_loop.request_snapshot()
+
+        if isinstance(joysticks, ReplayJoysticks):
+            self.follow_replay(joysticks)
+
+        # The watchdog disables the robot itself, the GUI only catches up
+        self.watchdog_bridge = _WatchdogBridge(self.watchdog_tripped)
+        self.watchdog = Watchdog(
+            self.control_loop, network, bound=config.watchdog_timeout,
+            on_trip=lambda trip: self.watchdog_bridge.tripped.emit(
+                trip.reason, trip.robot or ''))
+
+        self.control_loop.start()
+        self.watchdog.start()
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update)
+        self.timer.start(int(1000 / DISPLAY_RATE))
+
+        # Diagnostics don't need refreshing as often as indicators
+        self.diagnostics_timer = QTimer()
+        self.diagnostics_timer.timeout.connect(self.update_diagnostics)
+        self.diagnostics_timer.timeout.connect(self.reload_config)
+        self.diagnostics_timer.start(1000)
+        self.update_diagnostics()
+
+    def scale_window(self):
+        """Resize and move the window to handle different dpi screens"""
+        available_geometry = QApplication.desktop().availableGeometry()
+
+        scaled_height = available_geometry.height() * 0.35
+        scaled_width = available_geometry.width() * 0.5
+
+        scaled_geometry = QRect(
+            (available_geometry.width() - scaled_width) / 2,
+            (available_geometry.height() - scaled_height) / 2, scaled_width,
+            scaled_height)
+
+        self.main_window.setGeometry(scaled_geometry)
+
+    def connect_buttons(self):
+        """Connect buttons to handler functions"""
+
+        # Mapping between mode buttons and mode string to put in NetworkTables
+        self.mode_names = {
+            self.AutonomousModeButton: "autonomous",
+            self.TeleopModeButton: "teleop",
+            self.TestModeButton: "test"
+        }
+        self.mode_buttons = [
+            self.AutonomousModeButton, self.TeleopModeButton,
+            self.TestModeButton
+        ]
+
+        # Mapping between button and enabled(True)/disabled(False)
+        self.enable_buttons_status = {
+            self.EnableButton: True,
+            self.DisableButton: False
+        }
+        self.enable_buttons = [self.EnableButton, self.DisableButton]
+
+        self.AutonomousModeButton.clicked.connect(
+            lambda: self.mode_button_press(self.AutonomousModeButton))
+        self.TeleopModeButton.clicked.connect(
+            lambda: self.mode_button_press(self.TeleopModeButton))
+        self.TestModeButton.clicked.connect(
+            lambda: self.mode_button_press(self.TestModeButton))
+
+        self.EnableButton.clicked.connect(
+            lambda: self.enabled_button_press(self.EnableButton))
+        self.DisableButton.clicked.connect(
+            lambda: self.enabled_button_press(self.DisableButton))
+
+    def setup_remote_ip_selector(self):
+        """Setup the remote ip selector input box"""
+        robots = getattr(self.network, 'robots', None)
+        if robots is not None:
+            # Robot ips come from the config when driving several robots
+            self.InputIP.setText(", ".join(sorted(robots)))
+            self.InputIP.setEnabled(False)
+            self.UpdateIPButton.setEnabled(False)
+            return
+
+        self.InputIP.setText(self.config.remote_ip)
+
+        self.UpdateIPButton.clicked.connect(
+            lambda: self.ip_input_update(self.InputIP.text()))
+
+    def follow_replay(self, replay):
+        """Apply mode and enabled changes from `replay`, a
+         `ReplayJoysticks`, by pressing the same buttons as the driver,
+         so the buttons always match what the robot was sent
+
+        Changes of one robot of several are only replayed headless.
+        """
+        mode_buttons = {name: button
+                        for button, name in self.mode_names.items()}
+        self.replay_bridge = _ReplayBridge(
+            lambda mode: self.mode_button_press(mode_buttons[mode]),
+            lambda enabled: self.enabled_button_press(
+                self.EnableButton if enabled else self.DisableButton))
+        replay.on_mode = self.replay_bridge.mode_changed.emit
+        replay.on_enabled = self.replay_bridge.enabled_changed.emit
+
+    def update(self):
+        """Update driver station indicators from the control loop"""
+        display_state = self.control_loop.latest_display_state()
+        if display_state is None:
+            return
+
+        ui_refresh = self.ui_refresh
+        ui_refresh.set('connected', display_state.connected)
+
+        # Round trip time, loss and staleness of each link
+        now = time.monotonic()
+        links = display_state.links
+        if None in links:
+            ui_refresh.set('links', links[None].format(now))
+        else:
+            ui_refresh.set('links', "\n".join(
+                "{}: {}".format(name, links[name].format(now))
+                for name in sorted(links)))
+
+        ui_refresh.refresh()
+
+        snapshot = self.control_loop.latest_snapshot()
+        if snapshot is not None and snapshot is not self.shown_snapshot:
+            self.shown_snapshot = snapshot
+            self.joystick_panel.show_snapshot(snapshot)
+        self.control_loop.request_snapshot()
+
+    def watchdog_tripped(self, reason, robot=None):
+        """Show the robot disabled by the watchdog as disabled, only
+         tell when it disabled one robot of several"""
+        if robot is None:
+            self.enabled_button_press(self.DisableButton)
+            self.statusbar.showMessage("Disabled, " + reason, 5000)
+        else:
+            self.statusbar.showMessage(
+                "Disabled {}, {}".format(robot, reason), 5000)
+
+    def update_diagnostics(self):
+        """Update diagnostics panel with control loop timings"""
+        if self.loop_stats is None:
+            self.ui_refresh.set('diagnostics', "Diagnostics disabled")
+        else:
+            self.ui_refresh.set('diagnostics', (
+                "Missed ticks: {}, watchdog trips: {}, UI updates: {}\n{}\n{}"
+                .format(self.control_loop.missed_ticks,
+                        len(self.watchdog.trips),
+                        self.ui_refresh.applied_count,
+                        self.loop_stats.format_summary(),
+                        self.joystick_panel.format_render_times())))
+        # Shown by the next indicator refresh if this one is too soon
+        self.ui_refresh.refresh()
+
+    def reload_config(self):
+        """Apply changes made to the config file since it was last read
+
+        Axis profiles and the robot ip take effect straight away, other
+         settings once the driver station is restarted.
+        """
+        changed = self.config.reload_if_changed()
+        if not changed:
+            return
+        if 'axis_profiles' in changed and \
+                hasattr(self.joysticks, 'axis_pipeline'):
+            axis_profiles = self.config.axis_profiles
+            self.joysticks.axis_pipeline = (AxisPipeline(axis_profiles)
+                                            if axis_profiles else None)
+        if 'remote_ip' in changed and not hasattr(self.network, 'robots'):
+            self.InputIP.setText(self.config.remote_ip)
+            self.set_network()
+            self.network.change_server_async(self.config.remote_ip)
+        self.statusbar.showMessage("Config reloaded", 5000)
+
+    def profile(self, duration=DEFAULT_DURATION):
+        """Sample what every thread is doing for `duration` seconds,
+         into a timestamped collapsed stack file"""
+        file_name = time.strftime("ds_profile_%Y%m%d_%H%M%S.folded")
+        if self.profiler.capture(file_name, duration,
+                                 on_done=self._profile_written):
+            self.statusbar.showMessage("Profiling for {} s to {}".format(
+                duration, file_name), 5000)
+        else:
+            self.statusbar.showMessage(
+                "Already profiling to " + self.profiler.file_name, 5000)
+
+    def _profile_written(self, file_name):
+        """Print where a capture went, called from the profiler thread"""
+        print("Profile written to {}\n{}".format(
+            file_name, self.profiler.format_summary()),
+              file=sys.stderr, flush=True)
+
+    def dump_timings(self):
+        """Write control loop timings to a timestamped JSON file"""
+        if self.loop_stats is None:
+            return
+
+        file_name = time.strftime("ds_timings_%Y%m%d_%H%M%S.json")
+        self.loop_stats.dump(file_name, {
+            'watchdog_trips': [trip.to_dict()
+                               for trip in self.watchdog.trips],
+            'render': self.joystick_panel.render_times.summary()})
+        self.statusbar.showMessage("Timings written to " + file_name, 5000)
+
+    def mode_button_press(self, pressed_button):
+        """Event handler for mode button press
+
+        Sets mode buttons to checked/unchecked as if they were radio buttons.
+        Updates game mode in NetworkTables.
+        """
+        # Disable robot when mode is changed - fake button press to
+        #  update button gui
+        self.enabled_button_press(self.DisableButton)
+
+        for mode_button in self.mode_buttons:
+            if mode_button == pressed_button:
+                mode_button.setChecked(True)
+                self.network.set_game_mode(self.mode_names[mode_button])
+                if self.recorder is not None:
+                    self.recorder.record_mode(self.mode_names[mode_button])
+            else:
+                mode_button.setChecked(False)
+
+    def enabled_button_press(self, pressed_button):
+        """Event handler for enable/disable button press
+
+        Sets buttons checked state as if they were radio buttons.
+        Updates enable/disable status in NetworkTables.
+        """
+        for button in self.enable_buttons:
+            if button == pressed_button:
+                button.setChecked(True)
+                self.network.set_enabled(self.enable_buttons_status[button])
+                if self.recorder is not None:
+                    self.recorder.record_enabled(
+                        self.enable_buttons_status[button])
+            else:
+                button.setChecked(False)
+
+    def ip_input_update(self, new_ip):
+        """Update robot ip input event handler
+
+        Updates remote robot ip with current value of ip input box,
+        connects NetworkTables to correct robot in the background.
+        The robot is disabled first, the new robot gets the mode and
+        enabled state shown once it's switched to.
+        """
+        self.config.change_remote_ip(new_ip)
+        self.config.save_config()
+
+        self.set_network()
+        self.network.change_server_async(new_ip)
+
+    def set_network(self):
+        """Call when the network has just been (re)initialized to
+         set initial values"""
+        # Use fake button presses to set values so buttons are
+        #  visibly set to matching state
+        self.enabled_button_press(self.DisableButton)
+        self.mode_button_press(self.AutonomousModeButton)
+
+    def close_application(self, event=None):
+        """Cleanup and close application
+
+        Closing the window calls this again, as its `closeEvent`, which
+         does nothing the second time.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.profiler.stop()
+        self.timer.stop()
+        self.diagnostics_timer.stop()
+        self.watchdog.stop()
+        self.control_loop.stop()
+        self.main_window.close()
+        self.joysticks.quit()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.shared_state is not None:
+            self.shared_state.close()
+        self.config.close()
+        self.network.shutdown()
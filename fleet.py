@@ -0,0 +1,207 @@
+"""Driving several robots from one driver station
+
+Each robot has a `Network` of its own, built on its own NetworkTables
+ instance, and a worker thread publishing to it, so a slow or
+ disconnected robot can't hold up the control loop or the other robots.
+"""
+
+import threading
+
+from network import WriteStats
+
+
+class RobotLink:
+    """One robot of a `RobotFleet`
+
+    Holds the robot's `Network`, which local joysticks it's sent,
+     its mode and enabled state, and the worker thread publishing to it.
+    """
+
+    def __init__(self, name: str, network, joystick_map=None):
+        """Initialize robot link
+
+        `name` - `str`: Name the robot is addressed by
+        `network`: `Network` connected to the robot
+        `joystick_map`: Local joystick numbers sent to the robot as its
+         joysticks 0, 1, 2..., every joystick when `None`
+        """
+        self.name = name
+        self.network = network
+        self.joystick_map = (tuple(joystick_map)
+                             if joystick_map is not None else None)
+        self.mode = None
+        self.enabled = False
+
+        # `link_monitor.LinkMonitor` throttling the robot while its
+        #  link is degraded, see `link_monitor.monitor_network`
+        self.link_monitor = None
+
+        # Snapshots replaced by a newer one before the worker published them
+        self.skipped_snapshots = 0
+
+        # Latest snapshot waiting to be published, and the joysticks
+        #  changed since the last one published (`None` for all)
+        self._pending_lock = threading.Lock()
+        self._pending_snapshot = None
+        self._pending_numbers = None
+        self._wake_event = threading.Event()
+        self._stopping = False
+
+        self._thread = threading.Thread(target=self._run,
+                                        name="RobotLink-" + name, daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot, joystick_numbers=None):
+        """Queue `snapshot` to be published, replacing any snapshot
+         the worker hasn't got to yet
+
+        `snapshot` must not be changed afterwards, see
+         `JoystickSnapshot.copy`.
+        """
+        with self._pending_lock:
+            if self._pending_snapshot is not None:
+                self.skipped_snapshots += 1
+                # Joysticks changed in the skipped snapshot still need
+                #  publishing
+                if joystick_numbers is None or self._pending_numbers is None:
+                    joystick_numbers = None
+                else:
+                    joystick_numbers = (set(joystick_numbers) |
+                                        self._pending_numbers)
+            elif joystick_numbers is not None:
+                joystick_numbers = set(joystick_numbers)
+            self._pending_snapshot = snapshot
+            self._pending_numbers = joystick_numbers
+        self._wake_event.set()
+
+    def _run(self):
+        while True:
+            self._wake_event.wait()
+            self._wake_event.clear()
+            if self._stopping:
+                return
+
+            with self._pending_lock:
+                snapshot = self._pending_snapshot
+                joystick_numbers = self._pending_numbers
+                self._pending_snapshot = None
+                self._pending_numbers = None
+            if snapshot is not None:
+                self.network.publish_snapshot(snapshot, joystick_numbers,
+                                              self.joystick_map)
+
+    def set_game_mode(self, mode: str):
+        """Set the robot's game mode"""
+        self.mode = mode
+        self.network.set_game_mode(mode)
+
+    def set_enabled(self, enabled: bool):
+        """Enable or disable the robot"""
+        self.enabled = enabled
+        self.network.set_enabled(enabled)
+
+    def stop(self, timeout=1.0):
+        """Stop the worker thread, dropping any pending snapshot"""
+        self._stopping = True
+        self._wake_event.set()
+        self._thread.join(timeout)
+
+
+class RobotFleet:
+    """Several robots driven at once, used in place of a `Network`
+
+    Publishing a snapshot hands one copy of it to every robot's worker
+     and returns straight away. Mode and enabled changes go to every
+     robot, or to the robot named by `robot`.
+    """
+
+    def __init__(self, robots):
+        """`robots`: `RobotLink` of each robot"""
+        self.robots = {robot.name: robot for robot in robots}
+        if not self.robots:
+            raise ValueError("A fleet needs at least one robot")
+
+    def _targets(self, robot_name):
+        """Returns robots named by `robot_name`, every robot if `None`"""
+        if robot_name is None:
+            return self.robots.values()
+        try:
+            return (self.robots[robot_name],)
+        except KeyError:
+            raise ValueError("Unknown robot: " + str(robot_name))
+
+    @property
+    def write_stats(self) -> WriteStats:
+        """Joystick writes of every robot added together"""
+        write_stats = WriteStats()
+        for robot in self.robots.values():
+            write_stats.published += robot.network.write_stats.published
+            write_stats.suppressed += robot.network.write_stats.suppressed
+            write_stats.deferred += robot.network.write_stats.deferred
+        return write_stats
+
+    @property
+    def published_writes(self) -> int:
+        """Number of joystick writes sent to every robot"""
+        return self.write_stats.published
+
+    @property
+    def suppressed_writes(self) -> int:
+        """Number of joystick writes withheld because nothing changed"""
+        return self.write_stats.suppressed
+
+    def publish_snapshot(self, snapshot, joystick_numbers=None):
+        """Publish joysticks in `snapshot` to every robot, each robot
+         gets the joysticks in its `joystick_map`
+
+        Doesn't wait for robots to publish it. Robots with a degraded
+         link are only sent some snapshots, see
+         `LinkMonitor.should_publish`.
+        """
+        snapshot = snapshot.copy()
+        for robot in self.robots.values():
+            if (robot.link_monitor is None or
+                    robot.link_monitor.should_publish()):
+                robot.submit(snapshot, joystick_numbers)
+
+    def connected(self) -> bool:
+        """Is every robot connected"""
+        return all(robot.network.connected()
+                   for robot in self.robots.values())
+
+    def change_server(self, new_ip, robot=None):
+        """Connect robot named `robot` to a different NetworkTables server
+
+        Only a fleet of one robot can leave out `robot`.
+        """
+        if robot is None and len(self.robots) > 1:
+            raise ValueError("Name the robot whose server should change")
+        for target in self._targets(robot):
+            target.network.change_server(new_ip)
+
+    def force_keyframe(self):
+        """Resend every joystick value to every robot"""
+        for robot in self.robots.values():
+            robot.network.force_keyframe()
+
+    def zero_joysticks(self, robot=None):
+        """Center every joystick of robot named `robot`, or of every
+         robot, straight away"""
+        for target in self._targets(robot):
+            target.network.zero_joysticks()
+
+    def set_game_mode(self, mode: str, robot=None):
+        """Set game mode of robot named `robot`, or every robot"""
+        for target in self._targets(robot):
+            target.set_game_mode(mode)
+
+    def set_enabled(self, enabled: bool, robot=None):
+        """Enable or disable robot named `robot`, or every robot"""
+        for target in self._targets(robot):
+            target.set_enabled(enabled)
+
+    def shutdown(self):
+        """Stop every robot's worker and shut down its network"""
+        for robot in self.robots.values():
+            robot.stop()
+            robot.network.shutdown()
@@ -0,0 +1,311 @@
+"""Headless driver station, controlled by text commands from the terminal
+ or a socket on localhost
+
+Commands, one per line:
+- `enable`, `disable`
+- `mode autonomous|teleop|test`
+- `status`: mode, enabled, connection and joystick count
+- `timings`: control loop timing summary
+- `quit`
+
+When driving several robots, `enable`, `disable` and `mode` take an
+ optional robot name, and only change that robot.
+"""
+
+import socketserver
+import sys
+import threading
+import time
+
+from axis_processing import AxisPipeline
+from control_loop import ControlLoop
+from instrumentation import LoopStats
+from link_monitor import monitor_network
+from recording import ReplayJoysticks
+from safety_watchdog import Watchdog
+from sampling_profiler import DEFAULT_DURATION, SamplingProfiler
+
+MODES = ('autonomous', 'teleop', 'test')
+
+HELP = ("Commands: enable [ROBOT], disable [ROBOT], mode {} [ROBOT], status, "
+        "timings, profile [SECONDS], quit".format('|'.join(MODES)))
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    """Runs each line received on a control connection as a command"""
+
+    def handle(self):
+        for line in self.rfile:
+            reply = self.server.driver_station.handle_command(
+                line.decode('utf-8', 'replace'))
+            self.wfile.write((reply + "\n").encode('utf-8'))
+            if self.server.driver_station.quitting:
+                return
+
+
+class _CommandServer(socketserver.ThreadingTCPServer):
+    """Control server handing connections to a `HeadlessDriverStation`"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, driver_station):
+        super(_CommandServer, self).__init__(address, _CommandHandler)
+        self.driver_station = driver_station
+
+
+class HeadlessDriverStation:
+    """Driver station without a GUI
+
+    Runs the same `ControlLoop` as the GUI, mode and enabled are
+     set with `handle_command`.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, network, config, joysticks, recorder=None,
+                 shared_state=None):
+        self.network = network
+        self.config = config
+        self.joysticks = joysticks
+        self.recorder = recorder
+        self.shared_state = shared_state
+
+        self.loop_stats = LoopStats() if config.instrumentation else None
+        self.control_loop = ControlLoop(joysticks, network,
+                                        rate=config.loop_rate,
+                                        stats=self.loop_stats,
+                                        recorder=recorder,
+                                        link_monitors=monitor_network(network),
+                                        shared_state=shared_state)
+
+        self.watchdog = Watchdog(self.control_loop, network,
+                                 bound=config.watchdog_timeout,
+                                 on_trip=self._watchdog_tripped)
+
+        self.profiler = SamplingProfiler()
+
+        # Commands can arrive from the terminal and socket threads at once
+        self._lock = threading.Lock()
+        self._quit_event = threading.Event()
+        self._server = None
+
+        self.mode = None
+        self.enabled = False
+        self.set_mode(MODES[0])
+
+        if isinstance(joysticks, ReplayJoysticks):
+            self.follow_replay(joysticks)
+
+    def follow_replay(self, replay):
+        """Apply mode and enabled changes from `replay`, a
+         `ReplayJoysticks`, through `set_mode` and `set_enabled`, so
+         `status` always matches what the robot was sent
+        """
+        replay.on_mode = self.set_mode
+        replay.on_enabled = self.set_enabled
+        if hasattr(self.network, 'robots'):
+            replay.on_robot_mode = (
+                lambda robot, mode: self.set_mode(mode, robot))
+            replay.on_robot_enabled = (
+                lambda robot, enabled: self.set_enabled(enabled, robot))
+
+    def _watchdog_tripped(self, trip):
+        """Show the robot disabled by the watchdog as disabled"""
+        self.set_enabled(False, trip.robot)
+        print("Disabled{}, {}".format(
+            "" if trip.robot is None else " " + trip.robot, trip.reason),
+              file=sys.stderr, flush=True)
+
+    def reload_config(self) -> frozenset:
+        """Apply changes made to the config file since it was last read,
+         returns the names of the settings that changed
+
+        Axis profiles and the robot ip take effect straight away, other
+         settings once the driver station is restarted.
+        """
+        changed = self.config.reload_if_changed()
+        if not changed:
+            return changed
+        if 'axis_profiles' in changed and \
+                hasattr(self.joysticks, 'axis_pipeline'):
+            axis_profiles = self.config.axis_profiles
+            self.joysticks.axis_pipeline = (AxisPipeline(axis_profiles)
+                                            if axis_profiles else None)
+        if 'remote_ip' in changed and not hasattr(self.network, 'robots'):
+            self.set_enabled(False)
+            self.network.change_server_async(self.config.remote_ip)
+        print("Config reloaded, changed: " + ", ".join(sorted(changed)),
+              file=sys.stderr, flush=True)
+        return changed
+
+    def profile(self, duration=DEFAULT_DURATION) -> str:
+        """Sample what every thread is doing for `duration` seconds,
+         into a timestamped collapsed stack file, returns reply text"""
+        file_name = time.strftime("ds_profile_%Y%m%d_%H%M%S.folded")
+        if not self.profiler.capture(file_name, duration,
+                                     on_done=self._profile_written):
+            return "Already profiling to " + self.profiler.file_name
+        return "Profiling for {} s to {}".format(duration, file_name)
+
+    def _profile_written(self, file_name):
+        print("Profile written to {}\n{}".format(
+            file_name, self.profiler.format_summary()),
+              file=sys.stderr, flush=True)
+
+    @property
+    def quitting(self) -> bool:
+        """Has the driver station been told to quit"""
+        return self._quit_event.is_set()
+
+    def start(self):
+        """Start the control loop and its watchdog"""
+        self.control_loop.start()
+        self.watchdog.start()
+
+    def serve(self, port: int, host='127.0.0.1') -> int:
+        """Accept commands on `host`:`port` on a thread of its own,
+         returns the port listened on (useful when `port` is 0)"""
+        self._server = _CommandServer((host, port), self)
+        threading.Thread(target=self._server.serve_forever,
+                         name="HeadlessCommands", daemon=True).start()
+        return self._server.server_address[1]
+
+    def set_enabled(self, enabled: bool, robot=None):
+        """Enable or disable the robot, or only robot named `robot`
+         when driving several robots"""
+        with self._lock:
+            if robot is None:
+                self.enabled = enabled
+                self.network.set_enabled(enabled)
+            else:
+                self.network.set_enabled(enabled, robot)
+            if self.recorder is not None:
+                self.recorder.record_enabled(enabled, robot)
+
+    def set_mode(self, mode: str, robot=None):
+        """Disable the robot and change game mode, like the GUI, or
+         only robot named `robot` when driving several robots"""
+        self.set_enabled(False, robot)
+        with self._lock:
+            if robot is None:
+                self.mode = mode
+                self.network.set_game_mode(mode)
+            else:
+                self.network.set_game_mode(mode, robot)
+            if self.recorder is not None:
+                self.recorder.record_mode(mode, robot)
+
+    def status(self) -> str:
+        """Returns driver station state, then a line per robot
+         when driving several robots"""
+        display_state = self.control_loop.latest_display_state()
+        if display_state is None:
+            connection = "waiting for control loop"
+        else:
+            connection = "{}, {} joysticks".format(
+                "connected" if display_state.connected else "disconnected",
+                display_state.num_joysticks)
+        links = display_state.links if display_state is not None else {}
+        now = time.monotonic()
+        if None in links:
+            connection += ", " + links[None].format(now)
+        lines = ["{}, {}, {}, missed ticks: {}".format(
+            self.mode, "enabled" if self.enabled else "disabled", connection,
+            self.control_loop.missed_ticks)]
+
+        for name, robot in sorted(getattr(self.network, 'robots',
+                                          {}).items()):
+            lines.append("  {}: {}, {}, {}, skipped snapshots: {}{}".format(
+                name, robot.mode, "enabled" if robot.enabled else "disabled",
+                "connected" if robot.network.connected() else "disconnected",
+                robot.skipped_snapshots,
+                ", " + links[name].format(now) if name in links else ""))
+        return "\n".join(lines)
+
+    def handle_command(self, line: str) -> str:
+        """Run command `line`, returns reply text"""
+        words = line.split()
+        if not words:
+            return HELP
+        command = words[0].lower()
+
+        # Optional robot name, last word of enable/disable/mode
+        robot = None
+        robot_position = 2 if command == 'mode' else 1
+        if command in ('enable', 'disable', 'mode') and \
+                len(words) > robot_position:
+            robot = words[robot_position]
+            if robot not in getattr(self.network, 'robots', ()):
+                return "Unknown robot: " + robot
+
+        if command == 'enable':
+            self.set_enabled(True, robot)
+        elif command == 'disable':
+            self.set_enabled(False, robot)
+        elif command == 'mode':
+            if len(words) not in (2, 3) or words[1].lower() not in MODES:
+                return "Usage: mode {} [ROBOT]".format('|'.join(MODES))
+            self.set_mode(words[1].lower(), robot)
+        elif command == 'timings':
+            if self.loop_stats is None:
+                return "Diagnostics disabled"
+            return "{}\n{}".format(self.loop_stats.format_summary(),
+                                   self.watchdog.format_trips())
+        elif command == 'profile':
+            try:
+                duration = (float(words[1]) if len(words) > 1
+                            else DEFAULT_DURATION)
+            except ValueError:
+                return "Usage: profile [SECONDS]"
+            return self.profile(duration)
+        elif command == 'quit':
+            self._quit_event.set()
+            return "Quitting"
+        elif command != 'status':
+            return "Unknown command: {}\n{}".format(command, HELP)
+        return self.status()
+
+    def _read_terminal(self, input_file, output):
+        """Run commands read from `input_file` until it ends"""
+        for line in input_file:
+            print(self.handle_command(line), file=output, flush=True)
+            if self.quitting:
+                return
+
+        # Without a control socket there's no other way to quit
+        if self._server is None:
+            self._quit_event.set()
+
+    def run(self, input_file=sys.stdin, output=sys.stdout) -> int:
+        """Run commands from `input_file` until told to quit, then
+         close the driver station, returns exit status"""
+        print(HELP, file=output, flush=True)
+        threading.Thread(target=self._read_terminal, args=(input_file, output),
+                         name="HeadlessTerminal", daemon=True).start()
+
+        try:
+            # Wait with a timeout so Ctrl+C is noticed
+            while not self._quit_event.wait(0.5):
+                self.reload_config()
+        except KeyboardInterrupt:
+            print("\n\nExiting...\n\n", file=output)
+
+        self.close()
+        return 0
+
+    def close(self):
+        """Disable the robot and shut everything down"""
+        self.profiler.stop()
+        self.watchdog.stop()
+        self.set_enabled(False)
+        self.control_loop.stop()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self.joysticks.quit()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.shared_state is not None:
+            self.shared_state.close()
+        self.config.close()
+        self.network.shutdown()
@@ -0,0 +1,192 @@
+"""Timing instrumentation for the driver station update path"""
+
+import contextlib
+import json
+import time
+from array import array
+
+# Each power of two range is split into 2 ** (SUB_BUCKET_BITS - 1)
+#  buckets, so recorded values are within ~3% of the true value
+SUB_BUCKET_BITS = 6
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def _bucket_index(value: int) -> int:
+    """Returns index of the bucket holding non-negative `value`"""
+    bits = value.bit_length()
+    if bits <= SUB_BUCKET_BITS:
+        return value
+    shift = bits - SUB_BUCKET_BITS
+    return (SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF +
+            (value >> shift) - SUB_BUCKET_HALF)
+
+
+def _bucket_value(index: int) -> int:
+    """Returns smallest value held by bucket `index`"""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift, sub_bucket = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF)
+    return (sub_bucket + SUB_BUCKET_HALF) << (shift + 1)
+
+
+class Histogram:
+    """Fixed-size histogram of non-negative integers with log-linear
+     buckets, in the style of HdrHistogram
+
+    Recording is constant time and never allocates, values above
+     `max_value` are counted in the last bucket.
+    """
+
+    def __init__(self, max_value: int):
+        self.max_value = max_value
+        self._last_bucket = _bucket_index(max_value)
+        self.counts = array('Q', bytes(8 * (self._last_bucket + 1)))
+        self.count = 0
+        self.max = 0
+
+    def record(self, value: int):
+        """Add `value` to the histogram"""
+        if value < 0:
+            value = 0
+        index = _bucket_index(value)
+        if index > self._last_bucket:
+            index = self._last_bucket
+        self.counts[index] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> int:
+        """Returns approximate value below which `percent`
+         percent of recorded values fall
+        """
+        if self.count == 0:
+            return 0
+
+        target = max(1, self.count * percent / 100.0)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                # Values in the highest bucket are best described by max
+                if seen == self.count:
+                    return self.max
+                return _bucket_value(index)
+        return self.max
+
+    def reset(self):
+        """Remove all recorded values"""
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+        self.count = 0
+        self.max = 0
+
+    def summary(self) -> dict:
+        """Returns count, p50, p99 and max of recorded values"""
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+
+class LoopStats:
+    """Histograms of control loop timings
+
+    Times are recorded in microseconds:
+    - `jitter`: how late each tick started relative to its deadline
+    - `poll`: time spent reading joysticks
+    - `publish`: time spent publishing joysticks
+    `puts` holds the number of NetworkTables writes made each tick.
+    """
+
+    # Longest time that gets its own bucket, in microseconds
+    MAX_TIME = 10000000
+    MAX_PUTS = 100000
+
+    def __init__(self):
+        self.histograms = {
+            'jitter': Histogram(self.MAX_TIME),
+            'poll': Histogram(self.MAX_TIME),
+            'publish': Histogram(self.MAX_TIME),
+            'puts': Histogram(self.MAX_PUTS)
+        }
+        self._jitter = self.histograms['jitter']
+        self._poll = self.histograms['poll']
+        self._publish = self.histograms['publish']
+        self._puts = self.histograms['puts']
+
+    def record_tick(self, lateness: float, poll_time: float,
+                    publish_time: float, puts: int):
+        """Record timings of one tick, times are in seconds"""
+        self._jitter.record(int(lateness * 1e6))
+        self._poll.record(int(poll_time * 1e6))
+        self._publish.record(int(publish_time * 1e6))
+        self._puts.record(puts)
+
+    def summary(self) -> dict:
+        """Returns summary of each histogram, by name"""
+        return {name: histogram.summary()
+                for name, histogram in self.histograms.items()}
+
+    def format_summary(self) -> str:
+        """Returns one line of text per histogram with p50/p99/max"""
+        lines = []
+        for name, summary in self.summary().items():
+            unit = "" if name == 'puts' else " us"
+            lines.append("{}: p50 {}{unit}, p99 {}{unit}, max {}{unit}".format(
+                name, summary['p50'], summary['p99'], summary['max'],
+                unit=unit))
+        return "\n".join(lines)
+
+    def dump(self, file_name: str, extra=None):
+        """Write summaries and bucket counts of every histogram
+         to `file_name` as JSON, with the entries of dict `extra`
+        """
+        data = dict(extra) if extra else {}
+        for name, histogram in self.histograms.items():
+            data[name] = histogram.summary()
+            data[name]['buckets'] = {
+                _bucket_value(index): bucket_count
+                for index, bucket_count in enumerate(histogram.counts)
+                if bucket_count}
+
+        with open(file_name, 'w') as dump_file:
+            json.dump(data, dump_file, indent=2)
+
+    def reset(self):
+        """Remove all recorded timings"""
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+
+class StartupTimer:
+    """Time taken by each phase of startup, like `python -X importtime`
+     but for the driver station's own phases
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.start_time = clock()
+        # (name, seconds) of each finished phase, in order
+        self.phases = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Context manager timing the phase `name`"""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.phases.append((name, self._clock() - start))
+
+    def format_report(self) -> str:
+        """Returns one line per phase with its time in milliseconds,
+         then the total since the timer was created"""
+        lines = ["{:9.1f} ms  {}".format(seconds * 1e3, name)
+                 for name, seconds in self.phases]
+        lines.append("{:9.1f} ms  total".format(
+            (self._clock() - self.start_time) * 1e3))
+        return "\n".join(lines)
@@ -0,0 +1,140 @@
+"""Qt panel drawing the axes, buttons and POVs of every joystick
+
+Each joystick is one custom painted widget, not a widget per axis or
+ button, and is only repainted when what it shows changed. Paint times
+ are recorded so drawing cost shows in the diagnostics.
+"""
+
+import time
+
+# No name ... in module ... - pylint seems to have trouble with PyQt
+# pylint: disable=E0611
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QColor, QPainter
+# pylint: enable=E0611
+
+from instrumentation import Histogram, LoopStats
+
+AXIS_HEIGHT = 10
+BUTTON_SIZE = 12
+SPACING = 4
+BUTTONS_PER_ROW = 8
+
+BACKGROUND = QColor(235, 235, 235)
+DISCONNECTED = QColor(200, 200, 200)
+OUTLINE = QColor(120, 120, 120)
+ACTIVE = QColor(0, 120, 215)
+TEXT = QColor(0, 0, 0)
+
+
+class StickWidget(QWidget):
+    """Draws one joystick's state"""
+
+    def __init__(self, number, render_times, parent=None):
+        super(StickWidget, self).__init__(parent)
+        self.number = number
+        self.render_times = render_times
+        # `(connected, axes, buttons, num_buttons, povs)` being shown
+        self._state = None
+        self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Preferred)
+        self.setMinimumWidth(BUTTONS_PER_ROW * (BUTTON_SIZE + SPACING) +
+                             SPACING)
+
+    def set_state(self, state):
+        """Show `state`, repainting only if it changed"""
+        if state != self._state:
+            self._state = state
+            self.update()
+
+    def paintEvent(self, _event):  # pylint: disable=invalid-name
+        """Draw the joystick, timing how long it takes"""
+        start = time.perf_counter()
+        painter = QPainter(self)
+        try:
+            self._paint(painter)
+        finally:
+            painter.end()
+        self.render_times.record(int((time.perf_counter() - start) * 1e6))
+
+    def _paint(self, painter):
+        width = self.width()
+        painter.fillRect(self.rect(), BACKGROUND)
+        if self._state is None:
+            return
+        connected, axes, buttons, num_buttons, povs = self._state
+
+        painter.setPen(TEXT)
+        line_height = painter.fontMetrics().height()
+        painter.drawText(SPACING, line_height, "Joystick {}{}".format(
+            self.number, "" if connected else " (unplugged)"))
+        fill = ACTIVE if connected else DISCONNECTED
+        top = line_height + SPACING
+
+        # Axes as bars growing from the middle
+        bar_width = width - 2 * SPACING
+        middle = SPACING + bar_width / 2
+        for value in axes:
+            painter.setPen(OUTLINE)
+            painter.drawRect(QRectF(SPACING, top, bar_width, AXIS_HEIGHT))
+            length = max(-1.0, min(1.0, value)) * bar_width / 2
+            painter.fillRect(QRectF(min(middle, middle + length), top,
+                                    abs(length), AXIS_HEIGHT), fill)
+            top += AXIS_HEIGHT + SPACING
+
+        # Buttons as a grid of squares, filled while pressed
+        for button in range(num_buttons):
+            row, column = divmod(button, BUTTONS_PER_ROW)
+            square = QRectF(SPACING + column * (BUTTON_SIZE + SPACING),
+                            top + row * (BUTTON_SIZE + SPACING),
+                            BUTTON_SIZE, BUTTON_SIZE)
+            painter.setPen(OUTLINE)
+            painter.drawRect(square)
+            if buttons >> button & 1:
+                painter.fillRect(square, fill)
+        if num_buttons:
+            rows = (num_buttons + BUTTONS_PER_ROW - 1) // BUTTONS_PER_ROW
+            top += rows * (BUTTON_SIZE + SPACING)
+
+        if povs:
+            painter.setPen(TEXT)
+            painter.drawText(
+                QRectF(SPACING, top, bar_width, line_height),
+                Qt.AlignLeft,
+                "POV: " + " ".join("-" if angle < 0 else str(angle)
+                                   for angle in povs))
+
+
+class JoystickPanel:
+    """Keeps a `StickWidget` per joystick in Qt layout `layout`"""
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.sticks = []
+        # Paint time of each joystick drawn, in microseconds
+        self.render_times = Histogram(LoopStats.MAX_TIME)
+
+    def show_snapshot(self, snapshot):
+        """Show the joysticks of `snapshot`, a `JoystickSnapshot` copy"""
+        num_joysticks = len(snapshot.axes)
+        while len(self.sticks) < num_joysticks:
+            stick = StickWidget(len(self.sticks), self.render_times)
+            self.layout.addWidget(stick)
+            self.sticks.append(stick)
+        while len(self.sticks) > num_joysticks:
+            stick = self.sticks.pop()
+            self.layout.removeWidget(stick)
+            stick.deleteLater()
+
+        connected = snapshot.connected
+        for number, stick in enumerate(self.sticks):
+            stick.set_state((
+                connected[number] if number < len(connected) else True,
+                tuple(snapshot.axes[number]), snapshot.buttons[number],
+                snapshot.num_buttons[number], tuple(snapshot.povs[number])))
+
+    def format_render_times(self) -> str:
+        """Returns a line with p50/p99/max joystick paint times"""
+        summary = self.render_times.summary()
+        return "render: p50 {p50} us, p99 {p99} us, max {max} us".format(
+            **summary)
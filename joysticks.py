@@ -1,38 +1,401 @@
 """Joystick-related utilities"""
 
+import time
+from array import array
+
+# WPILib POV angle for each pygame hat position, -1 when centered
+HAT_POV_ANGLES = {
+    (0, 0): -1,
+    (0, 1): 0,
+    (1, 1): 45,
+    (1, 0): 90,
+    (1, -1): 135,
+    (0, -1): 180,
+    (-1, -1): 225,
+    (-1, 0): 270,
+    (-1, 1): 315
+}
+
+# Seconds between event queue checks when waiting for events with a
+#  pygame that can't time out waiting
+EVENT_POLL_INTERVAL = 0.002
+
+
+def _pygame_version(pygame) -> tuple:
+    """Returns `(major, minor, patch)` version of `pygame`, assumed
+     recent when it doesn't say"""
+    try:
+        return tuple(pygame.version.vernum)[:3]
+    except (AttributeError, TypeError):
+        return (2, 0, 1)
+
+
+def _joystick_guid(joystick) -> str:
+    """Returns GUID of `joystick`, its name before pygame 2"""
+    get_guid = getattr(joystick, 'get_guid', None)
+    if get_guid is None:
+        return joystick.get_name()
+    return get_guid()
+
+
+def _joystick_instance_id(joystick) -> int:
+    """Returns instance id of `joystick`, its device index before pygame 2"""
+    get_instance_id = getattr(joystick, 'get_instance_id', None)
+    if get_instance_id is None:
+        return joystick.get_id()
+    return get_instance_id()
+
+
+class JoystickSnapshot:  # (Too few public methods) pylint: disable=R0903
+    """State of all joysticks at one point in time
+
+    `axes` holds an `array('d')` of axis positions per joystick,
+     `buttons` holds an `int` bitmask per joystick with bit `n` set
+     when button `n` is pressed, `num_buttons` the number of
+     buttons on each joystick, and `povs` an `array('h')` of
+     POV (hat) angles per joystick, -1 when centered.
+
+    Snapshots returned by `Joysticks.snapshot` are reused, their
+     contents are only valid until the next call.
+    """
+
+    __slots__ = ('timestamp', 'sequence', 'axes', 'buttons', 'num_buttons',
+                 'povs', 'connected', 'guids')
+
+    def __init__(self):
+        self.timestamp = 0.0
+        self.sequence = 0
+        self.axes = []
+        self.buttons = []
+        self.num_buttons = []
+        self.povs = []
+        self.connected = []
+        self.guids = []
+
+    def copy(self):
+        """Returns a copy of this snapshot that later snapshots
+         won't change"""
+        snapshot = JoystickSnapshot()
+        snapshot.timestamp = self.timestamp
+        snapshot.sequence = self.sequence
+        snapshot.axes = [array('d', axes) for axes in self.axes]
+        snapshot.buttons = list(self.buttons)
+        snapshot.num_buttons = list(self.num_buttons)
+        snapshot.povs = [array('h', povs) for povs in self.povs]
+        snapshot.connected = list(self.connected)
+        snapshot.guids = list(self.guids)
+        return snapshot
+
+    def unpack_buttons(self, stick: int) -> list:
+        """Returns button states of `stick` as a list of `0`/`1`"""
+        mask = self.buttons[stick]
+        return [(mask >> button) & 1
+                for button in range(self.num_buttons[stick])]
+
 
 class Joysticks:
     """Provides data about usb joysticks (and other
      controllers pygame recognizes as joysticks) via pygame
+
+    Each joystick is given a slot, its joystick number. Slots stay the
+     same while joysticks are plugged in and unplugged, and a joystick
+     that is plugged back in gets its old slot back if it is free.
     """
 
-    def __init__(self, pygame):
-        """Initialize joysticks"""
+    # pylint: disable=too-many-arguments
+    def __init__(self, pygame, clock=time.monotonic, event_driven=False,
+                 axis_pipeline=None, mapper=None):
+        """Initialize joysticks
+
+        `clock`: Monotonic time source used to timestamp snapshots
+        `event_driven` - `bool`: Track joystick state from pygame events
+         instead of reading every axis and button each snapshot
+        `axis_pipeline`: `axis_processing.AxisPipeline` conditioning axes
+         of each snapshot, or `None` for raw axes
+        `mapper`: `controller_mapping.ControllerMapper` rearranging each
+         controller into a common layout before axes are conditioned,
+         or `None` to keep pygame's layout
+        """
 
         self._pygame = pygame
+        self._clock = clock
+        self.event_driven = event_driven
+        self.axis_pipeline = axis_pipeline
+        self.mapper = mapper
 
         self._pygame.init()
 
+        # `event.wait` only takes a timeout from pygame 2.0.1
+        self._wait_has_timeout = _pygame_version(pygame) >= (2, 0, 1)
+
+        # Joystick events carry the joystick's instance id from pygame 2,
+        #  its device index (which never changes without hot-plug) before
+        self._event_joystick_id = ('instance_id'
+                                   if hasattr(pygame, 'JOYDEVICEADDED')
+                                   else 'joy')
+
+        self._snapshot = JoystickSnapshot()
+
+        # Joysticks changed by events since `take_changed` was last called
+        self._changed = set()
+
+        # Hot-plug events are always handled, input events only
+        #  when event driven. Device events are missing in pygame 1
+        self._event_handlers = {
+            getattr(pygame, 'JOYDEVICEADDED', None): self._on_device_added,
+            getattr(pygame, 'JOYDEVICEREMOVED', None):
+                self._on_device_removed
+        }
+        self._event_handlers.pop(None, None)
+        if event_driven:
+            self._event_handlers.update({
+                pygame.JOYAXISMOTION: self._on_axis_motion,
+                pygame.JOYBUTTONDOWN: self._on_button_down,
+                pygame.JOYBUTTONUP: self._on_button_up,
+                pygame.JOYHATMOTION: self._on_hat_motion
+            })
+
         self._scan_joysticks()
 
     def _scan_joysticks(self):
-        # List of all joysticks plugged in (at time of initialization)
-        self._joysticks = [self._pygame.joystick.Joystick(x)
-                           for x in range(self._pygame.joystick.get_count())]
-        [joy.init() for joy in self._joysticks]
+        # Joystick in each slot, `None` once unplugged
+        self._joysticks = []
+        # Slot of each joystick, by pygame instance id
+        self._instance_slots = {}
+
+        snapshot = self._snapshot
+        snapshot.axes = []
+        snapshot.buttons = []
+        snapshot.num_buttons = []
+        snapshot.povs = []
+        snapshot.connected = []
+        snapshot.guids = []
+
+        for device_index in range(self._pygame.joystick.get_count()):
+            self._add_joystick(self._pygame.joystick.Joystick(device_index))
+
+    def _add_joystick(self, joystick) -> int:
+        """Give `joystick` a slot and read its state, returns the slot"""
+        joystick.init()
+        guid = _joystick_guid(joystick)
+        snapshot = self._snapshot
+
+        # Prefer the free slot this kind of joystick had before
+        free_slots = [slot for slot, slot_joystick
+                      in enumerate(self._joysticks) if slot_joystick is None]
+        for slot in free_slots:
+            if snapshot.guids[slot] == guid:
+                break
+        else:
+            slot = len(self._joysticks)
+            self._joysticks.append(None)
+            # Buffers are sized when the joystick is first read
+            snapshot.axes.append(array('d'))
+            snapshot.buttons.append(0)
+            snapshot.num_buttons.append(0)
+            snapshot.povs.append(array('h'))
+            snapshot.connected.append(False)
+            snapshot.guids.append(guid)
+
+        self._joysticks[slot] = joystick
+        self._instance_slots[_joystick_instance_id(joystick)] = slot
+        snapshot.connected[slot] = True
+
+        # Events only carry changes, so start from a full read
+        if self.event_driven:
+            self._read_joystick(slot)
+        return slot
+
+    def _read_joystick(self, stick: int):
+        """Read state of `stick` into the snapshot buffers"""
+        joystick = self._joysticks[stick]
+        snapshot = self._snapshot
+
+        axes = snapshot.axes[stick]
+        num_axes = joystick.get_numaxes()
+        if len(axes) != num_axes:
+            axes = snapshot.axes[stick] = array('d', bytes(8 * num_axes))
+
+        get_axis = joystick.get_axis
+        # Controllers are rearranged to match RobotPy and WPILib
+        #  by `mapper`, not here
+        for axis in range(num_axes):
+            axes[axis] = get_axis(axis)
+
+        get_button = joystick.get_button
+        mask = 0
+        num_buttons = joystick.get_numbuttons()
+        for button in range(num_buttons):
+            if get_button(button):
+                mask |= 1 << button
+
+        snapshot.buttons[stick] = mask
+        snapshot.num_buttons[stick] = num_buttons
+
+        povs = snapshot.povs[stick]
+        num_povs = joystick.get_numhats()
+        if len(povs) != num_povs:
+            povs = snapshot.povs[stick] = array('h', bytes(2 * num_povs))
+
+        for hat in range(num_povs):
+            povs[hat] = HAT_POV_ANGLES.get(tuple(joystick.get_hat(hat)), -1)
+
+    def _on_device_added(self, event):
+        joystick = self._pygame.joystick.Joystick(event.device_index)
+        # Joysticks present at startup are also announced by events
+        if joystick.get_instance_id() in self._instance_slots:
+            return
+        self._changed.add(self._add_joystick(joystick))
+
+    def _on_device_removed(self, event):
+        slot = self._instance_slots.pop(event.instance_id, None)
+        if slot is None:
+            return
+
+        self._joysticks[slot].quit()
+        self._joysticks[slot] = None
+
+        # Keep the layout, so centered values are published for
+        #  the unplugged joystick
+        snapshot = self._snapshot
+        axes = snapshot.axes[slot]
+        for axis in range(len(axes)):
+            axes[axis] = 0.0
+        snapshot.buttons[slot] = 0
+        povs = snapshot.povs[slot]
+        for pov in range(len(povs)):
+            povs[pov] = -1
+        snapshot.connected[slot] = False
+        self._changed.add(slot)
+
+    def _event_slot(self, event):
+        """Returns slot of the joystick `event` came from, or `None`"""
+        return self._instance_slots.get(
+            getattr(event, self._event_joystick_id))
+
+    def _on_axis_motion(self, event):
+        stick = self._event_slot(event)
+        if stick is None:
+            return
+        axes = self._snapshot.axes[stick]
+        if event.axis < len(axes):
+            axes[event.axis] = event.value
+            self._changed.add(stick)
+
+    def _on_button_down(self, event):
+        stick = self._event_slot(event)
+        if stick is None:
+            return
+        if event.button < self._snapshot.num_buttons[stick]:
+            self._snapshot.buttons[stick] |= 1 << event.button
+            self._changed.add(stick)
+
+    def _on_button_up(self, event):
+        stick = self._event_slot(event)
+        if stick is None:
+            return
+        if event.button < self._snapshot.num_buttons[stick]:
+            self._snapshot.buttons[stick] &= ~(1 << event.button)
+            self._changed.add(stick)
+
+    def _on_hat_motion(self, event):
+        stick = self._event_slot(event)
+        if stick is None:
+            return
+        povs = self._snapshot.povs[stick]
+        if event.hat < len(povs):
+            povs[event.hat] = HAT_POV_ANGLES.get(tuple(event.value), -1)
+            self._changed.add(stick)
+
+    def _handle_events(self, events):
+        handlers = self._event_handlers
+        for event in events:
+            handler = handlers.get(event.type)
+            if handler is not None:
+                handler(event)
 
     def update(self):
         """Call periodically, preferably before a group of calls
          to `get_joystick`, this will flush the pygame event queue.
+
+        Joysticks plugged in or unplugged are added or removed. When
+         event driven, queued joystick events are applied to the
+         joystick state.
+        """
+        self._handle_events(self._pygame.event.get())
+
+    def wait_for_events(self, timeout: float) -> set:
+        """Wait up to `timeout` seconds for joystick events, apply them
+         and any others already queued, and return the set of joysticks
+         that changed
+
+        Bursts of events are coalesced, each changed joystick is
+         reported once. Requires `event_driven`.
+
+        Older pygame can't time out waiting, so the event queue is
+         checked every `EVENT_POLL_INTERVAL` instead.
         """
-        self._pygame.event.get()
+        if self._wait_has_timeout:
+            event = self._pygame.event.wait(max(1, int(timeout * 1000)))
+            if event.type != self._pygame.NOEVENT:
+                self._handle_events((event,))
+                self.update()
+            return self.take_changed()
+
+        deadline = time.monotonic() + timeout
+        self.update()
+        while not self._changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(EVENT_POLL_INTERVAL, remaining))
+            self.update()
+        return self.take_changed()
+
+    def take_changed(self) -> set:
+        """Returns set of joysticks changed by events since the
+         last call, and starts a new set
+        """
+        changed = self._changed
+        self._changed = set()
+        return changed
 
     def get_num_joysticks(self) -> int:
-        """Returns the number of USB joysticks plugged into computer.
+        """Returns the number of joystick slots, USB joysticks plugged
+         into computer plus slots kept for unplugged joysticks.
+        """
+        return len(self._joysticks)
+
+    def snapshot(self) -> JoystickSnapshot:
+        """Read every joystick and return their state
+
+        When event driven, joysticks aren't read, the state built
+         from events is returned instead.
 
-        Note - Hat sticks (on most joysticks) will count as separate joysticks.
+        Joysticks are remapped by `mapper` and their axes conditioned
+         by `axis_pipeline`, if any.
+
+        The returned `JoystickSnapshot` and its buffers are reused by
+         the next call, copy anything that needs to outlive it.
         """
-        return self._pygame.joystick.get_count()
+        if not self.event_driven:
+            for stick, joystick in enumerate(self._joysticks):
+                if joystick is not None:
+                    self._read_joystick(stick)
+
+        snapshot = self._snapshot
+        snapshot.timestamp = self._clock()
+        snapshot.sequence += 1
+        return self._process(snapshot)
+
+    def _process(self, snapshot):
+        """Returns `snapshot` remapped and conditioned"""
+        # Raw state is kept, events only update what they change
+        if self.mapper is not None:
+            snapshot = self.mapper.apply(snapshot)
+        if self.axis_pipeline is not None:
+            snapshot = self.axis_pipeline.apply(snapshot)
+        return snapshot
 
     def get_joystick(self, stick: int) -> dict:
         """Returns dict holding state of specified joystick.
@@ -44,26 +407,22 @@ class Joysticks:
 
         `'axes'` holds the position of joystick `n` at index
          `n`, `'buttons'` does the same for the buttons.
+
+        Prefer `snapshot`, which reads every joystick without
+         allocating.
         """
 
         if stick >= len(self._joysticks) or stick < 0:
             raise ValueError("get_joystick called with invalid stick number: " + str(stick))
 
-        joy_data = {"axes": [], "buttons": []}
-
-        joystick = self._joysticks[stick]
-
-        for axis in range(joystick.get_numaxes()):
-            # We might need to skip axis #6 to remain
-            #  consistent with RobotPy and WPIlib
-            joy_data["axes"].append(joystick.get_axis(axis))
-
-        for button in range(joystick.get_numbuttons()):
-            # We might need to skip button #10 to remain
-            #  consistent with RobotPy and WPIlib
-            joy_data["buttons"].append(joystick.get_button(button))
+        if not self.event_driven and self._joysticks[stick] is not None:
+            self._read_joystick(stick)
 
-        return joy_data
+        snapshot = self._process(self._snapshot)
+        return {
+            "axes": snapshot.axes[stick].tolist(),
+            "buttons": snapshot.unpack_buttons(stick)
+        }
 
     def quit(self):
         """Clean up and release resources"""
@@ -0,0 +1,255 @@
+"""Round trip time and link quality measurement over NetworkTables
+
+The driver station counts up `/heartbeat` in its table, and the robot
+ copies each value it sees to `/heartbeat-echo`. How long an echo takes
+ to come back is the round trip time, heartbeats never echoed are lost,
+ and the time since the last echo is how stale the link is.
+ `HeartbeatEcho` does the robot's part, for robot code or for testing
+ without a robot.
+"""
+
+import random
+import threading
+import time
+from array import array
+
+HEARTBEAT_KEY = "/heartbeat"
+ECHO_KEY = "/heartbeat-echo"
+
+
+class LinkState:  # (Too few public methods) pylint: disable=R0903
+    """Link quality measured by a `LinkMonitor`"""
+
+    __slots__ = ('rtt', 'loss', 'echo_time')
+
+    def __init__(self, rtt, loss, echo_time):
+        # Seconds the latest echo took to come back, `None` before the first
+        self.rtt = rtt
+        # Fraction of recent heartbeats never echoed
+        self.loss = loss
+        # When the latest echo arrived, `None` before the first
+        self.echo_time = echo_time
+
+    def staleness(self, now: float):
+        """Returns seconds since the latest echo at time `now`, or
+         `None` if nothing was ever echoed"""
+        if self.echo_time is None:
+            return None
+        return now - self.echo_time
+
+    def format(self, now: float) -> str:
+        """Returns the state as short text for display"""
+        if self.echo_time is None:
+            return "RTT: --  Loss: --  Age: --"
+        return "RTT: {:.0f} ms  Loss: {:.0%}  Age: {:.1f} s".format(
+            self.rtt * 1000.0, self.loss, self.staleness(now))
+
+
+NO_ECHO = LinkState(None, 0.0, None)
+
+
+class LinkMonitor:
+    """Sends heartbeats over a `Network` and measures their echoes
+
+    Call `tick` regularly, e.g. from the control loop, and read `state`
+     from any thread.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, network, interval=0.25, window=40, stale_after=1.0,
+                 max_loss=0.25, degraded_divisor=4, congested_rtt=0.5):
+        """Initialize link monitor
+
+        `network`: `Network` to send heartbeats over
+        `interval` - `float`: Seconds between heartbeats, NetworkTables
+         only sends values every 100 ms or so, faster heartbeats would be
+         lost on the way
+        `window` - `int`: Loss is measured over this many heartbeats
+        `stale_after` - `float`: Seconds without an echo after which the
+         link is degraded
+        `max_loss` - `float`: Loss above which the link is degraded
+        `degraded_divisor` - `int`: While degraded, `should_publish` is
+         `True` once per this many calls
+        `congested_rtt` - `float`: Round trip time, in seconds, above
+         which the link is congested. NetworkTables' send interval each
+         way puts up to 200 ms on a healthy link's round trip, so this
+         is well above that. With each heartbeat the network's
+         write budget is adapted to whether the link is congested, see
+         `Network.adapt_write_budget`
+        """
+        self.network = network
+        self.interval = interval
+        self.window = window
+        self.stale_after = stale_after
+        self.max_loss = max_loss
+        self.degraded_divisor = degraded_divisor
+        self.congested_rtt = congested_rtt
+
+        self.state = NO_ECHO
+        self.degraded = False
+
+        self._sequence = 0
+        self._last_send = float('-inf')
+        self._last_echo = 0
+        # Last heartbeat sent before the network last switched servers
+        self._first_sequence = 0
+        # Set from the switching thread, reset on the next `tick`
+        self._reset_pending = False
+        # When each of the last `window` heartbeats was sent, and if
+        #  it was echoed, by sequence number modulo `window`
+        self._send_times = array('d', bytes(8 * window))
+        self._echoed = bytearray(window)
+        self._publish_count = 0
+
+        bind_listeners = getattr(network, 'bind_listeners', None)
+        if isinstance(bind_listeners, list):
+            bind_listeners.append(self.reset)
+
+    def reset(self):
+        """Start measuring afresh, called when the network switches
+         servers, from any thread"""
+        self._reset_pending = True
+
+    def _reset(self):
+        # Heartbeats keep counting up, so echoes the new server holds
+        #  from an earlier connection are too old to count
+        self._reset_pending = False
+        self._first_sequence = self._last_echo = self._sequence
+        self._last_send = float('-inf')
+        self._echoed = bytearray(self.window)
+        self.state = NO_ECHO
+        self.degraded = False
+
+    def tick(self, now: float):
+        """Send a heartbeat if one is due and check for its echo,
+         returns `True` if `state` changed"""
+        table = self.network.table
+        changed = False
+        if self._reset_pending:
+            self._reset()
+            changed = True
+
+        echo = int(table.getNumber(ECHO_KEY, 0))
+        if self._last_echo < echo <= self._sequence and (
+                self._sequence - echo < self.window):
+            if self.state.echo_time is None:
+                # Heartbeats before the first echo went to robot code
+                #  that wasn't echoing yet, they weren't lost
+                self._first_sequence = echo - 1
+            self._last_echo = echo
+            slot = echo % self.window
+            self._echoed[slot] = 1
+            self.state = LinkState(now - self._send_times[slot],
+                                   self._loss(), now)
+            changed = True
+
+        if now - self._last_send >= self.interval:
+            self._sequence += 1
+            slot = self._sequence % self.window
+            self._send_times[slot] = now
+            self._echoed[slot] = 0
+            self._last_send = now
+            table.putNumber(HEARTBEAT_KEY, self._sequence)
+
+        # Robot code that never echoes can't be measured, and isn't
+        #  treated as degraded
+        staleness = self.state.staleness(now)
+        degraded = staleness is not None and (
+            staleness > self.stale_after or self.state.loss > self.max_loss)
+        if degraded != self.degraded:
+            self.degraded = degraded
+            changed = True
+
+        if self._last_send == now and self.state.echo_time is not None:
+            self.network.adapt_write_budget(
+                degraded or self.state.rtt > self.congested_rtt)
+        return changed
+
+    def _loss(self) -> float:
+        """Fraction of heartbeats in the window, old enough to have been
+         echoed, that weren't"""
+        count = min(self._last_echo - self._first_sequence, self.window)
+        echoed = sum(self._echoed[(self._last_echo - back) % self.window]
+                     for back in range(count))
+        return 1.0 - echoed / count if count else 0.0
+
+    def should_publish(self) -> bool:
+        """Should joysticks be published this tick, `False` for all
+         but one in `degraded_divisor` ticks while the link is degraded,
+         so a struggling link isn't flooded"""
+        if not self.degraded:
+            return True
+        self._publish_count += 1
+        return self._publish_count % self.degraded_divisor == 0
+
+
+def monitor_network(network, **kwargs) -> dict:
+    """Returns a `LinkMonitor` per robot of `network`, by robot name,
+     or by `None` for a `Network` driving one robot
+
+    Robots of a `RobotFleet` get their monitor as `link_monitor`, so
+     the fleet can throttle each robot on its own. `kwargs` are passed
+     on to each `LinkMonitor`.
+    """
+    robots = getattr(network, 'robots', None)
+    if robots is None:
+        return {None: LinkMonitor(network, **kwargs)}
+
+    monitors = {}
+    for name, link in robots.items():
+        link.link_monitor = LinkMonitor(link.network, **kwargs)
+        monitors[name] = link.link_monitor
+    return monitors
+
+
+class HeartbeatEcho:
+    """Echoes heartbeats as robot code should, copying `/heartbeat`
+     to `/heartbeat-echo` in `table`
+
+    `delay` and `loss` simulate a slow or lossy link.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, table, delay=0.0, loss=0.0, clock=time.monotonic,
+                 rng=None):
+        self.table = table
+        self.delay = delay
+        self.loss = loss
+        self._clock = clock
+        self._random = rng if rng is not None else random.Random()
+        self._last_heartbeat = 0
+        # `(due time, heartbeat)` waiting out `delay`
+        self._pending = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Echo heartbeats that have arrived and waited out `delay`"""
+        now = self._clock()
+        heartbeat = int(self.table.getNumber(HEARTBEAT_KEY, 0))
+        if heartbeat != self._last_heartbeat:
+            self._last_heartbeat = heartbeat
+            if self._random.random() >= self.loss:
+                self._pending.append((now + self.delay, heartbeat))
+
+        while self._pending and self._pending[0][0] <= now:
+            self.table.putNumber(ECHO_KEY, self._pending.pop(0)[1])
+
+    def start(self, interval=0.005):
+        """Poll every `interval` seconds on a thread of its own"""
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval):
+                self.poll()
+
+        self._thread = threading.Thread(target=run, name="HeartbeatEcho",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
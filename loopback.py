@@ -0,0 +1,197 @@
+"""In-process NetworkTables stand-in, for measuring the driver station
+ end to end without a robot or a network
+
+`LoopbackNetworkTables` takes the place of a NetworkTables client
+ instance. Like a real client it keeps only the latest value of each
+ entry and sends what changed to the server every `update_rate`
+ seconds, or straight away on `flush`. Sent values reach the
+ `LoopbackServer` after a one way `latency`, where robot side
+ subscribers are told about them with their arrival time.
+"""
+
+import threading
+import time
+
+# pynetworktables' default seconds between sends
+DEFAULT_UPDATE_RATE = 0.1
+
+
+class LoopbackServer:
+    """NetworkTables server stand-in, holding the latest value of
+     every entry and telling subscribers about each update"""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.entries = {}
+        self._subscribers = []
+        # Entry updates received, and batches they came in
+        self.entries_received = 0
+        self.batches_received = 0
+
+    def subscribe(self, callback):
+        """Call `callback` with key, value and arrival time of every
+         entry update, from the sending client's thread"""
+        self._subscribers.append(callback)
+
+    def receive(self, updates: dict):
+        """Apply `updates`, values by key, sent by a client"""
+        now = self._clock()
+        with self._lock:
+            self.entries.update(updates)
+            self.entries_received += len(updates)
+            self.batches_received += 1
+        for callback in self._subscribers:
+            for key, value in updates.items():
+                callback(key, value, now)
+
+
+class LoopbackTable:
+    """Table of a `LoopbackNetworkTables`, with the put and get methods
+     of a NetworkTables table"""
+
+    def __init__(self, client):
+        self._client = client
+
+    # pylint: disable=invalid-name,missing-docstring
+    def putNumber(self, key, value):
+        self._client.put(key, value)
+
+    def putBoolean(self, key, value):
+        self._client.put(key, value)
+
+    def putString(self, key, value):
+        self._client.put(key, value)
+
+    def putNumberArray(self, key, value):
+        # Later changes to the caller's sequence mustn't change the entry
+        self._client.put(key, tuple(value))
+
+    def getNumber(self, key, default):
+        return self._client.server.entries.get(key, default)
+
+
+class LoopbackNetworkTables:
+    """NetworkTables client instance stand-in, sending to a
+     `LoopbackServer` from a thread of its own"""
+
+    def __init__(self, server, update_rate=DEFAULT_UPDATE_RATE, latency=0.0):
+        self.server = server
+        self.update_rate = update_rate
+        self.latency = latency
+
+        self._lock = threading.Lock()
+        # Latest value of each entry changed since the last send
+        self._pending = {}
+        # Entry writes made by the driver station
+        self.writes = 0
+
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # pylint: disable=invalid-name,unused-argument
+    def initialize(self, server=None):
+        """Start sending to the server"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name="LoopbackNetworkTables",
+                                        daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Send what's left and stop sending"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._flush_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def isConnected(self):
+        """Is the client sending to the server"""
+        return self._thread is not None
+
+    def getTable(self, name):
+        """Returns the table `name`, all tables share entries"""
+        return LoopbackTable(self)
+
+    def flush(self):
+        """Send changed entries now, rather than at the next update"""
+        self._flush_event.set()
+
+    def put(self, key, value):
+        """Set entry `key`, sent with the next update"""
+        with self._lock:
+            self._pending[key] = value
+            self.writes += 1
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.update_rate)
+            self._flush_event.clear()
+            self._send()
+        self._send()
+
+    def _send(self):
+        with self._lock:
+            updates = self._pending
+            self._pending = {}
+        if not updates:
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        self.server.receive(updates)
+
+
+class ProbeSubscriber:
+    """Robot side subscriber timing how long values of one entry take
+     to reach the robot after they were set
+
+    A value counts as reaching the robot when it, or a value set after
+     it, arrives. Values replaced before they were sent never arrive
+     themselves, `delivered_count` counts those that did.
+    """
+
+    def __init__(self, server, key, index=None):
+        """Watch entry `key` of `server`, element `index` of it for
+         number arrays"""
+        self.key = key
+        self.index = index
+        self._lock = threading.Lock()
+        # Set time of each value not seen yet
+        self._expected = {}
+        # Seconds from set until the robot saw it or a later value
+        self.latencies = []
+        self.expected_count = 0
+        self.delivered_count = 0
+        server.subscribe(self._on_update)
+
+    def expect(self, value, set_time: float):
+        """Note `value` was set at `set_time`, by the server's clock"""
+        with self._lock:
+            self._expected[value] = set_time
+            self.expected_count += 1
+
+    def _on_update(self, key, value, arrival_time):
+        if key != self.key:
+            return
+        if self.index is not None:
+            if self.index >= len(value):
+                return
+            value = value[self.index]
+        with self._lock:
+            set_time = self._expected.get(value)
+            if set_time is None:
+                return
+            self.delivered_count += 1
+            # Values set before this one were replaced by it
+            waiting = {}
+            for expected_value, expected_time in self._expected.items():
+                if expected_time <= set_time:
+                    self.latencies.append(arrival_time - expected_time)
+                else:
+                    waiting[expected_value] = expected_time
+            self._expected = waiting
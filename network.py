@@ -1,31 +1,765 @@
 """Networking for driver station"""
 
+import sys
+import threading
+import time
+from array import array
+
+
+class WriteStats:  # (Too few public methods) pylint: disable=R0903
+    """Counters of joystick writes sent to/withheld from NetworkTables"""
+
+    __slots__ = ('published', 'suppressed', 'deferred')
+
+    def __init__(self):
+        self.published = 0
+        self.suppressed = 0
+        # Writes put off to a later tick by `Network.write_budget`
+        self.deferred = 0
+
+
+class JoystickChannel:
+    """Prebound NetworkTables publishers for one joystick
+
+    Keys are built once for the joystick's layout, so publishing
+     does no string formatting. Get one from `Network.joystick_channel`.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, network, joystick_number: int, num_axes: int,
+                 num_buttons: int, num_povs=0):
+        self._network = network
+        self.joystick_number = joystick_number
+        self.num_axes = num_axes
+        self.num_buttons = num_buttons
+        self.num_povs = num_povs
+
+        prefix = "/joystick-" + str(joystick_number)
+        self.axis_keys = tuple(
+            sys.intern(prefix + "/axis-" + str(axis))
+            for axis in range(num_axes))
+        self.button_keys = tuple(
+            sys.intern(prefix + "/button-" + str(button))
+            for button in range(num_buttons))
+        self.pov_keys = tuple(
+            sys.intern(prefix + "/pov-" + str(pov))
+            for pov in range(num_povs))
+
+        self._axis_values = array('d', bytes(8 * num_axes))
+        self._axis_times = array('d', bytes(8 * num_axes))
+        self._button_values = [False] * num_buttons
+        self._button_times = array('d', bytes(8 * num_buttons))
+        self._pov_values = array('h', bytes(2 * num_povs))
+        self._pov_times = array('d', bytes(8 * num_povs))
+
+        self.bind(network.table)
+
+    def bind(self, table):
+        """Bind publishers to `table` and forget what was last published"""
+        self._put_number = table.putNumber
+        self._put_boolean = table.putBoolean
+        self.reset()
+
+    def reset(self):
+        """Forget published values so each is sent on its next write"""
+        never = float('-inf')
+        for axis in range(self.num_axes):
+            self._axis_times[axis] = never
+        for button in range(self.num_buttons):
+            self._button_times[button] = never
+        for pov in range(self.num_povs):
+            self._pov_times[pov] = never
+
+    def zero(self, table):
+        """Write centered axes, released buttons and centered POVs
+         straight to `table`, leaving what was last published alone"""
+        for key in self.axis_keys:
+            table.putNumber(key, 0.0)
+        for key in self.button_keys:
+            table.putBoolean(key, False)
+        for key in self.pov_keys:
+            table.putNumber(key, -1)
+
+    def set_axis(self, axis: int, value: float):
+        """Publish `value` for `axis` if it changed enough to matter
+
+        The value is only sent if it moved by more than `axis_threshold`
+         since it was last sent, if it returned to center, or if
+         `keyframe_interval` has passed.
+        """
+        network = self._network
+        now = network.clock()
+        last_value = self._axis_values[axis]
+        if value == last_value or (
+                value != 0.0 and
+                abs(value - last_value) <= network.axis_threshold):
+            if now - self._axis_times[axis] < network.keyframe_interval:
+                network.write_stats.suppressed += 1
+                return
+            if not network.take_write(refresh=True):
+                return
+        elif not network.take_write():
+            return
+
+        self._put_number(self.axis_keys[axis], value)
+        self._axis_values[axis] = value
+        self._axis_times[axis] = now
+        network.write_stats.published += 1
+
+    def set_button(self, button: int, value: bool):
+        """Publish `value` for `button` if it changed
+
+        The value is only sent if the button changed since it was last
+         sent, or if `keyframe_interval` has passed.
+        """
+        network = self._network
+        now = network.clock()
+        if value == self._button_values[button]:
+            if now - self._button_times[button] < network.keyframe_interval:
+                network.write_stats.suppressed += 1
+                return
+            if not network.take_write(refresh=True):
+                return
+        elif not network.take_write():
+            return
+
+        self._put_boolean(self.button_keys[button], value)
+        self._button_values[button] = value
+        self._button_times[button] = now
+        network.write_stats.published += 1
+
+    def set_pov(self, pov: int, angle: int):
+        """Publish `angle` for `pov` if it changed
+
+        The angle is only sent if it changed since it was last
+         sent, or if `keyframe_interval` has passed.
+        """
+        network = self._network
+        now = network.clock()
+        if angle == self._pov_values[pov]:
+            if now - self._pov_times[pov] < network.keyframe_interval:
+                network.write_stats.suppressed += 1
+                return
+            if not network.take_write(refresh=True):
+                return
+        elif not network.take_write():
+            return
+
+        self._put_number(self.pov_keys[pov], angle)
+        self._pov_values[pov] = angle
+        self._pov_times[pov] = now
+        network.write_stats.published += 1
+
+    def publish(self, axes, buttons):
+        """Publish a full joystick state, `axes` and `buttons` are
+         sequences as returned by `Joysticks.get_joystick`
+        """
+        for axis, value in enumerate(axes):
+            self.set_axis(axis, value)
+        for button, value in enumerate(buttons):
+            self.set_button(button, value)
+
+    def publish_state(self, axes, button_mask: int, povs=()):
+        """Publish a full joystick state, `axes` is a sequence of axis
+         positions, `button_mask` has bit `n` set when button `n`
+         is pressed and `povs` is a sequence of POV angles, as in a
+         `JoystickSnapshot`
+        """
+        for axis, value in enumerate(axes):
+            self.set_axis(axis, value)
+        for button in range(self.num_buttons):
+            self.set_button(button, (button_mask >> button) & 1 == 1)
+        for pov, angle in enumerate(povs):
+            self.set_pov(pov, angle)
+
+
+class PackedJoystickChannel:
+    """Prebound NetworkTables publishers for one joystick, publishing
+     all axes as one number array (`/joystick-N/axes`), all buttons
+     as one bitmask (`/joystick-N/buttons`) and all POV angles as one
+     number array (`/joystick-N/povs`)
+
+    `/joystick-N/layout` holds `[num_axes, num_buttons, num_povs]`, and
+     `/layout-version` changes whenever any joystick's layout does.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, network, joystick_number: int, num_axes: int,
+                 num_buttons: int, num_povs=0):
+        self._network = network
+        self.joystick_number = joystick_number
+        self.num_axes = num_axes
+        self.num_buttons = num_buttons
+        self.num_povs = num_povs
+
+        prefix = "/joystick-" + str(joystick_number)
+        self.axes_key = sys.intern(prefix + "/axes")
+        self.buttons_key = sys.intern(prefix + "/buttons")
+        self.povs_key = sys.intern(prefix + "/povs")
+        self.layout_key = sys.intern(prefix + "/layout")
+
+        self._axis_values = array('d', bytes(8 * num_axes))
+        self._axes_time = float('-inf')
+        self._button_mask = 0
+        self._buttons_time = float('-inf')
+        self._pov_values = array('h', bytes(2 * num_povs))
+        self._povs_time = float('-inf')
+
+        self.bind(network.table)
+
+    def bind(self, table):
+        """Bind publishers to `table` and forget what was last published"""
+        self._put_number = table.putNumber
+        self._put_number_array = table.putNumberArray
+        self.reset()
+
+    def reset(self):
+        """Forget published values so each is sent on its next write"""
+        self._axes_time = float('-inf')
+        self._buttons_time = float('-inf')
+        self._povs_time = float('-inf')
+        self._put_number_array(self.layout_key,
+                               (self.num_axes, self.num_buttons,
+                                self.num_povs))
+
+    def zero(self, table):
+        """Write centered axes, released buttons and centered POVs
+         straight to `table`, leaving what was last published alone"""
+        table.putNumberArray(self.axes_key, (0.0,) * self.num_axes)
+        table.putNumber(self.buttons_key, 0)
+        if self.num_povs:
+            table.putNumberArray(self.povs_key, (-1,) * self.num_povs)
+
+    def _axes_changed(self, axes) -> bool:
+        """Has any axis moved by more than `axis_threshold`
+         or returned to center
+        """
+        threshold = self._network.axis_threshold
+        last_values = self._axis_values
+        for axis, value in enumerate(axes):
+            last_value = last_values[axis]
+            if value != last_value and (
+                    value == 0.0 or abs(value - last_value) > threshold):
+                return True
+        return False
+
+    def _publish_axes(self, now):
+        self._put_number_array(self.axes_key, tuple(self._axis_values))
+        self._axes_time = now
+        self._network.write_stats.published += 1
+
+    def _publish_buttons(self, now):
+        self._put_number(self.buttons_key, self._button_mask)
+        self._buttons_time = now
+        self._network.write_stats.published += 1
+
+    def _publish_povs(self, now):
+        self._put_number_array(self.povs_key, tuple(self._pov_values))
+        self._povs_time = now
+        self._network.write_stats.published += 1
+
+    def set_axis(self, axis: int, value: float):
+        """Set `axis` to `value` and publish the axes array if needed"""
+        network = self._network
+        now = network.clock()
+        last_value = self._axis_values[axis]
+        if value == last_value or (
+                value != 0.0 and
+                abs(value - last_value) <= network.axis_threshold):
+            if now - self._axes_time < network.keyframe_interval:
+                network.write_stats.suppressed += 1
+                return
+            if not network.take_write(refresh=True):
+                return
+        elif not network.take_write():
+            return
+
+        self._axis_values[axis] = value
+        self._publish_axes(now)
+
+    def set_button(self, button: int, value: bool):
+        """Set `button` to `value` and publish the bitmask if needed"""
+        if value:
+            mask = self._button_mask | (1 << button)
+        else:
+            mask = self._button_mask & ~(1 << button)
+        self._set_buttons(mask, self._network.clock())
+
+    def _set_buttons(self, mask: int, now):
+        network = self._network
+        if mask == self._button_mask:
+            if now - self._buttons_time < network.keyframe_interval:
+                network.write_stats.suppressed += 1
+                return
+            if not network.take_write(refresh=True):
+                return
+        elif not network.take_write():
+            return
+
+        self._button_mask = mask
+        self._publish_buttons(now)
+
+    def set_pov(self, pov: int, angle: int):
+        """Set `pov` to `angle` and publish the POV array if needed"""
+        network = self._network
+        now = network.clock()
+        if angle == self._pov_values[pov]:
+            if now - self._povs_time < network.keyframe_interval:
+                network.write_stats.suppressed += 1
+                return
+            if not network.take_write(refresh=True):
+                return
+        elif not network.take_write():
+            return
+
+        self._pov_values[pov] = angle
+        self._publish_povs(now)
+
+    def publish(self, axes, buttons):
+        """Publish a full joystick state, `axes` and `buttons` are
+         sequences as returned by `Joysticks.get_joystick`
+        """
+        mask = 0
+        for button, value in enumerate(buttons):
+            if value:
+                mask |= 1 << button
+        self.publish_state(axes, mask)
+
+    def publish_state(self, axes, button_mask: int, povs=()):
+        """Publish a full joystick state, `axes` is a sequence of axis
+         positions, `button_mask` has bit `n` set when button `n`
+         is pressed and `povs` is a sequence of POV angles, as in a
+         `JoystickSnapshot`
+        """
+        network = self._network
+        now = network.clock()
+        if self._axes_changed(axes):
+            publish = network.take_write()
+        elif now - self._axes_time < network.keyframe_interval:
+            network.write_stats.suppressed += 1
+            publish = False
+        else:
+            publish = network.take_write(refresh=True)
+        if publish:
+            last_values = self._axis_values
+            for axis, value in enumerate(axes):
+                last_values[axis] = value
+            self._publish_axes(now)
+
+        self._set_buttons(button_mask, now)
+
+        if self.num_povs:
+            last_povs = self._pov_values
+            if not all(angle == last_povs[pov]
+                       for pov, angle in enumerate(povs)):
+                publish = network.take_write()
+            elif now - self._povs_time < network.keyframe_interval:
+                network.write_stats.suppressed += 1
+                publish = False
+            else:
+                publish = network.take_write(refresh=True)
+            if publish:
+                for pov, angle in enumerate(povs):
+                    last_povs[pov] = angle
+                self._publish_povs(now)
+
+
+# Joystick channel class used for each publish mode. 'channels' publishes
+#  every axis and button as its own entry, 'packed' publishes one axes
+#  array and one button bitmask per joystick
+PUBLISH_MODES = {
+    'channels': JoystickChannel,
+    'packed': PackedJoystickChannel
+}
+
+# Seconds between connection checks while switching servers
+CONNECT_POLL_INTERVAL = 0.05
+
+# Fewest joystick writes per tick an adapted `write_budget` goes down to
+MIN_WRITE_BUDGET = 8
+# Writes per tick added back to `write_budget` for each sign the link
+#  isn't congested
+WRITE_BUDGET_STEP = 4
+
 
 class Network:
     """NetworkTables wrapper for driver station"""
 
-    def __init__(self, networktables, table_name, server_ip):
+    # pylint: disable=too-many-arguments
+    def __init__(self, networktables, table_name, server_ip,
+                 axis_threshold=0.0, keyframe_interval=1.0,
+                 clock=time.monotonic, publish_mode='channels',
+                 instance_factory=None, switch_timeout=5.0, max_standbys=3,
+                 max_write_budget=256):
         """Initialize network
 
         `networktables`: Reference to NetworkTables or mock of NetworkTables
         `table_name` - `str`: Name of NetworkTables table to communicate over
         `server_ip` - `str`: Ip of NetworkTables server to connect to
+        `axis_threshold` - `float`: Axis changes smaller than this are
+         not published
+        `keyframe_interval` - `float`: Seconds after which a joystick value
+         is republished even if it hasn't changed
+        `clock`: Monotonic time source, in seconds
+        `publish_mode` - `str`: How joysticks are laid out in NetworkTables,
+         one of `PUBLISH_MODES`
+        `instance_factory`: Returns a new NetworkTables instance, e.g.
+         `NetworkTablesInstance.create`. Needed by `change_server_async`
+         to connect to a new server while the old one is still used,
+         and by `warm_standby`
+        `switch_timeout` - `float`: Seconds `change_server_async` waits for
+         the new server before switching to it anyway
+        `max_standbys` - `int`: Most servers kept connected by
+         `warm_standby`, the least recently used is dropped first
+        `max_write_budget` - `int`: `adapt_write_budget` lifts the write
+         budget altogether once it grows past this
         """
+        if publish_mode not in PUBLISH_MODES:
+            raise ValueError("Unknown publish mode: " + str(publish_mode))
+
         self.networktables = networktables
 
         self.table_name = table_name
 
+        self.axis_threshold = axis_threshold
+        self.keyframe_interval = keyframe_interval
+        self.clock = clock
+        self.publish_mode = publish_mode
+        self._channel_class = PUBLISH_MODES[publish_mode]
+
+        self.instance_factory = instance_factory
+        self.switch_timeout = switch_timeout
+        self.max_standbys = max_standbys
+        self.server_ip = None
+
+        # Connected NetworkTables instances by server ip, least recently
+        #  used first
+        self._standbys = {}
+        # Incremented by each server switch, so a switch still waiting
+        #  for its server can tell it's been overtaken
+        self._switch_generation = 0
+        self._closing = threading.Event()
+
+        # Last mode and enabled state set, sent to each new server
+        self._mode = None
+        self._enabled = None
+
+        # Incremented whenever a joystick's layout changes
+        self.layout_version = 0
+
+        self.write_stats = WriteStats()
+
+        # Joystick writes allowed per `publish_snapshot`, `None` for no
+        #  limit. Changed values are sent before unchanged values due a
+        #  refresh, which only get the first quarter of the budget.
+        #  Mode and enabled are never held back.
+        self.write_budget = None
+        self.max_write_budget = max_write_budget
+        self._budget_left = None
+        self._refresh_floor = 0
+        # Joystick writes sent by the latest `publish_snapshot`
+        self.last_snapshot_writes = 0
+        # Set by `zero_joysticks`, the next snapshot is sent in full
+        self._keyframe_pending = False
+
+        # Publishers for each joystick, by joystick number
+        self._channels = {}
+
+        # Called with no arguments whenever publishers are pointed at a
+        #  new server, from the thread switching servers
+        self.bind_listeners = []
+
+        # Held while publishing joysticks or switching servers, so
+        # joysticks can be published from a control loop thread
+        self.lock = threading.RLock()
+        # Held while writing mode or enabled, or switching tables, but
+        #  not while publishing joysticks, so a disable never waits
+        #  behind joystick writes
+        self._safety_lock = threading.Lock()
+
         # Connect to server
         self.change_server(server_ip)
 
+    @property
+    def published_writes(self) -> int:
+        """Number of joystick writes sent to NetworkTables"""
+        return self.write_stats.published
+
+    @property
+    def suppressed_writes(self) -> int:
+        """Number of joystick writes withheld because nothing changed"""
+        return self.write_stats.suppressed
+
     def change_server(self, new_ip):
         """Connect to different NetworkTables server
 
         `new_ip`: IP of new NetworkTables server to connect to
         """
-        self.networktables.shutdown()
-        self.networktables.initialize(server=new_ip)
-        self.table = self.networktables.getTable(self.table_name)
+        with self.lock:
+            self._switch_generation += 1
+            self.networktables.shutdown()
+            self.networktables.initialize(server=new_ip)
+            self.server_ip = new_ip
+            self._bind(self.networktables)
+
+    def change_server_async(self, new_ip, on_switched=None):
+        """Connect to a different NetworkTables server in the background
+
+        Joysticks keep being published to the current server until the
+         new one is connected, or `switch_timeout` passes, then every
+         publisher is switched over at once. The old server is kept as a
+         warm standby. Without an `instance_factory` the switch is made
+         as `change_server` does, but still off the calling thread.
+
+        `new_ip`: IP of new NetworkTables server to connect to
+        `on_switched`: Called with `new_ip` and whether it's connected
+         once switched, from the background thread. Not called if another
+         switch is started first.
+        """
+        with self.lock:
+            self._switch_generation += 1
+            generation = self._switch_generation
+
+        thread = threading.Thread(
+            target=self._switch_server, args=(new_ip, generation, on_switched),
+            name="Network-switch", daemon=True)
+        thread.start()
+        return thread
+
+    def _switch_server(self, new_ip, generation, on_switched):
+        if self.instance_factory is None:
+            with self.lock:
+                if generation != self._switch_generation:
+                    return
+                self.change_server(new_ip)
+                # Keep our generation, `change_server` is part of this switch
+                self._switch_generation = generation
+            connected = self.connected()
+        else:
+            instance = self._take_standby(new_ip)
+            deadline = self.clock() + self.switch_timeout
+            while (not instance.isConnected() and self.clock() < deadline and
+                   generation == self._switch_generation and
+                   not self._closing.wait(CONNECT_POLL_INTERVAL)):
+                pass
+
+            with self.lock:
+                if (generation != self._switch_generation or
+                        self._closing.is_set()):
+                    self._add_standby(new_ip, instance)
+                    return
+                old_ip, old_instance = self.server_ip, self.networktables
+                self.networktables = instance
+                self.server_ip = new_ip
+                self._bind(instance)
+                if old_ip == new_ip:
+                    # Reconnecting to the same server
+                    old_instance.shutdown()
+                else:
+                    self._add_standby(old_ip, old_instance)
+            connected = instance.isConnected()
+
+        if on_switched is not None:
+            on_switched(new_ip, connected)
+
+    def warm_standby(self, server_ip):
+        """Start connecting to `server_ip` now, so a later
+         `change_server_async` to it is near-instant
+
+        Does nothing without an `instance_factory`, or for the
+         current server.
+        """
+        if self.instance_factory is None:
+            return
+        with self.lock:
+            if server_ip == self.server_ip or server_ip in self._standbys:
+                return
+        instance = self.instance_factory()
+        instance.initialize(server=server_ip)
+        self._add_standby(server_ip, instance)
+
+    @property
+    def standby_ips(self) -> list:
+        """IPs of servers kept connected by `warm_standby`, least
+         recently used first"""
+        with self.lock:
+            return list(self._standbys)
+
+    def _take_standby(self, server_ip):
+        """Returns a connected or connecting NetworkTables instance
+         for `server_ip`, a standby if there is one"""
+        with self.lock:
+            instance = self._standbys.pop(server_ip, None)
+        if instance is None:
+            instance = self.instance_factory()
+            instance.initialize(server=server_ip)
+        return instance
+
+    def _add_standby(self, server_ip, instance):
+        with self.lock:
+            previous = self._standbys.pop(server_ip, None)
+            if previous is not None and previous is not instance:
+                previous.shutdown()
+            if self._closing.is_set() or server_ip is None:
+                instance.shutdown()
+                return
+            self._standbys[server_ip] = instance
+            while len(self._standbys) > self.max_standbys:
+                oldest_ip = next(iter(self._standbys))
+                self._standbys.pop(oldest_ip).shutdown()
+
+    def _bind(self, networktables):
+        """Point every publisher at `networktables`, call with `lock` held"""
+        with self._safety_lock:
+            self.table = networktables.getTable(self.table_name)
+            if self._mode is not None:
+                self.table.putString("/mode", self._mode)
+            if self._enabled is not None:
+                self.table.putBoolean("/enabled", self._enabled)
+
+        # New server has none of our values
+        for channel in self._channels.values():
+            channel.bind(self.table)
+        self._publish_layout_version()
+
+        # Congestion of the old link says nothing about the new one
+        self.write_budget = None
+        for listener in self.bind_listeners:
+            listener()
+
+    def _publish_layout_version(self):
+        if self.publish_mode == 'packed':
+            self.table.putNumber("/layout-version", self.layout_version)
+
+    def take_write(self, refresh=False) -> bool:
+        """Returns whether a joystick write fits in what's left of
+         `write_budget` this tick, and uses it up if so
+
+        `refresh`: The write resends an unchanged value
+        """
+        budget_left = self._budget_left
+        if budget_left is None:
+            return True
+        if budget_left <= (self._refresh_floor if refresh else 0):
+            self.write_stats.deferred += 1
+            return False
+        self._budget_left = budget_left - 1
+        return True
+
+    def adapt_write_budget(self, congested: bool):
+        """Halve `write_budget` when the link is `congested`, grow it back
+         by `WRITE_BUDGET_STEP` when it isn't
+
+        The first congestion limits writes to half of what the latest
+         tick sent. Growing past `max_write_budget` removes the limit.
+        """
+        with self.lock:
+            if self._keyframe_pending:
+                self._keyframe_pending = False
+                for channel in self._channels.values():
+                    channel.reset()
+            budget = self.write_budget
+            if congested:
+                if budget is None:
+                    budget = self.last_snapshot_writes
+                budget = max(MIN_WRITE_BUDGET, budget // 2)
+            elif budget is not None:
+                budget += WRITE_BUDGET_STEP
+                if budget > self.max_write_budget:
+                    budget = None
+            self.write_budget = budget
+
+    def zero_joysticks(self):
+        """Center every joystick in NetworkTables straight away, without
+         waiting for joystick publishing to finish
+
+        The next snapshot published is sent in full.
+        """
+        with self._safety_lock:
+            table = self.table
+            for channel in list(self._channels.values()):
+                channel.zero(table)
+            self._keyframe_pending = True
+            self.networktables.flush()
+
+    def force_keyframe(self):
+        """Forget previously published joystick values so the
+         next write of every joystick value is sent to NetworkTables
+        """
+        with self.lock:
+            for channel in self._channels.values():
+                channel.reset()
+
+    def joystick_channel(self, joystick_number: int, num_axes: int,
+                         num_buttons: int, num_povs=0):
+        """Returns publishers for joystick `joystick_number`, a
+         `JoystickChannel` or `PackedJoystickChannel` depending on
+         `publish_mode`
+
+        The channel is cached, and only rebuilt when `num_axes`,
+         `num_buttons` or `num_povs` differ from the cached layout.
+        """
+        channel = self._channels.get(joystick_number)
+        if (channel is None or channel.num_axes != num_axes or
+                channel.num_buttons != num_buttons or
+                channel.num_povs != num_povs):
+            channel = self._channel_class(self, joystick_number, num_axes,
+                                          num_buttons, num_povs)
+            self._channels[joystick_number] = channel
+            self.layout_version += 1
+            self._publish_layout_version()
+        return channel
+
+    def publish_snapshot(self, snapshot, joystick_numbers=None,
+                         joystick_map=None):
+        """Publish joysticks in `snapshot`, a `JoystickSnapshot`
+
+        `joystick_numbers`: Joysticks to publish, all when `None`
+        `joystick_map`: Snapshot joystick numbers to publish as joysticks
+         0, 1, 2..., when `None` joysticks keep their snapshot numbers.
+         Mapped joysticks missing from `snapshot` are skipped.
+        """
+        num_joysticks = len(snapshot.axes)
+        if joystick_map is None:
+            if joystick_numbers is None:
+                joystick_numbers = range(num_joysticks)
+            joystick_pairs = zip(joystick_numbers, joystick_numbers)
+        else:
+            joystick_pairs = (
+                (published_number, joystick_number)
+                for published_number, joystick_number in enumerate(
+                    joystick_map)
+                if joystick_number < num_joysticks and
+                (joystick_numbers is None or
+                 joystick_number in joystick_numbers))
+
+        with self.lock:
+            if self._keyframe_pending:
+                self._keyframe_pending = False
+                for channel in self._channels.values():
+                    channel.reset()
+            budget = self.write_budget
+            self._budget_left = budget
+            if budget is not None:
+                self._refresh_floor = budget - budget // 4
+            published = self.write_stats.published
+            for published_number, joystick_number in joystick_pairs:
+                axes = snapshot.axes[joystick_number]
+                povs = snapshot.povs[joystick_number]
+                channel = self.joystick_channel(
+                    published_number, len(axes),
+                    snapshot.num_buttons[joystick_number], len(povs))
+                channel.publish_state(axes, snapshot.buttons[joystick_number],
+                                      povs)
+            self.last_snapshot_writes = self.write_stats.published - published
+            # Writes outside `publish_snapshot` aren't budgeted
+            self._budget_left = None
+
+    def remove_joystick_channel(self, joystick_number: int):
+        """Drop cached publishers for joystick `joystick_number`"""
+        if self._channels.pop(joystick_number, None) is not None:
+            self.layout_version += 1
+            self._publish_layout_version()
 
     def connected(self):
         """Is the network connected
@@ -39,29 +773,60 @@ class Network:
                                 value: float):
         """Set a NetworkTable value. Set the joystick axis specified
         by `joystick` and `axis` to `value`.
+
+        See `JoystickChannel.set_axis`, prefer using a channel directly.
         """
-        key = "/joystick-" + str(joystick_number) + "/axis-" + str(axis_number)
-        self.table.putNumber(key, value)
+        channel = self._channels.get(joystick_number)
+        if channel is None or axis_number >= channel.num_axes:
+            channel = self.joystick_channel(
+                joystick_number, axis_number + 1,
+                channel.num_buttons if channel else 0,
+                channel.num_povs if channel else 0)
+        channel.set_axis(axis_number, value)
 
     def set_joystick_button_value(self, joystick_number: int,
                                   button_number: int, value: bool):
         """Set a NetworkTable value. Set the joystick button specified
         by `joystick` and `button` to `value`.
+
+        See `JoystickChannel.set_button`, prefer using a channel directly.
         """
-        key = "/joystick-" + str(joystick_number) + \
-            "/button-" + str(button_number)
-        self.table.putBoolean(key, value)
+        channel = self._channels.get(joystick_number)
+        if channel is None or button_number >= channel.num_buttons:
+            channel = self.joystick_channel(
+                joystick_number, channel.num_axes if channel else 0,
+                button_number + 1, channel.num_povs if channel else 0)
+        channel.set_button(button_number, value)
 
     def set_game_mode(self, mode: str):
-        """Set the current game mode in NetworkTables"""
+        """Set the current game mode in NetworkTables
+
+        Sent straight away, ahead of joystick writes.
+        """
         key = "/mode"
-        self.table.putString(key, mode)
+        with self._safety_lock:
+            self._mode = mode
+            self.table.putString(key, mode)
+            self.networktables.flush()
 
     def set_enabled(self, enabled: bool):
-        """Set enabled status in NetworkTables"""
+        """Set enabled status in NetworkTables
+
+        Sent straight away, ahead of joystick writes.
+        """
         key = "/enabled"
-        self.table.putBoolean(key, enabled)
+        with self._safety_lock:
+            self._enabled = enabled
+            self.table.putBoolean(key, enabled)
+            self.networktables.flush()
 
     def shutdown(self):
         """Shutdown and release resources"""
+        self._closing.set()
+        with self.lock:
+            self._switch_generation += 1
+            standbys = list(self._standbys.values())
+            self._standbys.clear()
+        for instance in standbys:
+            instance.shutdown()
         self.networktables.shutdown()
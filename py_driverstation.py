@@ -3,278 +3,572 @@ Python-based driver station. Currently only for
  the Pigmice-variant of RobotPy for Raspberry Pi
 """
 
-import sys
+import argparse
 import configparser
+import io
+import os
+import stat
+import sys
+import tempfile
+import threading
 
-# No name ... in module ... - pylint seems to have trouble with PyQt
-# pylint: disable=E0611
-from PyQt5.QtWidgets import QAction, QApplication, QMainWindow, QStyle
-from PyQt5.QtCore import QTimer, QRect, QPoint, QSize, Qt
-from PyQt5.QtGui import QColor
-# pylint: enable=E0611
-
-import pygame
-import networktables
-
+from axis_processing import AxisPipeline, AxisProfile
+from controller_mapping import ControllerMapper, MappingStore
+from fleet import RobotFleet, RobotLink
+from instrumentation import StartupTimer
 from joysticks import Joysticks
 from network import Network
-from driverstation_ui.driverstation_ui import Ui_MainWindow
+from recording import Recorder, ReplayJoysticks
+
+# PyQt5, pygame and networktables are slow to import, so they're imported
+#  by `main` only once it knows they're needed
+
+# Config sections named '<ROBOT_SECTION_PREFIX><name>' each add a robot
+#  to drive at once
+ROBOT_SECTION_PREFIX = 'Robot '
+
+# Config sections named '<AXIS_SECTION_PREFIX><guid> <axis>' hold the
+#  `AxisProfile` of an axis of joysticks with that GUID
+AXIS_SECTION_PREFIX = 'Axis '
+
+# How many recently used robot ips are remembered, and kept connected
+#  as warm standbys
+RECENT_IP_COUNT = 3
+
+
+# How each setting is read from the config: section and type, `list`
+#  being comma separated strings
+SETTINGS = {
+    'remote_ip': ('NetworkTables', str),
+    'recent_ips': ('NetworkTables', list),
+    'axis_threshold': ('NetworkTables', float),
+    'keyframe_interval': ('NetworkTables', float),
+    'publish_mode': ('NetworkTables', str),
+    'loop_rate': ('ControlLoop', float),
+    'event_driven_input': ('ControlLoop', bool),
+    'watchdog_timeout': ('ControlLoop', float),
+    'shared_memory': ('ControlLoop', str),
+    'mapping_file': ('ControlLoop', str),
+    'instrumentation': ('ControlLoop', bool)
+}
+
+# Seconds config changes are held before being written, so a burst of
+#  changes is written once
+SAVE_DELAY = 1.0
+
+
+def _umask() -> int:
+    """Returns the process umask, which can only be read by setting it"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
 
 
 class DriverStationConfig:
-    """Driver station config"""
+    """Driver station config
+
+    The config file is parsed once into typed values, which properties
+     return without going back to `configparser`. `save_config` writes
+     changes from a thread of its own once `save_delay` seconds pass
+     without another change, replacing the file atomically so it's
+     never left half written. `reload_if_changed` picks up edits made
+     to the file while the driver station runs.
+    """
 
-    def __init__(self, config_file_name):
+    def __init__(self, config_file_name, save_delay=SAVE_DELAY):
         """Initialize config using `config_file_name` as source file
 
         Will create `config_file_name` if it doesn't already exist
         """
 
         self.config_file_name = config_file_name
-        self.config_parser = configparser.ConfigParser()
-        self.config_parser['DEFAULT'] = {'remote_ip': 'localhost'}
+        self.save_delay = save_delay
+
+        # Guards the parser and the values parsed from it
+        self._lock = threading.Lock()
+        # Held while the file is written or read back
+        self._file_lock = threading.Lock()
+        self._save_timer = None
+        # Are there changes not written yet
+        self._dirty = False
+        # `(mtime, size)` of the file as last written or read
+        self._file_stamp = None
 
         try:
-            self.config_parser.read_file(open(config_file_name))
+            self.config_parser = self._read()
         except FileNotFoundError:
-            self.config_parser['NetworkTables'] = {'remote_ip': 'localhost'}
-            self.save_config()
+            self.config_parser = self._new_parser()
+            self.config_parser['NetworkTables']['remote_ip'] = 'localhost'
+            self._dirty = True
+            self.flush()
+        self._values, self._robots, self._axis_profiles = self._parse(
+            self.config_parser)
+
+    @staticmethod
+    def _new_parser():
+        config_parser = configparser.ConfigParser()
+        config_parser['DEFAULT'] = {
+            'remote_ip': 'localhost',
+            'recent_ips': '',
+            'axis_threshold': '0.01',
+            'keyframe_interval': '1.0',
+            'publish_mode': 'channels',
+            'loop_rate': '100',
+            'instrumentation': 'yes',
+            'watchdog_timeout': '0.2',
+            'shared_memory': '',
+            'mapping_file': 'ds_mappings.json',
+            'event_driven_input': 'no'
+        }
+        # Sections added after the config file was created
+        for section in ('NetworkTables', 'ControlLoop'):
+            config_parser.add_section(section)
+        return config_parser
+
+    def _read(self):
+        """Returns a parser holding the config file, noting its stamp"""
+        config_parser = self._new_parser()
+        with open(self.config_file_name) as config_file:
+            stamp = os.fstat(config_file.fileno())
+            # Sections already there are merged into the empty ones
+            config_parser.read_file(config_file)
+        self._file_stamp = (stamp.st_mtime_ns, stamp.st_size)
+        return config_parser
+
+    @staticmethod
+    def _parse(config_parser):
+        """Returns values by setting name, robots and axis profiles
+         read from `config_parser`"""
+        values = {}
+        for name, (section, kind) in SETTINGS.items():
+            section = config_parser[section]
+            if kind is float:
+                values[name] = section.getfloat(name)
+            elif kind is bool:
+                values[name] = section.getboolean(name)
+            elif kind is list:
+                values[name] = [value.strip() for value
+                                in section[name].split(',') if value.strip()]
+            else:
+                values[name] = section[name]
+
+        robots = []
+        axis_profiles = {}
+        for section in config_parser.sections():
+            if section.startswith(ROBOT_SECTION_PREFIX):
+                robot_config = config_parser[section]
+                joysticks = robot_config.get('joysticks', '').strip()
+                joystick_map = (tuple(int(joystick)
+                                      for joystick in joysticks.split(','))
+                                if joysticks else None)
+                robots.append((section[len(ROBOT_SECTION_PREFIX):].strip(),
+                               robot_config['remote_ip'], joystick_map))
+            elif section.startswith(AXIS_SECTION_PREFIX):
+                guid, axis = section[len(AXIS_SECTION_PREFIX):].rsplit(' ', 1)
+                axis_config = config_parser[section]
+                axis_profiles.setdefault(guid, {})[int(axis)] = AxisProfile(
+                    deadband=axis_config.getfloat('deadband', 0.0),
+                    curve=axis_config.get('curve', 'linear'),
+                    expo=axis_config.getfloat('expo', 0.0),
+                    invert=axis_config.getboolean('invert', False),
+                    trim=axis_config.getfloat('trim', 0.0),
+                    minimum=axis_config.getfloat('min', -1.0),
+                    maximum=axis_config.getfloat('max', 1.0))
+        return values, robots, axis_profiles
+
+    def _set_option(self, name, value):
+        """Set setting `name` to string `value`"""
+        with self._lock:
+            self.config_parser[SETTINGS[name][0]][name] = value
+            self._values, self._robots, self._axis_profiles = self._parse(
+                self.config_parser)
+
+    def _set_section(self, section, options):
+        """Replace config section `section` with `options` by name"""
+        with self._lock:
+            self.config_parser[section] = options
+            self._values, self._robots, self._axis_profiles = self._parse(
+                self.config_parser)
+
+    @staticmethod
+    def _axis_sections(config_parser):
+        """Returns the options of each axis profile section, which
+         compare equal when the profiles do"""
+        return {section: dict(config_parser[section])
+                for section in config_parser.sections()
+                if section.startswith(AXIS_SECTION_PREFIX)}
 
     @property
     def remote_ip(self) -> str:
         """Get the remote robot ip from the config"""
-        return self.config_parser['NetworkTables']['remote_ip']
+        return self._values['remote_ip']
 
     @remote_ip.setter
     def remote_ip(self, new_ip: str):
         """Set the remote robot ip in the config"""
-        self.config_parser['NetworkTables']['remote_ip'] = new_ip
-
-    def save_config(self):
-        """Save config into `config_file_name`"""
-        with open(self.config_file_name, 'w') as config_file:
-            self.config_parser.write(config_file)
-
-
-class StatusIndicator:  # (Too few public methods) pylint: disable=R0903
-    """Controller for status indicator"""
-
-    def __init__(self, indicator_widget, status_colors):
-        self.widget = indicator_widget
-        self.status_colors = status_colors
-
-        self.status = False
-        self.widget.setStyleSheet(
-            "background-color: %s" % self.status_colors[self.status].name())
-
-    def update(self, new_status):
-        """Update status indicator with new status
-
-        Indicator widget color will be updated
-         to correspond with new status
-        """
-        # Set status indicator color
-        # Once status is updated, don't update again to avoid unecessary
-        #  redraws
-        if new_status and not self.status:
-            self.status = True
-            self.update_color()
-        elif not new_status and self.status:
-            self.status = False
-            self.update_color()
-
-    def update_color(self):
-        """Update status color of widget"""
-        style = "background-color: {}".format(
-            self.status_colors[self.status].name())
-        self.widget.setStyleSheet(style)
-
-
-# (Too many instance attributes) pylint: disable=R0902
-class PyDriverStation(Ui_MainWindow):
-    """Python-based driver station to communicate with the Raspberry Pi
-    """
-
-    def __init__(self, qmain_window, network, config, joysticks):
-        super(PyDriverStation, self).__init__()
-
-        self.main_window = qmain_window
-        self.setupUi(self.main_window)
-        self.scale_window()
-
-        self.config = config
-        self.network = network
-        self.joysticks = joysticks
-
-        # Set exit shortcut to 'Ctrl+Q'
-        exit_act = QAction('Exit', self.main_window)
-        exit_act.setShortcut('Ctrl+Q')
-        exit_act.setStatusTip('Exit application')
-        exit_act.triggered.connect(self.close_application)
-        self.main_window.addAction(exit_act)
-
-        self.connect_buttons()
-        self.setup_remote_ip_selector()
-
-        self.set_network()
-
-        status_colors = {True: QColor(0, 180, 0), False: QColor(200, 0, 0)}
-        self.connection_indicator = StatusIndicator(self.ConnectStatus,
-                                                    status_colors)
+        self._set_option('remote_ip', new_ip)
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update)
-        self.timer.start(100)
-
-    def scale_window(self):
-        """Resize and move the window to handle different dpi screens"""
-        available_geometry = QApplication.desktop().availableGeometry()
-
-        scaled_height = available_geometry.height() * 0.35
-        scaled_width = available_geometry.width() * 0.5
-
-        scaled_geometry = QRect(
-            (available_geometry.width() - scaled_width) / 2,
-            (available_geometry.height() - scaled_height) / 2, scaled_width,
-            scaled_height)
-
-        self.main_window.setGeometry(scaled_geometry)
-
-    def connect_buttons(self):
-        """Connect buttons to handler functions"""
-
-        # Mapping between mode buttons and mode string to put in NetworkTables
-        self.mode_names = {
-            self.AutonomousModeButton: "autonomous",
-            self.TeleopModeButton: "teleop",
-            self.TestModeButton: "test"
-        }
-        self.mode_buttons = [
-            self.AutonomousModeButton, self.TeleopModeButton,
-            self.TestModeButton
-        ]
-
-        # Mapping between button and enabled(True)/disabled(False)
-        self.enable_buttons_status = {
-            self.EnableButton: True,
-            self.DisableButton: False
-        }
-        self.enable_buttons = [self.EnableButton, self.DisableButton]
-
-        self.AutonomousModeButton.clicked.connect(
-            lambda: self.mode_button_press(self.AutonomousModeButton))
-        self.TeleopModeButton.clicked.connect(
-            lambda: self.mode_button_press(self.TeleopModeButton))
-        self.TestModeButton.clicked.connect(
-            lambda: self.mode_button_press(self.TestModeButton))
-
-        self.EnableButton.clicked.connect(
-            lambda: self.enabled_button_press(self.EnableButton))
-        self.DisableButton.clicked.connect(
-            lambda: self.enabled_button_press(self.DisableButton))
+    @property
+    def recent_ips(self) -> list:
+        """Get recently used robot ips, most recent first, not
+         including `remote_ip`"""
+        return list(self._values['recent_ips'])
+
+    def change_remote_ip(self, new_ip: str):
+        """Set the remote robot ip, remembering the old one in
+         `recent_ips`"""
+        recent_ips = [self.remote_ip] + self.recent_ips
+        recent_ips = [server_ip for server_ip in recent_ips
+                      if server_ip != new_ip]
+        self._set_option('recent_ips', ", ".join(recent_ips[:RECENT_IP_COUNT]))
+        self.remote_ip = new_ip
 
-    def setup_remote_ip_selector(self):
-        """Setup the remote ip selector input box"""
-        self.InputIP.setText(self.config.remote_ip)
+    @property
+    def axis_threshold(self) -> float:
+        """Get the smallest joystick axis change that will be published"""
+        return self._values['axis_threshold']
 
-        self.UpdateIPButton.clicked.connect(
-            lambda: self.ip_input_update(self.InputIP.text()))
+    @property
+    def keyframe_interval(self) -> float:
+        """Get the interval (seconds) at which unchanged joystick values
+         are republished"""
+        return self._values['keyframe_interval']
 
-    def update(self):
-        """Update driver station"""
+    @property
+    def publish_mode(self) -> str:
+        """Get how joysticks are published, 'channels' for one
+         NetworkTables entry per axis/button (legacy), 'packed' for one
+         axes array and button bitmask per joystick"""
+        return self._values['publish_mode']
 
-        # Update connection indicator
-        self.connection_indicator.update(self.network.connected())
+    @publish_mode.setter
+    def publish_mode(self, new_mode: str):
+        """Set how joysticks are published"""
+        self._set_option('publish_mode', new_mode)
 
-        # Set joystick data in NetworkTables
-        self.joysticks.update()
+    @property
+    def loop_rate(self) -> float:
+        """Get the control loop rate, in Hz"""
+        return self._values['loop_rate']
 
-        for joystick_num in range(self.joysticks.get_num_joysticks()):
-            joy_data = self.joysticks.get_joystick(joystick_num)
+    @property
+    def event_driven_input(self) -> bool:
+        """Get whether joysticks are tracked from pygame events and
+         published as soon as they change, rather than polled each tick"""
+        return self._values['event_driven_input']
 
-            for index, value in enumerate(joy_data["axes"]):
-                self.network.set_joystick_axis_value(joystick_num, index,
-                                                     value)
+    @property
+    def watchdog_timeout(self) -> float:
+        """Get the most seconds from a stall, network loss or joystick
+         unplug to the robot being disabled"""
+        return self._values['watchdog_timeout']
 
-            for index, value in enumerate(joy_data["buttons"]):
-                self.network.set_joystick_button_value(joystick_num, index,
-                                                       value)
+    @property
+    def shared_memory(self) -> str:
+        """Get the name of the shared memory block joystick state is
+         written to for other local processes, empty for none"""
+        return self._values['shared_memory']
 
-    def mode_button_press(self, pressed_button):
-        """Event handler for mode button press
+    @property
+    def mapping_file(self) -> str:
+        """Get the name of the file controller mappings are kept in"""
+        return self._values['mapping_file']
 
-        Sets mode buttons to checked/unchecked as if they were radio buttons.
-        Updates game mode in NetworkTables.
-        """
-        # Disable robot when mode is changed - fake button press to
-        #  update button gui
-        self.enabled_button_press(self.DisableButton)
-
-        for mode_button in self.mode_buttons:
-            if mode_button == pressed_button:
-                mode_button.setChecked(True)
-                self.network.set_game_mode(self.mode_names[mode_button])
-            else:
-                mode_button.setChecked(False)
+    @property
+    def instrumentation(self) -> bool:
+        """Get whether control loop timings are recorded"""
+        return self._values['instrumentation']
 
-    def enabled_button_press(self, pressed_button):
-        """Event handler for enable/disable button press
+    @property
+    def robots(self) -> list:
+        """Get `(name, remote_ip, joystick_map)` of each robot in a
+         `[Robot <name>]` section, to drive several robots at once
 
-        Sets buttons checked state as if they were radio buttons.
-        Updates enable/disable status in NetworkTables.
+        `joystick_map` is a tuple of the joystick numbers sent to the
+         robot as its joysticks 0, 1, 2..., or `None` to send every
+         joystick.
         """
-        for button in self.enable_buttons:
-            if button == pressed_button:
-                button.setChecked(True)
-                self.network.set_enabled(self.enable_buttons_status[button])
-            else:
-                button.setChecked(False)
+        return list(self._robots)
 
-    def ip_input_update(self, new_ip):
-        """Update robot ip input event handler
+    @property
+    def axis_profiles(self) -> dict:
+        """Get `AxisProfile` by axis number, by joystick GUID, from
+         `[Axis <guid> <axis>]` sections"""
+        return self._axis_profiles
+
+    def set_axis_profile(self, guid: str, axis: int, profile: AxisProfile):
+        """Set the `AxisProfile` of `axis` of joysticks with `guid`"""
+        section = "{}{} {}".format(AXIS_SECTION_PREFIX, guid, axis)
+        self._set_section(section, {
+            'deadband': str(profile.deadband),
+            'curve': profile.curve,
+            'expo': str(profile.expo),
+            'invert': 'yes' if profile.invert else 'no',
+            'trim': str(profile.trim),
+            'min': str(profile.minimum),
+            'max': str(profile.maximum)
+        })
 
-        Updates remote robot ip with current value of ip input box,
-        connects NetworkTables to correct robot.
+    def save_config(self):
+        """Save config into `config_file_name` once `save_delay` seconds
+         pass without another save, from a thread of its own"""
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.save_delay,
+                                               self._write_changes)
+            self._save_timer.name = "ConfigSave"
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _write_changes(self):
+        with self._file_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+                contents = io.StringIO()
+                self.config_parser.write(contents)
+
+            directory = os.path.dirname(os.path.abspath(
+                self.config_file_name))
+            handle, temp_name = tempfile.mkstemp(
+                dir=directory, prefix=".ds_config", suffix=".tmp")
+            try:
+                # `mkstemp` makes files only their owner can read, keep the
+                #  config file's permissions
+                try:
+                    mode = stat.S_IMODE(os.stat(self.config_file_name).st_mode)
+                except FileNotFoundError:
+                    mode = 0o666 & ~_umask()
+                os.chmod(temp_name, mode)
+                with os.fdopen(handle, 'w') as config_file:
+                    config_file.write(contents.getvalue())
+                    config_file.flush()
+                    os.fsync(config_file.fileno())
+                os.replace(temp_name, self.config_file_name)
+            except OSError as error:
+                with self._lock:
+                    self._dirty = True
+                if os.path.exists(temp_name):
+                    os.remove(temp_name)
+                print("Couldn't save config: {}".format(error),
+                      file=sys.stderr)
+                return
+            stamp = os.stat(self.config_file_name)
+            self._file_stamp = (stamp.st_mtime_ns, stamp.st_size)
+
+    def flush(self):
+        """Write changes not saved yet now, on the calling thread"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        self._write_changes()
+
+    def close(self):
+        """Write changes not saved yet, call before exiting"""
+        self.flush()
+
+    def reload_if_changed(self) -> frozenset:
+        """Read the config file again if it changed since it was last
+         read or written, returns names of the settings that changed,
+         with 'robots' and 'axis_profiles' for those sections
+
+        Changes not saved yet win over changes made to the file, which
+         is only read back once they're written. Never waits on a save
+         in progress.
         """
-        self.config.remote_ip = new_ip
-        self.config.save_config()
-
-        self.network.change_server(new_ip)
-        self.set_network()
-
-    def set_network(self):
-        """Call when the network has just been (re)initialized to
-         set initial values"""
-        # Use fake button presses to set values so buttons are
-        #  visibly set to matching state
-        self.enabled_button_press(self.DisableButton)
-        self.mode_button_press(self.AutonomousModeButton)
-
-    def close_application(self, event=None):
-        """Cleanup and close application"""
-        self.timer.stop()
-        self.main_window.close()
-        self.joysticks.quit()
-        self.config.save_config()
-        self.network.shutdown()
-
-
-def main(server_ip):
+        if not self._file_lock.acquire(blocking=False):
+            return frozenset()
+        try:
+            try:
+                stamp = os.stat(self.config_file_name)
+            except FileNotFoundError:
+                return frozenset()
+            if (stamp.st_mtime_ns, stamp.st_size) == self._file_stamp or \
+                    self._dirty:
+                return frozenset()
+
+            try:
+                config_parser = self._read()
+                values, robots, axis_profiles = self._parse(config_parser)
+            except (OSError, configparser.Error, ValueError) as error:
+                print("Couldn't reload config: {}".format(error),
+                      file=sys.stderr)
+                return frozenset()
+
+            changed = {name for name, value in values.items()
+                       if value != self._values[name]}
+            if robots != self._robots:
+                changed.add('robots')
+            if self._axis_sections(config_parser) != \
+                    self._axis_sections(self.config_parser):
+                changed.add('axis_profiles')
+            with self._lock:
+                self.config_parser = config_parser
+                self._values = values
+                self._robots = robots
+                self._axis_profiles = axis_profiles
+            return frozenset(changed)
+        finally:
+            self._file_lock.release()
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Python-based driver station")
+    parser.add_argument('server_ip', nargs='?',
+                        help="robot to connect to, defaults to the config")
+    parser.add_argument('--record', metavar='FILE',
+                        help="record joysticks, mode and enabled to FILE")
+    parser.add_argument('--replay', metavar='FILE',
+                        help="replay recording FILE instead of joysticks")
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help="replay speed, 2 replays twice as fast")
+    parser.add_argument('--replay-start', type=float, default=0.0,
+                        metavar='SECONDS',
+                        help="start replay this far into the recording")
+    parser.add_argument('--headless', action='store_true',
+                        help="run without a GUI, controlled from the "
+                        "terminal")
+    parser.add_argument('--control-port', type=int, metavar='PORT',
+                        help="with --headless, also accept commands on "
+                        "localhost PORT")
+    parser.add_argument('--profile', type=float, nargs='?', const=10.0,
+                        metavar='SECONDS',
+                        help="sample what the driver station is doing for "
+                        "SECONDS (default 10) after startup, into a "
+                        "ds_profile_*.folded file")
+    parser.add_argument('--startup-times', action='store_true',
+                        help="print time taken by each phase of startup")
+    return parser.parse_args(argv)
+
+
+# pylint: disable=import-outside-toplevel
+def main(args):
     """Main entry point for driver station"""
-    config = DriverStationConfig('ds_config.cfg')
-
-    if not server_ip:
-        server_ip = config.remote_ip
-    print("Connecting to: " + server_ip)
-
-    joysticks = Joysticks(pygame)
-    network = Network(networktables.NetworkTables, 'driver_station', server_ip)
-
-    app = QApplication(sys.argv)
-    window = QMainWindow()
-    driver_station = PyDriverStation(window, network, config, joysticks)
-    window.closeEvent = driver_station.close_application
-    window.show()
+    startup = StartupTimer()
+
+    with startup.phase("config"):
+        config = DriverStationConfig('ds_config.cfg')
+
+    with startup.phase("import networktables"):
+        import networktables
+
+    def connect(networktables_instance, server_ip):
+        print("Connecting to: " + server_ip)
+        return Network(networktables_instance, 'driver_station', server_ip,
+                       axis_threshold=config.axis_threshold,
+                       keyframe_interval=config.keyframe_interval,
+                       publish_mode=config.publish_mode,
+                       instance_factory=instance_factory,
+                       max_standbys=RECENT_IP_COUNT)
+
+    # Switching servers without blocking needs a NetworkTables instance
+    #  per server, which needs pynetworktables 2018 or newer
+    instance_factory = getattr(
+        getattr(networktables, 'NetworkTablesInstance', None), 'create', None)
+
+    with startup.phase("network"):
+        robots = config.robots
+        if robots and not args.server_ip:
+            # Each robot gets a NetworkTables instance of its own
+            network = RobotFleet([
+                RobotLink(name, connect(
+                    networktables.NetworkTablesInstance.create(), server_ip),
+                          joystick_map)
+                for name, server_ip, joystick_map in robots])
+        else:
+            network = connect(networktables.NetworkTables,
+                              args.server_ip or config.remote_ip)
+            for server_ip in config.recent_ips:
+                network.warm_standby(server_ip)
+
+    if args.replay:
+        with startup.phase("open replay"):
+            # Replayed mode and enabled changes go through the driver
+            #  station, so what it shows matches what the robot is sent
+            joysticks = ReplayJoysticks(args.replay, speed=args.replay_speed,
+                                        start=args.replay_start)
+    else:
+        with startup.phase("import pygame"):
+            import pygame
+        with startup.phase("joysticks"):
+            axis_profiles = config.axis_profiles
+            joysticks = Joysticks(pygame,
+                                  event_driven=config.event_driven_input,
+                                  axis_pipeline=AxisPipeline(axis_profiles)
+                                  if axis_profiles else None,
+                                  mapper=ControllerMapper(
+                                      MappingStore(config.mapping_file)))
+
+    recorder = Recorder(args.record) if args.record else None
+
+    shared_state = None
+    if config.shared_memory:
+        with startup.phase("shared memory"):
+            from shared_state import SharedJoystickState
+            try:
+                shared_state = SharedJoystickState(config.shared_memory)
+            except RuntimeError as error:
+                print("Can't use shared_memory: {}".format(error),
+                      file=sys.stderr)
+                joysticks.quit()
+                network.shutdown()
+                return 1
+
+    if args.headless:
+        return run_headless(args, config, network, joysticks, recorder,
+                            shared_state, startup)
+    return run_gui(args, config, network, joysticks, recorder, shared_state,
+                   startup)
+
+
+# pylint: disable=too-many-arguments
+def run_headless(args, config, network, joysticks, recorder, shared_state,
+                 startup):
+    """Run driver station without a GUI until told to quit"""
+    with startup.phase("headless"):
+        from headless import HeadlessDriverStation
+        driver_station = HeadlessDriverStation(network, config, joysticks,
+                                               recorder, shared_state)
+        driver_station.start()
+        if args.control_port is not None:
+            port = driver_station.serve(args.control_port)
+            print("Accepting commands on localhost:{}".format(port))
+        if args.profile:
+            print(driver_station.profile(args.profile))
+
+    if args.startup_times:
+        print(startup.format_report(), file=sys.stderr)
+
+    return driver_station.run()
+
+
+def run_gui(args, config, network, joysticks, recorder, shared_state,
+            startup):
+    """Run driver station GUI until its window is closed"""
+    with startup.phase("import gui"):
+        # No name ... in module ... - pylint seems to have trouble with PyQt
+        # pylint: disable=E0611
+        from PyQt5.QtWidgets import QApplication, QMainWindow
+        # pylint: enable=E0611
+        from driverstation_gui import PyDriverStation
+
+    with startup.phase("window"):
+        app = QApplication(sys.argv)
+        window = QMainWindow()
+        driver_station = PyDriverStation(window, network, config, joysticks,
+                                         recorder, shared_state)
+        window.closeEvent = driver_station.close_application
+        window.show()
+        if args.profile:
+            driver_station.profile(args.profile)
+
+    if args.startup_times:
+        print(startup.format_report(), file=sys.stderr)
 
     try:
         return app.exec_()
@@ -285,9 +579,4 @@ def main(server_ip):
 
 
 if __name__ == '__main__':
-    try:
-        SERVER_IP = sys.argv[1]
-    except IndexError:
-        SERVER_IP = None
-
-    sys.exit(main(SERVER_IP))
+    sys.exit(main(parse_args()))
@@ -0,0 +1,189 @@
+"""Command line tool for driver station recordings
+
+Times are given in seconds from the start of the recording.
+
+Usage:
+- `python pydslog.py summary match.dsrec`
+- `python pydslog.py slice match.dsrec out.dsrec --start 60 --end 90`
+- `python pydslog.py export match.dsrec --start 60 --end 90 --output out.csv`
+"""
+
+import argparse
+import collections
+import csv
+import sys
+import time
+
+import recording
+
+RECORD_NAMES = {
+    recording.RECORD_SNAPSHOT: 'snapshot',
+    recording.RECORD_MODE: 'mode',
+    recording.RECORD_ENABLED: 'enabled',
+    recording.RECORD_KEYFRAME: 'keyframe',
+    recording.RECORD_ROBOT_MODE: 'robot mode',
+    recording.RECORD_ROBOT_ENABLED: 'robot enabled'
+}
+
+# Record type of the whole-station change matching each robot change
+ROBOT_RECORDS = {
+    recording.RECORD_ROBOT_MODE: recording.RECORD_MODE,
+    recording.RECORD_ROBOT_ENABLED: recording.RECORD_ENABLED
+}
+
+# Records of mode and enabled changes, of the whole station or one robot
+CHANGE_RECORDS = (recording.RECORD_MODE, recording.RECORD_ENABLED,
+                  *ROBOT_RECORDS)
+
+
+def _time_range(reader, args):
+    """Returns absolute `(start, end)` times from relative
+     `--start`/`--end` arguments"""
+    start = reader.start_time + args.start if args.start else None
+    end = reader.start_time + args.end if args.end is not None else None
+    return start, end
+
+
+def summary(args, output=sys.stdout):
+    """Print an overview of a recording"""
+    with recording.RecordingReader(args.recording) as reader:
+        counts = collections.Counter()
+        sticks = 0
+        changes = []
+        for record_type, timestamp, payload in reader.records():
+            counts[record_type] += 1
+            if record_type in CHANGE_RECORDS:
+                changes.append((timestamp - reader.start_time,
+                                RECORD_NAMES[record_type],
+                                recording.decode_record(record_type,
+                                                        timestamp, payload)))
+            elif record_type == recording.RECORD_SNAPSHOT:
+                sticks = max(sticks, recording.SNAPSHOT_HEADER.unpack_from(
+                    payload)[1])
+
+        print("Recording: {} (format version {})".format(
+            args.recording, reader.version), file=output)
+        print("Started: " + time.strftime(
+            "%Y-%m-%d %H:%M:%S", time.localtime(reader.wall_time)),
+              file=output)
+        print("Duration: {:.2f} s".format(
+            reader.end_time - reader.start_time), file=output)
+        print("Joysticks: {}".format(sticks), file=output)
+        print("Keyframes: {}".format(len(reader.keyframe_times)),
+              file=output)
+        for record_type, name in RECORD_NAMES.items():
+            print("{} records: {}".format(name.capitalize(),
+                                          counts[record_type]), file=output)
+        for offset, name, value in changes:
+            print("  {:10.3f} s  {} -> {}".format(offset, name, value),
+                  file=output)
+    return 0
+
+
+def slice_recording(args):
+    """Write part of a recording to a new recording"""
+    with recording.RecordingReader(args.recording) as reader:
+        start, end = _time_range(reader, args)
+        start = reader.start_time if start is None else start
+        writer = recording.RecordingWriter(args.output, reader.wall_time)
+
+        # The slice starts from a keyframe of the state at `start`
+        mode, enabled, snapshot = reader.state_at(start)
+        writer.write_record(recording.RECORD_KEYFRAME, start,
+                            recording.pack_keyframe(mode, enabled, snapshot))
+
+        for record_type, timestamp, payload in reader.records(start, end):
+            if timestamp > start:
+                writer.write_record(record_type, timestamp, payload)
+        writer.close()
+    return 0
+
+
+def export(args, output=sys.stdout):
+    """Write records as CSV, one row per joystick for snapshots"""
+    output_file = open(args.output, 'w', newline='') if args.output else None
+    writer = csv.writer(output_file or output)
+    writer.writerow(['time', 'record', 'mode', 'enabled', 'joystick',
+                     'connected', 'axes', 'buttons', 'povs', 'robot'])
+
+    with recording.RecordingReader(args.recording) as reader:
+        start, end = _time_range(reader, args)
+        for record_type, timestamp, payload in reader.records(start, end):
+            name = RECORD_NAMES.get(record_type)
+            if name is None:
+                continue
+            value = recording.decode_record(record_type, timestamp, payload)
+            offset = "{:.4f}".format(timestamp - reader.start_time)
+
+            mode = enabled = robot = ''
+            if record_type in ROBOT_RECORDS:
+                robot, value = value
+                record_type = ROBOT_RECORDS[record_type]
+
+            if record_type == recording.RECORD_MODE:
+                mode = value
+            elif record_type == recording.RECORD_ENABLED:
+                enabled = int(value)
+            elif record_type == recording.RECORD_KEYFRAME:
+                mode, enabled, value = value[0], int(value[1]), value[2]
+
+            if record_type in (recording.RECORD_MODE,
+                               recording.RECORD_ENABLED):
+                writer.writerow([offset, name, mode, enabled, '', '', '', '',
+                                 '', robot])
+                continue
+
+            for stick, axes in enumerate(value.axes):
+                writer.writerow([
+                    offset, name, mode, enabled, stick,
+                    int(value.connected[stick]),
+                    ' '.join('{:.4f}'.format(axis) for axis in axes),
+                    ' '.join(str(button)
+                             for button in value.unpack_buttons(stick)),
+                    ' '.join(str(pov) for pov in value.povs[stick])])
+
+    if output_file is not None:
+        output_file.close()
+    return 0
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Summarize, slice and export driver station recordings")
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    summary_parser = commands.add_parser('summary',
+                                         help="print recording overview")
+    summary_parser.add_argument('recording')
+    summary_parser.set_defaults(function=summary)
+
+    slice_parser = commands.add_parser(
+        'slice', help="write part of a recording to a new recording")
+    slice_parser.add_argument('recording')
+    slice_parser.add_argument('output')
+    slice_parser.set_defaults(function=slice_recording)
+
+    export_parser = commands.add_parser('export', help="export CSV")
+    export_parser.add_argument('recording')
+    export_parser.add_argument('--output', help="CSV file, default stdout")
+    export_parser.set_defaults(function=export)
+
+    for command_parser in (slice_parser, export_parser):
+        command_parser.add_argument('--start', type=float, default=0.0,
+                                    help="seconds from start of recording")
+        command_parser.add_argument('--end', type=float,
+                                    help="seconds from start of recording")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Entry point for recording tool"""
+    args = parse_args(argv)
+    return args.function(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
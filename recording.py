@@ -0,0 +1,671 @@
+"""Recording and replay of driver station input
+
+Recordings are append-only binary logs. The file starts with `MAGIC`,
+ followed by a `HEADER` of format version and wall-clock start time.
+ Each record is a `RECORD_HEADER` of record type, monotonic timestamp and
+ payload length, followed by the payload:
+- `RECORD_SNAPSHOT`: a packed `JoystickSnapshot`, see `pack_snapshot`
+- `RECORD_MODE`: game mode, UTF-8
+- `RECORD_ENABLED`: one byte, 1 when enabled
+- `RECORD_KEYFRAME`: full driver station state, see `pack_keyframe`.
+   Written in place of a snapshot record every `keyframe_interval`
+- `RECORD_INDEX`: the keyframe index, see `RecordingWriter.close`
+- `RECORD_ROBOT_MODE`, `RECORD_ROBOT_ENABLED`: mode or enabled change of
+   one robot when driving several, a `ROBOT_HEADER` of name length, the
+   UTF-8 name, then the payload of `RECORD_MODE` or `RECORD_ENABLED`.
+   Keyframes don't hold per-robot state
+When a recording is closed the index is written, followed by a
+ `TRAILER` holding the offset of the index record and `INDEX_MAGIC`.
+ A recording without a trailer (cut short by a crash) is still
+ readable, its index is rebuilt by scanning it.
+All numbers are little-endian.
+"""
+
+import bisect
+import mmap
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from joysticks import JoystickSnapshot
+
+MAGIC = b'PYDSREC\x00'
+INDEX_MAGIC = b'PYDSIDX\x00'
+VERSION = 2
+# Version 1 recordings have no keyframes or index
+SUPPORTED_VERSIONS = (1, 2)
+HEADER = struct.Struct('<Hd')
+RECORD_HEADER = struct.Struct('<BdI')
+SNAPSHOT_HEADER = struct.Struct('<QH')
+STICK_HEADER = struct.Struct('<?HHH')
+KEYFRAME_HEADER = struct.Struct('<?H')
+INDEX_HEADER = struct.Struct('<dI')
+TRAILER = struct.Struct('<Q8s')
+ROBOT_HEADER = struct.Struct('<B')
+
+# Offset of the first record
+RECORDS_START = len(MAGIC) + HEADER.size
+
+RECORD_SNAPSHOT = 1
+RECORD_MODE = 2
+RECORD_ENABLED = 3
+RECORD_KEYFRAME = 4
+RECORD_INDEX = 5
+RECORD_ROBOT_MODE = 6
+RECORD_ROBOT_ENABLED = 7
+
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def _array_bytes(values: array) -> bytes:
+    """Returns little-endian bytes of `values`"""
+    if _BIG_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _bytes_array(typecode: str, data) -> array:
+    """Returns array of `typecode` from little-endian bytes `data`"""
+    values = array(typecode)
+    values.frombytes(data)
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def pack_snapshot(snapshot) -> bytes:
+    """Returns `snapshot` packed as a record payload
+
+    `SNAPSHOT_HEADER` (sequence, number of joysticks) is followed, for
+     each joystick, by a `STICK_HEADER` (connected, axes, buttons, POVs),
+     the axes as doubles, the button bitmask in `ceil(buttons / 8)` bytes
+     and the POV angles as 16 bit integers.
+    """
+    parts = [SNAPSHOT_HEADER.pack(snapshot.sequence, len(snapshot.axes))]
+    for stick, axes in enumerate(snapshot.axes):
+        num_buttons = snapshot.num_buttons[stick]
+        povs = snapshot.povs[stick]
+        parts.append(STICK_HEADER.pack(snapshot.connected[stick], len(axes),
+                                       num_buttons, len(povs)))
+        parts.append(_array_bytes(axes))
+        parts.append(snapshot.buttons[stick].to_bytes((num_buttons + 7) // 8,
+                                                      'little'))
+        parts.append(_array_bytes(povs))
+    return b''.join(parts)
+
+
+def unpack_snapshot(payload, timestamp: float) -> JoystickSnapshot:
+    """Returns a new `JoystickSnapshot` from a packed `payload`"""
+    snapshot = JoystickSnapshot()
+    snapshot.timestamp = timestamp
+    snapshot.sequence, num_sticks = SNAPSHOT_HEADER.unpack_from(payload)
+    offset = SNAPSHOT_HEADER.size
+
+    for _ in range(num_sticks):
+        connected, num_axes, num_buttons, num_povs = \
+            STICK_HEADER.unpack_from(payload, offset)
+        offset += STICK_HEADER.size
+
+        snapshot.axes.append(
+            _bytes_array('d', payload[offset:offset + 8 * num_axes]))
+        offset += 8 * num_axes
+
+        button_bytes = (num_buttons + 7) // 8
+        snapshot.buttons.append(int.from_bytes(
+            payload[offset:offset + button_bytes], 'little'))
+        snapshot.num_buttons.append(num_buttons)
+        offset += button_bytes
+
+        snapshot.povs.append(
+            _bytes_array('h', payload[offset:offset + 2 * num_povs]))
+        offset += 2 * num_povs
+
+        snapshot.connected.append(connected)
+        snapshot.guids.append(None)
+
+    return snapshot
+
+
+def pack_keyframe(mode: str, enabled: bool, snapshot) -> bytes:
+    """Returns full driver station state packed as a keyframe payload,
+     a `KEYFRAME_HEADER` (enabled, mode length), the mode in UTF-8
+     and the packed snapshot
+    """
+    mode = mode.encode('utf-8')
+    return (KEYFRAME_HEADER.pack(enabled, len(mode)) + mode +
+            pack_snapshot(snapshot))
+
+
+def unpack_keyframe(payload, timestamp: float):
+    """Returns `(mode, enabled, snapshot)` from a packed keyframe"""
+    enabled, mode_length = KEYFRAME_HEADER.unpack_from(payload)
+    offset = KEYFRAME_HEADER.size
+    mode = bytes(payload[offset:offset + mode_length]).decode('utf-8')
+    snapshot = unpack_snapshot(payload[offset + mode_length:], timestamp)
+    return mode, enabled, snapshot
+
+
+def pack_robot_record(robot: str, payload: bytes) -> bytes:
+    """Returns payload of a `RECORD_ROBOT_MODE`/`RECORD_ROBOT_ENABLED`
+     record for robot named `robot`"""
+    name = robot.encode('utf-8')
+    return ROBOT_HEADER.pack(len(name)) + name + payload
+
+
+def unpack_robot_record(payload):
+    """Returns `(robot, payload)` of a robot record, the payload
+     being that of the matching whole-station record"""
+    name_length, = ROBOT_HEADER.unpack_from(payload)
+    offset = ROBOT_HEADER.size
+    robot = bytes(payload[offset:offset + name_length]).decode('utf-8')
+    return robot, payload[offset + name_length:]
+
+
+def decode_record(record_type: int, timestamp: float, payload):
+    """Returns the value of a record: a `JoystickSnapshot` for
+     snapshots, `str` for modes, `bool` for enabled,
+     `(mode, enabled, snapshot)` for keyframes and `(robot, value)`
+     for robot modes and enabled
+    """
+    if record_type == RECORD_ROBOT_MODE:
+        robot, payload = unpack_robot_record(payload)
+        return robot, decode_record(RECORD_MODE, timestamp, payload)
+    if record_type == RECORD_ROBOT_ENABLED:
+        robot, payload = unpack_robot_record(payload)
+        return robot, decode_record(RECORD_ENABLED, timestamp, payload)
+    if record_type == RECORD_SNAPSHOT:
+        return unpack_snapshot(payload, timestamp)
+    if record_type == RECORD_MODE:
+        return bytes(payload).decode('utf-8')
+    if record_type == RECORD_ENABLED:
+        return payload[0] == 1
+    if record_type == RECORD_KEYFRAME:
+        return unpack_keyframe(payload, timestamp)
+    return None
+
+
+class RecordingWriter:
+    """Writes records to a recording file, indexing keyframes as they
+     are written
+
+    Writes happen on the calling thread, see `Recorder` for recording
+     from the control loop.
+    """
+
+    def __init__(self, file_name: str, wall_time=None):
+        """Create recording `file_name`, replacing it if it exists
+
+        `wall_time` - `float`: Wall-clock time the recording started
+         at, defaults to now
+        """
+        self.file_name = file_name
+        self._file = open(file_name, 'wb')
+        self._file.write(MAGIC)
+        self._file.write(HEADER.pack(
+            VERSION, time.time() if wall_time is None else wall_time))
+        self._offset = RECORDS_START
+
+        self._index_timestamps = array('d')
+        self._index_offsets = array('Q')
+        self._end_time = 0.0
+
+    def write(self, record: bytes):
+        """Write `record`, a packed `RECORD_HEADER` and payload"""
+        record_type, timestamp, _ = RECORD_HEADER.unpack_from(record)
+        if record_type == RECORD_KEYFRAME:
+            self._index_timestamps.append(timestamp)
+            self._index_offsets.append(self._offset)
+        self._end_time = max(self._end_time, timestamp)
+
+        self._file.write(record)
+        self._offset += len(record)
+
+    def write_record(self, record_type: int, timestamp: float,
+                     payload: bytes):
+        """Pack and write a record"""
+        self.write(RECORD_HEADER.pack(record_type, timestamp, len(payload)) +
+                   payload)
+
+    def flush(self):
+        """Flush written records to disk"""
+        self._file.flush()
+
+    def close(self):
+        """Write the keyframe index and trailer, and close the file
+
+        The index payload is an `INDEX_HEADER` (time of the last record,
+         number of keyframes), the timestamp of each keyframe as doubles,
+         then the offset of each keyframe as 64 bit integers.
+        """
+        if self._file.closed:
+            return
+
+        index_offset = self._offset
+        self.write_record(RECORD_INDEX, self._end_time, b''.join((
+            INDEX_HEADER.pack(self._end_time, len(self._index_timestamps)),
+            _array_bytes(self._index_timestamps),
+            _array_bytes(self._index_offsets))))
+        self._file.write(TRAILER.pack(index_offset, INDEX_MAGIC))
+        self._file.close()
+
+
+class Recorder:
+    """Records joystick snapshots, mode and enabled changes to a file
+
+    Records are packed on the calling thread and written by a writer
+     thread of their own, so recording never waits on the disk. If the
+     writer falls `max_queued` records behind, new records are dropped
+     and counted in `dropped`.
+
+    Every `keyframe_interval` seconds a snapshot is recorded as a
+     keyframe holding the full driver station state, so readers
+     can start from any point in the recording.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, file_name: str, clock=time.monotonic,
+                 flush_interval=0.5, max_queued=10000,
+                 keyframe_interval=1.0):
+        """Open `file_name` for recording, replacing it if it exists
+
+        `clock`: Monotonic time source, must match the one used
+         to timestamp joystick snapshots
+        `flush_interval` - `float`: Longest time, in seconds, records
+         stay buffered before being written to disk
+        `keyframe_interval` - `float`: Seconds between keyframes
+        """
+        self.file_name = file_name
+        self._clock = clock
+        self.flush_interval = flush_interval
+        self.keyframe_interval = keyframe_interval
+        self.dropped = 0
+
+        # State recorded in keyframes
+        self._mode = ""
+        self._enabled = False
+        self._next_keyframe = float('-inf')
+
+        self._writer = RecordingWriter(file_name)
+
+        self._queue = queue.Queue(max_queued)
+        self._thread = threading.Thread(target=self._write_records,
+                                        name="Recorder", daemon=True)
+        self._thread.start()
+
+    def _put(self, record_type: int, timestamp: float, payload: bytes):
+        record = RECORD_HEADER.pack(record_type, timestamp,
+                                    len(payload)) + payload
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def record_snapshot(self, snapshot):
+        """Record a `JoystickSnapshot`"""
+        if snapshot.timestamp >= self._next_keyframe:
+            self._next_keyframe = snapshot.timestamp + self.keyframe_interval
+            self._put(RECORD_KEYFRAME, snapshot.timestamp,
+                      pack_keyframe(self._mode, self._enabled, snapshot))
+        else:
+            self._put(RECORD_SNAPSHOT, snapshot.timestamp,
+                      pack_snapshot(snapshot))
+
+    def record_mode(self, mode: str, robot=None):
+        """Record a game mode change, of only robot named `robot`
+         when given"""
+        payload = mode.encode('utf-8')
+        if robot is not None:
+            self._put(RECORD_ROBOT_MODE, self._clock(),
+                      pack_robot_record(robot, payload))
+            return
+        self._mode = mode
+        self._put(RECORD_MODE, self._clock(), payload)
+
+    def record_enabled(self, enabled: bool, robot=None):
+        """Record the robot being enabled or disabled, only robot
+         named `robot` when given"""
+        payload = b'\x01' if enabled else b'\x00'
+        if robot is not None:
+            self._put(RECORD_ROBOT_ENABLED, self._clock(),
+                      pack_robot_record(robot, payload))
+            return
+        self._enabled = enabled
+        self._put(RECORD_ENABLED, self._clock(), payload)
+
+    def _write_records(self):
+        write = self._writer.write
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self._queue.get(
+                    timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                record = b''
+
+            if record is None:
+                break
+            if record:
+                write(record)
+
+            if time.monotonic() >= next_flush:
+                self._writer.flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+        self._writer.close()
+
+    def close(self):
+        """Write out queued records and the index, and close the file"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+
+class RecordingReader:
+    """Random access to a recording through a memory map
+
+    Finding the state at any time is a binary search of the keyframe
+     index plus a short scan forward, and records are read straight
+     from the map without copying.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.keyframe_times = array('d')
+        self.keyframe_offsets = array('Q')
+        with open(file_name, 'rb') as recording:
+            self._map = mmap.mmap(recording.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        self._data = memoryview(self._map)
+
+        if (len(self._data) < RECORDS_START or
+                self._data[:len(MAGIC)] != MAGIC):
+            self.close()
+            raise ValueError("Not a driver station recording: " + file_name)
+        self.version, self.wall_time = HEADER.unpack_from(self._data,
+                                                          len(MAGIC))
+        if self.version not in SUPPORTED_VERSIONS:
+            self.close()
+            raise ValueError("Unsupported recording version: " +
+                             str(self.version))
+
+        self.records_end = len(self._data)
+        if not self._read_index():
+            self._rebuild_index()
+
+        first = next(self._iter_records(RECORDS_START), None)
+        self.start_time = first[2] if first else 0.0
+
+    def _read_index(self) -> bool:
+        """Load the index written when the recording was closed,
+         returns `False` if there isn't one
+        """
+        if len(self._data) < RECORDS_START + TRAILER.size:
+            return False
+        index_offset, magic = TRAILER.unpack_from(
+            self._data, len(self._data) - TRAILER.size)
+        if magic != INDEX_MAGIC:
+            return False
+
+        record_type, _, length = RECORD_HEADER.unpack_from(self._data,
+                                                           index_offset)
+        if record_type != RECORD_INDEX:
+            return False
+        start = index_offset + RECORD_HEADER.size
+        self.end_time, count = INDEX_HEADER.unpack_from(self._data, start)
+        start += INDEX_HEADER.size
+        if start + 16 * count > index_offset + RECORD_HEADER.size + length:
+            return False
+
+        if _BIG_ENDIAN:
+            self.keyframe_times = _bytes_array(
+                'd', self._data[start:start + 8 * count])
+            self.keyframe_offsets = _bytes_array(
+                'Q', self._data[start + 8 * count:start + 16 * count])
+        else:
+            self.keyframe_times = \
+                self._data[start:start + 8 * count].cast('d')
+            self.keyframe_offsets = \
+                self._data[start + 8 * count:start + 16 * count].cast('Q')
+        self.records_end = index_offset
+        return True
+
+    def _rebuild_index(self):
+        """Build the keyframe index by scanning every record"""
+        self.keyframe_times = array('d')
+        self.keyframe_offsets = array('Q')
+        self.end_time = 0.0
+        for offset, record_type, timestamp, _ in \
+                self._iter_records(RECORDS_START):
+            if record_type == RECORD_KEYFRAME:
+                self.keyframe_times.append(timestamp)
+                self.keyframe_offsets.append(offset)
+            self.end_time = max(self.end_time, timestamp)
+
+    def _iter_records(self, offset: int):
+        """Yields `(offset, record_type, timestamp, payload)` for each
+         record from `offset`, payloads are views into the map
+        """
+        data = self._data
+        end = self.records_end
+        header_size = RECORD_HEADER.size
+        unpack_header = RECORD_HEADER.unpack_from
+        while offset + header_size <= end:
+            record_type, timestamp, length = unpack_header(data, offset)
+            payload_start = offset + header_size
+            if payload_start + length > end:
+                # Cut short by a crash while recording
+                return
+            yield (offset, record_type, timestamp,
+                   data[payload_start:payload_start + length])
+            offset = payload_start + length
+
+    def keyframe_offset(self, timestamp: float) -> int:
+        """Returns offset of the last keyframe at or before `timestamp`,
+         or of the first record if there isn't one
+        """
+        keyframe = bisect.bisect_right(self.keyframe_times, timestamp) - 1
+        if keyframe < 0:
+            return RECORDS_START
+        return self.keyframe_offsets[keyframe]
+
+    def records(self, start=None, end=None):
+        """Yields `(record_type, timestamp, payload)` for each record
+         from time `start` up to and including time `end`, payloads are
+         views into the map, see `decode_record`
+        """
+        offset = RECORDS_START if start is None else \
+            self.keyframe_offset(start)
+        for _, record_type, timestamp, payload in self._iter_records(offset):
+            if end is not None and timestamp > end:
+                return
+            if record_type == RECORD_INDEX or (
+                    start is not None and timestamp < start):
+                continue
+            yield record_type, timestamp, payload
+
+    def state_at(self, timestamp: float):
+        """Returns `(mode, enabled, snapshot)`, the driver station
+         state at `timestamp`
+        """
+        mode = ""
+        enabled = False
+        snapshot = JoystickSnapshot()
+        for _, record_type, record_time, payload in \
+                self._iter_records(self.keyframe_offset(timestamp)):
+            if record_time > timestamp:
+                break
+            if record_type == RECORD_KEYFRAME:
+                mode, enabled, snapshot = unpack_keyframe(payload,
+                                                          record_time)
+            elif record_type == RECORD_SNAPSHOT:
+                snapshot = unpack_snapshot(payload, record_time)
+            elif record_type == RECORD_MODE:
+                mode = decode_record(record_type, record_time, payload)
+            elif record_type == RECORD_ENABLED:
+                enabled = decode_record(record_type, record_time, payload)
+        return mode, enabled, snapshot
+
+    def close(self):
+        """Release the memory map
+
+        Views of records still held elsewhere keep the map open until
+         they are released.
+        """
+        if isinstance(self.keyframe_times, memoryview):
+            self.keyframe_times.release()
+            self.keyframe_offsets.release()
+        self._data.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_records(file_name: str):
+    """Yields `(record_type, timestamp, value)` for each record in
+     recording `file_name`, see `decode_record`
+
+    A record cut short (by a crash while recording) ends the recording.
+    """
+    with RecordingReader(file_name) as reader:
+        for record_type, timestamp, payload in reader.records():
+            yield record_type, timestamp, decode_record(record_type,
+                                                        timestamp, payload)
+
+
+class ReplayJoysticks:
+    """Plays a recording back in place of `Joysticks`
+
+    Each `snapshot` returns the last recorded snapshot due at the
+     current replay time, so a `ControlLoop` publishes recorded input
+     at its original timing, or `speed` times faster. Recorded mode and
+     enabled changes are passed to `on_mode` and `on_enabled` as they
+     come due, changes of one robot to `on_robot_mode(robot, mode)` and
+     `on_robot_enabled(robot, enabled)`.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, file_name: str, speed=1.0, on_mode=None,
+                 on_enabled=None, clock=time.monotonic, start=0.0,
+                 on_robot_mode=None, on_robot_enabled=None):
+        """Open recording `file_name` for replay
+
+        `start` - `float`: Seconds into the recording to start from
+        """
+        self.event_driven = False
+        self.speed = speed
+        self.on_mode = on_mode
+        self.on_enabled = on_enabled
+        self.on_robot_mode = on_robot_mode
+        self.on_robot_enabled = on_robot_enabled
+        self._clock = clock
+
+        self._reader = RecordingReader(file_name)
+        self._recording_start = self._reader.start_time + start
+        self._sequence = 0
+        self._snapshot = JoystickSnapshot()
+
+        if start > 0.0:
+            # Jump to the state at `start`, then follow the records after it
+            mode, enabled, self._snapshot = self._reader.state_at(
+                self._recording_start)
+            self._start_state = mode, enabled
+            self._records = (
+                record
+                for record in self._reader.records(self._recording_start)
+                if record[1] > self._recording_start)
+        else:
+            self._start_state = None
+            self._records = self._reader.records()
+        self._next_record = next(self._records, None)
+
+        self._replay_start = None
+        self.finished = self._next_record is None
+
+    def _advance(self):
+        """Apply every record due at the current replay time"""
+        now = self._clock()
+        if self._replay_start is None:
+            self._replay_start = now
+            # Applied when replay starts rather than when opened, so
+            #  callbacks set after opening see it too
+            if self._start_state is not None:
+                mode, enabled = self._start_state
+                if mode and self.on_mode is not None:
+                    self.on_mode(mode)
+                if self.on_enabled is not None:
+                    self.on_enabled(enabled)
+        due = self._recording_start + (now - self._replay_start) * self.speed
+
+        while self._next_record is not None and self._next_record[1] <= due:
+            record_type, timestamp, payload = self._next_record
+            if record_type == RECORD_SNAPSHOT:
+                self._snapshot = unpack_snapshot(payload, timestamp)
+            elif record_type == RECORD_KEYFRAME:
+                # Mode and enabled changes have records of their own
+                _, _, self._snapshot = unpack_keyframe(payload, timestamp)
+            elif record_type == RECORD_MODE and self.on_mode is not None:
+                self.on_mode(decode_record(record_type, timestamp, payload))
+            elif record_type == RECORD_ENABLED and self.on_enabled is not None:
+                self.on_enabled(decode_record(record_type, timestamp,
+                                              payload))
+            elif (record_type == RECORD_ROBOT_MODE and
+                  self.on_robot_mode is not None):
+                self.on_robot_mode(*decode_record(record_type, timestamp,
+                                                  payload))
+            elif (record_type == RECORD_ROBOT_ENABLED and
+                  self.on_robot_enabled is not None):
+                self.on_robot_enabled(*decode_record(record_type, timestamp,
+                                                     payload))
+            self._next_record = next(self._records, None)
+
+        self.finished = self._next_record is None
+
+    def update(self):
+        """Apply recorded changes due since the last call"""
+        self._advance()
+
+    def take_changed(self) -> set:
+        """Replays aren't event driven, nothing is reported changed"""
+        return set()
+
+    def get_num_joysticks(self) -> int:
+        """Returns the number of joysticks in the current snapshot"""
+        return len(self._snapshot.axes)
+
+    def snapshot(self) -> JoystickSnapshot:
+        """Returns the recorded snapshot due at the current replay time"""
+        self._advance()
+        self._sequence += 1
+        self._snapshot.sequence = self._sequence
+        self._snapshot.timestamp = self._clock()
+        return self._snapshot
+
+    def get_joystick(self, stick: int) -> dict:
+        """Returns dict holding recorded state of specified joystick,
+         as `Joysticks.get_joystick` does
+        """
+        if stick >= len(self._snapshot.axes) or stick < 0:
+            raise ValueError("get_joystick called with invalid stick number: " + str(stick))
+        return {
+            "axes": self._snapshot.axes[stick].tolist(),
+            "buttons": self._snapshot.unpack_buttons(stick)
+        }
+
+    def quit(self):
+        """Stop reading the recording"""
+        self._next_record = None
+        self._records.close()
+        self._reader.close()
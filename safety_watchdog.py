@@ -0,0 +1,176 @@
+"""Safety watchdog for the control loop
+
+Runs on a thread of its own, apart from both the GUI and the control
+ loop. If the control loop stops ticking, the network connection is
+ lost or a joystick is unplugged, the robot is disabled and every
+ joystick zeroed within `Watchdog.bound` seconds.
+"""
+
+import threading
+import time
+
+# Trip reasons
+STALLED = "control loop stalled"
+NETWORK_LOST = "network lost"
+JOYSTICK_LOST = "joystick disconnected"
+
+
+class Trip:  # (Too few public methods) pylint: disable=R0903
+    """One time the watchdog disabled the robot"""
+
+    __slots__ = ('reason', 'time', 'tick_age', 'missed_ticks', 'reaction',
+                 'robot')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, reason, trip_time, tick_age, missed_ticks, reaction,
+                 robot=None):
+        self.reason = reason
+        # When the trip was detected, by the watchdog's clock
+        self.time = trip_time
+        # Seconds since the control loop last finished a tick
+        self.tick_age = tick_age
+        # Ticks the control loop had missed so far
+        self.missed_ticks = missed_ticks
+        # Seconds from detection until disabled and zeroed
+        self.reaction = reaction
+        # Name of the only robot disabled, `None` when every robot was
+        self.robot = robot
+
+    def to_dict(self) -> dict:
+        """Returns the trip as a dict, for JSON"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Watchdog:
+    """Disables the robot and zeroes joysticks when the control loop
+     stalls, the network drops or a joystick is unplugged
+
+    Checks are edge triggered, a stall or loss trips once, and the
+     robot stays disabled until enabled again. When driving several
+     robots, a robot losing its connection only disables that robot.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, control_loop, network, bound=0.2,
+                 clock=time.monotonic, on_trip=None):
+        """Initialize watchdog
+
+        `control_loop`: `ControlLoop` to watch
+        `network`: `Network` or `RobotFleet` to disable and zero
+        `bound` - `float`: Most seconds from the control loop's last tick
+         to the robot being disabled, checks run four times as often
+        `clock`: Monotonic time source, in seconds, the same as the
+         control loop's
+        `on_trip`: Called with each `Trip` after the robot is disabled,
+         from the watchdog thread, to bring driver station state in line
+        """
+        self.control_loop = control_loop
+        self.network = network
+        self.bound = bound
+        self.poll_interval = bound / 4
+        # A stall is caught by the first check after this, within `bound`
+        self.stall_after = bound - self.poll_interval
+        self._clock = clock
+        self.on_trip = on_trip
+
+        # Every trip so far
+        self.trips = []
+
+        self._stalled = False
+        self._network_connected = False
+        # Whether each robot of a `RobotFleet` was connected, by name
+        self._robots_connected = {}
+        self._connected_joysticks = 0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start watching on a thread of its own"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="Watchdog",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop watching"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.check()
+
+    def check(self):
+        """Check the control loop once, tripping if needed"""
+        display_state = self.control_loop.latest_display_state()
+        if display_state is None:
+            # Not started yet
+            return
+
+        now = self._clock()
+        tick_age = now - self.control_loop.last_tick_time
+        if tick_age > self.stall_after:
+            if not self._stalled:
+                self._stalled = True
+                self.trip(STALLED, now, tick_age)
+        else:
+            self._stalled = False
+
+        robots = getattr(self.network, 'robots', None)
+        if robots is None:
+            connected = display_state.connected
+            if self._network_connected and not connected:
+                self.trip(NETWORK_LOST, now, tick_age)
+            self._network_connected = connected
+        else:
+            # Robots are isolated from each other, losing one leaves
+            #  the others enabled
+            for name, robot in robots.items():
+                connected = robot.network.connected()
+                if self._robots_connected.get(name) and not connected:
+                    self.trip(NETWORK_LOST, now, tick_age, robot=name)
+                self._robots_connected[name] = connected
+
+        connected_joysticks = display_state.connected_joysticks
+        if connected_joysticks < self._connected_joysticks:
+            self.trip(JOYSTICK_LOST, now, tick_age)
+        self._connected_joysticks = connected_joysticks
+
+    def trip(self, reason: str, now: float, tick_age=0.0, robot=None):
+        """Disable the robot and zero joysticks, then record the trip
+
+        `robot`: Name of the only robot of a `RobotFleet` to disable and
+         zero, every robot when `None`
+
+        The network writes these straight away, without waiting for the
+         control loop or joystick publishing.
+        """
+        if robot is None:
+            self.network.set_enabled(False)
+            self.network.zero_joysticks()
+        else:
+            self.network.set_enabled(False, robot)
+            self.network.zero_joysticks(robot)
+        trip = Trip(reason, now, tick_age, self.control_loop.missed_ticks,
+                    self._clock() - now, robot)
+        self.trips.append(trip)
+        if self.on_trip is not None:
+            self.on_trip(trip)
+
+    def format_trips(self) -> str:
+        """Returns a line per trip with its timings"""
+        if not self.trips:
+            return "Watchdog trips: none"
+        return "\n".join(
+            "Watchdog trip: {}{}, last tick {:.0f} ms before, missed ticks "
+            "{}, disabled in {:.2f} ms".format(
+                trip.reason,
+                "" if trip.robot is None else " (" + trip.robot + ")",
+                trip.tick_age * 1e3, trip.missed_ticks, trip.reaction * 1e3)
+            for trip in self.trips)
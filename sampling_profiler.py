@@ -0,0 +1,181 @@
+"""Sampling profiler for diagnosing a running driver station
+
+Every `interval` seconds the Python stack of each thread is read with
+ `sys._current_frames`, so nothing is added to the control loop or GUI
+ code paths. Samples are tagged with the phase the thread was in,
+ worked out from the innermost driver station frame of the stack, and
+ counted by stack. A capture runs for a bounded window and is written
+ in the collapsed stack format read by flamegraph tools, one
+ `thread;phase;outer frame;...;inner frame count` line per stack.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+
+# Seconds between samples
+DEFAULT_INTERVAL = 0.005
+
+# Seconds a capture runs for unless told otherwise
+DEFAULT_DURATION = 10.0
+
+# Phase of stacks whose innermost driver station frame is in a file, or
+#  a function of a file, as `(file, function)` with `None` for any
+#  function of the file
+PHASES = {
+    ('control_loop.py', '_run'): 'idle',
+    ('control_loop.py', 'tick'): 'loop',
+    ('joysticks.py', 'wait_for_events'): 'idle',
+    ('joysticks.py', '_process'): 'process',
+    ('joysticks.py', None): 'poll',
+    ('axis_processing.py', None): 'process',
+    ('controller_mapping.py', None): 'process',
+    ('network.py', None): 'publish',
+    ('fleet.py', None): 'publish',
+    ('link_monitor.py', None): 'publish',
+    ('recording.py', None): 'record',
+    ('shared_state.py', None): 'record',
+    ('driverstation_gui.py', None): 'ui',
+    ('joystick_panel.py', None): 'ui',
+    ('ui_refresh.py', None): 'ui',
+    ('headless.py', 'run'): 'idle',
+    ('headless.py', None): 'ui',
+    ('py_driverstation.py', 'run_gui'): 'idle',
+}
+
+
+def phase_of(frames) -> str:
+    """Returns the phase of a stack, `frames` being its
+     `(file, function)` pairs from the innermost out"""
+    for file_name, function in frames:
+        phase = (PHASES.get((file_name, function)) or
+                 PHASES.get((file_name, None)))
+        if phase is not None:
+            return phase
+    return 'other'
+
+
+class SamplingProfiler:
+    """Counts the stacks of every thread, sampled from a thread of
+     its own while a capture runs"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, clock=time.perf_counter):
+        self.interval = interval
+        self._clock = clock
+        # Sample count by collapsed stack
+        self.stacks = collections.Counter()
+        self.samples = 0
+        # Seconds spent sampling, the time other threads were held up
+        self.overhead = 0.0
+        # `(file, function)` by code object, so each is worked out once
+        self._frame_names = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.file_name = None
+
+    @property
+    def running(self) -> bool:
+        """Is a capture running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _frame_name(self, code):
+        name = self._frame_names.get(code)
+        if name is None:
+            name = (os.path.basename(code.co_filename), code.co_name)
+            self._frame_names[code] = name
+        return name
+
+    def sample(self):
+        """Count the current stack of every thread but the caller"""
+        start = self._clock()
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name
+                 for thread in threading.enumerate()}
+        # pylint: disable=protected-access
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(self._frame_name(frame.f_code))
+                frame = frame.f_back
+            thread_name = names.get(ident, str(ident))
+            self.stacks[";".join(
+                [thread_name.replace(' ', '_').replace(';', '_'),
+                 phase_of(frames)] +
+                ["{}:{}".format(file_name, function)
+                 for file_name, function in reversed(frames)])] += 1
+        self.samples += 1
+        self.overhead += self._clock() - start
+
+    def capture(self, file_name: str, duration=DEFAULT_DURATION,
+                on_done=None) -> bool:
+        """Sample for `duration` seconds, then write the collapsed
+         stacks to `file_name`, returns `False` if a capture is
+         already running
+
+        `on_done`: Called with `file_name` once it's written, from the
+         sampling thread
+        """
+        if self.running:
+            return False
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.overhead = 0.0
+        self.file_name = file_name
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        args=(file_name, duration, on_done),
+                                        name="SamplingProfiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, file_name, duration, on_done):
+        deadline = self._clock() + duration
+        while (not self._stop_event.wait(self.interval) and
+               self._clock() < deadline):
+            self.sample()
+        self.write(file_name)
+        if on_done is not None:
+            on_done(file_name)
+
+    def stop(self):
+        """End a running capture early, waiting for it to be written"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def write(self, file_name: str):
+        """Write the collapsed stacks counted to `file_name`"""
+        with open(file_name, 'w') as profile_file:
+            for stack, count in sorted(self.stacks.items()):
+                profile_file.write("{} {}\n".format(stack, count))
+
+    def phase_shares(self) -> dict:
+        """Returns the share of samples in each phase, by phase, by
+         thread name"""
+        counts = {}
+        for stack, count in self.stacks.items():
+            thread_name, phase = stack.split(';', 2)[:2]
+            phases = counts.setdefault(thread_name, collections.Counter())
+            phases[phase] += count
+        return {thread_name: {phase: count / sum(phases.values())
+                              for phase, count in phases.items()}
+                for thread_name, phases in counts.items()}
+
+    def format_summary(self) -> str:
+        """Returns a line per thread with its share of samples in each
+         phase, and a line with the sampling overhead"""
+        lines = []
+        for thread_name, shares in sorted(self.phase_shares().items()):
+            lines.append("{}: {}".format(thread_name, ", ".join(
+                "{} {:.0%}".format(phase, share) for phase, share
+                in sorted(shares.items(), key=lambda item: -item[1]))))
+        lines.append("{} samples, {:.0f} us each".format(
+            self.samples,
+            self.overhead / self.samples * 1e6 if self.samples else 0))
+        return "\n".join(lines)
@@ -0,0 +1,245 @@
+"""Joystick state shared with other processes on the same computer
+
+`SharedJoystickState` writes each snapshot the control loop publishes
+ into a ring of slots in a `multiprocessing.shared_memory` block.
+ `SharedJoystickReader` reads the latest one from any process, at any
+ rate, without going through NetworkTables or holding up the writer.
+
+Each slot starts with a sequence number, odd while the slot is being
+ written, like a seqlock. Readers copy a slot out and check its sequence
+ number didn't change while they did, retrying otherwise. The writer
+ never waits for readers.
+
+Layout, all in native byte order without padding:
+- Header: magic `b'PDSJ'`, layout version, slot count, joysticks per
+  slot, slot size and count of snapshots written
+- Slots: sequence number, snapshot timestamp, snapshot sequence and
+  joystick count, then per joystick: connected, axis, button and POV
+  counts, button bitmask, `MAX_AXES` axes, `MAX_POVS` POVs and GUID
+"""
+
+from array import array
+import struct
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Python before 3.8
+    resource_tracker = shared_memory = None
+
+from joysticks import JoystickSnapshot
+
+# Error raised when shared memory isn't available
+UNSUPPORTED = "Sharing joysticks needs Python 3.8 or newer"
+
+MAGIC = b'PDSJ'
+LAYOUT_VERSION = 1
+
+# WPILib limits, joysticks beyond them are left out
+MAX_JOYSTICKS = 6
+MAX_AXES = 12
+MAX_POVS = 12
+MAX_BUTTONS = 64
+GUID_SIZE = 32
+
+HEADER = struct.Struct('=4sHHII')
+WRITE_COUNT = struct.Struct('=Q')
+WRITE_COUNT_OFFSET = HEADER.size
+SLOTS_OFFSET = WRITE_COUNT_OFFSET + WRITE_COUNT.size
+
+SLOT_SEQUENCE = struct.Struct('=Q')
+SLOT_HEADER = struct.Struct('=dqI')
+JOYSTICK_HEADER = struct.Struct('=?BBBQ')
+AXES_SIZE = MAX_AXES * 8
+POVS_SIZE = MAX_POVS * 2
+JOYSTICK_SIZE = JOYSTICK_HEADER.size + AXES_SIZE + POVS_SIZE + GUID_SIZE
+SLOT_SIZE = (SLOT_SEQUENCE.size + SLOT_HEADER.size +
+             MAX_JOYSTICKS * JOYSTICK_SIZE)
+
+# Reads retried before giving up on a writer that keeps overtaking
+READ_ATTEMPTS = 100
+
+
+class SharedJoystickState:
+    """Writes joystick snapshots into shared memory block `name`"""
+
+    def __init__(self, name: str, num_slots=8):
+        """Create shared memory block `name` holding `num_slots` snapshots
+
+        More slots give slow readers longer to copy a snapshot before
+         the writer comes round to its slot again.
+        """
+        if shared_memory is None:
+            raise RuntimeError(UNSUPPORTED)
+        self.name = name
+        self.num_slots = num_slots
+        self._memory = shared_memory.SharedMemory(
+            name, create=True, size=SLOTS_OFFSET + num_slots * SLOT_SIZE)
+        self._buf = self._memory.buf
+        HEADER.pack_into(self._buf, 0, MAGIC, LAYOUT_VERSION, num_slots,
+                         MAX_JOYSTICKS, SLOT_SIZE)
+        WRITE_COUNT.pack_into(self._buf, WRITE_COUNT_OFFSET, 0)
+        self.write_count = 0
+
+    def write(self, snapshot):
+        """Write `snapshot`, a `JoystickSnapshot`, as the latest state"""
+        buf = self._buf
+        count = self.write_count + 1
+        slot = SLOTS_OFFSET + (count % self.num_slots) * SLOT_SIZE
+
+        SLOT_SEQUENCE.pack_into(buf, slot, 2 * count - 1)
+        num_joysticks = min(len(snapshot.axes), MAX_JOYSTICKS)
+        SLOT_HEADER.pack_into(buf, slot + SLOT_SEQUENCE.size,
+                              snapshot.timestamp, snapshot.sequence,
+                              num_joysticks)
+
+        offset = slot + SLOT_SEQUENCE.size + SLOT_HEADER.size
+        connected = snapshot.connected
+        guids = snapshot.guids
+        for stick in range(num_joysticks):
+            axes = snapshot.axes[stick]
+            povs = snapshot.povs[stick]
+            num_axes = min(len(axes), MAX_AXES)
+            num_povs = min(len(povs), MAX_POVS)
+            num_buttons = min(snapshot.num_buttons[stick], MAX_BUTTONS)
+            JOYSTICK_HEADER.pack_into(
+                buf, offset,
+                connected[stick] if stick < len(connected) else True,
+                num_axes, num_buttons, num_povs,
+                snapshot.buttons[stick] & ((1 << num_buttons) - 1))
+            position = offset + JOYSTICK_HEADER.size
+            buf[position:position + num_axes * 8] = memoryview(
+                axes[:num_axes]).cast('B')
+            position += AXES_SIZE
+            buf[position:position + num_povs * 2] = memoryview(
+                povs[:num_povs]).cast('B')
+            position += POVS_SIZE
+            guid = guids[stick].encode('utf-8', 'replace')[:GUID_SIZE] \
+                if stick < len(guids) else b''
+            buf[position:position + GUID_SIZE] = guid.ljust(GUID_SIZE,
+                                                             b'\0')
+            offset += JOYSTICK_SIZE
+
+        SLOT_SEQUENCE.pack_into(buf, slot, 2 * count)
+        WRITE_COUNT.pack_into(buf, WRITE_COUNT_OFFSET, count)
+        self.write_count = count
+
+    def close(self):
+        """Close and remove the shared memory block, does nothing once
+         closed"""
+        if self._memory is None:
+            return
+        self._buf = None
+        self._memory.close()
+        try:
+            self._memory.unlink()
+        except FileNotFoundError:
+            # Already removed, e.g. by a reader's resource tracker
+            pass
+        self._memory = None
+
+
+class SharedJoystickReader:
+    """Reads the latest joystick snapshot from a `SharedJoystickState`
+     in another process"""
+
+    def __init__(self, name: str):
+        """Open shared memory block `name`, raises `FileNotFoundError`
+         if the driver station hasn't created it"""
+        if shared_memory is None:
+            raise RuntimeError(UNSUPPORTED)
+        try:
+            self._memory = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block to be
+            #  removed when this process exits, it belongs to the writer
+            self._memory = shared_memory.SharedMemory(name)
+            # pylint: disable=protected-access
+            resource_tracker.unregister(self._memory._name, 'shared_memory')
+        self._buf = self._memory.buf
+
+        magic, version, self.num_slots, max_joysticks, slot_size = \
+            HEADER.unpack_from(self._buf, 0)
+        if (magic, version, max_joysticks, slot_size) != (
+                MAGIC, LAYOUT_VERSION, MAX_JOYSTICKS, SLOT_SIZE):
+            self.close()
+            raise ValueError("Shared memory {} isn't joystick state of "
+                             "layout version {}".format(name, LAYOUT_VERSION))
+
+        self._snapshot = JoystickSnapshot()
+        # Read failures because the writer overtook the reader
+        self.retries = 0
+
+    @property
+    def write_count(self) -> int:
+        """Count of snapshots written so far, changes with each one"""
+        return WRITE_COUNT.unpack_from(self._buf, WRITE_COUNT_OFFSET)[0]
+
+    def read(self):
+        """Returns the latest `JoystickSnapshot`, or `None` if none has
+         been written yet
+
+        The snapshot is reused, its contents are only valid until the
+         next call.
+        """
+        buf = self._buf
+        for _ in range(READ_ATTEMPTS):
+            count = WRITE_COUNT.unpack_from(buf, WRITE_COUNT_OFFSET)[0]
+            if count == 0:
+                return None
+            slot = SLOTS_OFFSET + (count % self.num_slots) * SLOT_SIZE
+            sequence = 2 * count
+            if SLOT_SEQUENCE.unpack_from(buf, slot)[0] == sequence:
+                self._copy_slot(slot)
+                if SLOT_SEQUENCE.unpack_from(buf, slot)[0] == sequence:
+                    return self._snapshot
+            self.retries += 1
+        raise RuntimeError("Joystick state changed during every read")
+
+    def _copy_slot(self, slot):
+        buf = self._buf
+        snapshot = self._snapshot
+        snapshot.timestamp, snapshot.sequence, num_joysticks = \
+            SLOT_HEADER.unpack_from(buf, slot + SLOT_SEQUENCE.size)
+        # The slot may be mid-write, keep counts in range until checked
+        num_joysticks = min(num_joysticks, MAX_JOYSTICKS)
+
+        while len(snapshot.axes) < num_joysticks:
+            snapshot.axes.append(array('d'))
+            snapshot.povs.append(array('h'))
+        del snapshot.axes[num_joysticks:]
+        del snapshot.povs[num_joysticks:]
+        snapshot.buttons = [0] * num_joysticks
+        snapshot.num_buttons = [0] * num_joysticks
+        snapshot.connected = [False] * num_joysticks
+        snapshot.guids = [''] * num_joysticks
+
+        offset = slot + SLOT_SEQUENCE.size + SLOT_HEADER.size
+        for stick in range(num_joysticks):
+            (snapshot.connected[stick], num_axes, snapshot.num_buttons[stick],
+             num_povs, snapshot.buttons[stick]) = \
+                JOYSTICK_HEADER.unpack_from(buf, offset)
+            position = offset + JOYSTICK_HEADER.size
+            axes = snapshot.axes[stick]
+            del axes[:]
+            axes.frombytes(buf[position:position + min(num_axes,
+                                                       MAX_AXES) * 8])
+            position += AXES_SIZE
+            povs = snapshot.povs[stick]
+            del povs[:]
+            povs.frombytes(buf[position:position + min(num_povs,
+                                                       MAX_POVS) * 2])
+            position += POVS_SIZE
+            snapshot.guids[stick] = bytes(
+                buf[position:position + GUID_SIZE]).rstrip(b'\0').decode(
+                    'utf-8', 'replace')
+            offset += JOYSTICK_SIZE
+
+    def close(self):
+        """Detach from the shared memory block, leaving it in place,
+         does nothing once closed"""
+        if self._memory is None:
+            return
+        self._buf = None
+        self._memory.close()
+        self._memory = None
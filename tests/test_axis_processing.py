@@ -0,0 +1,151 @@
+"""Test module for `axis_processing.py`"""
+
+import unittest
+import unittest.mock
+from array import array
+
+import axis_processing
+import joysticks
+from axis_processing import AxisPipeline, AxisProfile
+
+
+def make_snapshot(axes, guids):
+    """Returns a `JoystickSnapshot` with `axes` of joysticks `guids`"""
+    snapshot = joysticks.JoystickSnapshot()
+    snapshot.axes = [array('d', stick_axes) for stick_axes in axes]
+    snapshot.buttons = [0] * len(axes)
+    snapshot.num_buttons = [0] * len(axes)
+    snapshot.povs = [array('h') for _ in axes]
+    snapshot.connected = [True] * len(axes)
+    snapshot.guids = list(guids)
+    return snapshot
+
+
+class TestAxisProfile(unittest.TestCase):
+    """Test class for `AxisProfile`"""
+
+    def test_deadband(self):
+        """Test that the deadband is zeroed and the rest rescaled"""
+        profile = AxisProfile(deadband=0.1)
+        self.assertEqual(profile.value(0.05), 0.0)
+        self.assertEqual(profile.value(-0.1), 0.0)
+        self.assertAlmostEqual(profile.value(0.55), 0.5)
+        self.assertAlmostEqual(profile.value(-1.0), -1.0)
+
+    def test_curves(self):
+        """Test expo and cubic response curves"""
+        self.assertAlmostEqual(AxisProfile(curve='cubic').value(0.5), 0.125)
+        self.assertAlmostEqual(AxisProfile(curve='cubic').value(-0.5),
+                               -0.125)
+        expo = AxisProfile(curve='expo', expo=0.5)
+        self.assertAlmostEqual(expo.value(0.5), 0.3125)
+        self.assertAlmostEqual(expo.value(1.0), 1.0)
+        with self.assertRaises(ValueError):
+            AxisProfile(curve='sine')
+
+    def test_invert_trim_calibration(self):
+        """Test inversion, trim and min/max calibration"""
+        self.assertEqual(AxisProfile(invert=True).value(0.25), -0.25)
+        self.assertAlmostEqual(AxisProfile(trim=0.1).value(0.1), 0.0)
+        calibrated = AxisProfile(minimum=-0.8, maximum=0.5)
+        self.assertAlmostEqual(calibrated.value(-0.8), -1.0)
+        self.assertAlmostEqual(calibrated.value(0.25), 0.5)
+        self.assertEqual(calibrated.value(0.9), 1.0)
+        with self.assertRaises(ValueError):
+            AxisProfile(minimum=0.1)
+
+    def test_identity(self):
+        """Test that profiles changing nothing are recognized"""
+        self.assertTrue(AxisProfile().is_identity)
+        self.assertTrue(AxisProfile(curve='expo').is_identity)
+        self.assertFalse(AxisProfile(deadband=0.05).is_identity)
+        self.assertFalse(AxisProfile(invert=True).is_identity)
+
+    def test_table(self):
+        """Test that the lookup table matches the profile"""
+        profile = AxisProfile(deadband=0.05, curve='expo', expo=0.3)
+        table = profile.table()
+        self.assertEqual(len(table), axis_processing.TABLE_SIZE)
+        self.assertEqual(table[0], -1.0)
+        self.assertEqual(table[axis_processing.TABLE_SIZE // 2], 0.0)
+        self.assertEqual(table[-1], 1.0)
+
+
+class TestAxisPipeline(unittest.TestCase):
+    """Test class for `AxisPipeline`"""
+
+    profiles = {
+        'gamepad': {0: AxisProfile(deadband=0.1),
+                    1: AxisProfile(invert=True, curve='cubic'),
+                    2: AxisProfile()}
+    }
+
+    def check_pipeline(self, use_numpy):
+        """Test conditioning by a pipeline using NumPy or not"""
+        pipeline = AxisPipeline(self.profiles, use_numpy=use_numpy)
+        snapshot = make_snapshot([[0.05, 0.5, 0.123456], [0.05, 0.5]],
+                                 ['gamepad', 'flight'])
+        snapshot.sequence = 4
+        conditioned = pipeline.apply(snapshot)
+
+        self.assertEqual(conditioned.sequence, 4)
+        self.assertIs(conditioned.buttons, snapshot.buttons)
+        self.assertEqual(conditioned.axes[0][0], 0.0)
+        self.assertAlmostEqual(conditioned.axes[0][1], -0.125, places=3)
+        # Axes without a profile are passed through exactly
+        self.assertEqual(conditioned.axes[0][2], 0.123456)
+        self.assertIs(conditioned.axes[1], snapshot.axes[1])
+        # Raw axes are left alone
+        self.assertEqual(list(snapshot.axes[0]), [0.05, 0.5, 0.123456])
+
+        # Conditioned values stay within lookup error of the profile
+        profile = self.profiles['gamepad'][0]
+        for step in range(-100, 101):
+            snapshot.axes[0][0] = step / 100.0 + 0.0001
+            self.assertAlmostEqual(pipeline.apply(snapshot).axes[0][0],
+                                   profile.value(snapshot.axes[0][0]),
+                                   delta=0.001)
+        snapshot.axes[0][0] = 1.5
+        self.assertEqual(pipeline.apply(snapshot).axes[0][0], 1.0)
+
+        # Joysticks changing are picked up
+        snapshot.axes.reverse()
+        snapshot.guids.reverse()
+        conditioned = pipeline.apply(snapshot)
+        self.assertIs(conditioned.axes[0], snapshot.axes[0])
+        self.assertAlmostEqual(conditioned.axes[1][1], -0.125, places=3)
+
+    def test_pipeline(self):
+        """Test conditioning in plain Python"""
+        self.check_pipeline(False)
+
+    @unittest.skipIf(axis_processing._load_numpy() is None,
+                     "NumPy isn't installed")
+    def test_pipeline_numpy(self):
+        """Test conditioning with NumPy"""
+        self.check_pipeline(True)
+
+    def test_joysticks(self):
+        """Test that event driven joysticks are conditioned from raw
+         axes each snapshot, not conditioned again"""
+        pygame_mock = unittest.mock.Mock()
+        joystick_mock = unittest.mock.Mock()
+        joystick_mock.get_instance_id.return_value = 10
+        joystick_mock.get_guid.return_value = 'gamepad'
+        joystick_mock.get_numaxes.return_value = 2
+        joystick_mock.get_numbuttons.return_value = 0
+        joystick_mock.get_numhats.return_value = 0
+        joystick_mock.get_axis.return_value = 0.5
+        pygame_mock.joystick.Joystick.return_value = joystick_mock
+        pygame_mock.joystick.get_count.return_value = 1
+        pygame_mock.event.get.return_value = []
+        stick = joysticks.Joysticks(
+            pygame_mock, event_driven=True,
+            axis_pipeline=AxisPipeline(self.profiles, use_numpy=False))
+
+        self.assertAlmostEqual(stick.snapshot().axes[0][1], -0.125,
+                               places=3)
+        self.assertAlmostEqual(stick.snapshot().axes[0][1], -0.125,
+                               places=3)
+        self.assertAlmostEqual(stick.get_joystick(0)["axes"][0], 0.444,
+                               places=3)
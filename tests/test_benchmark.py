@@ -0,0 +1,75 @@
+"""Test module for `benchmark.py`"""
+
+import unittest
+
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test class for the update path benchmark"""
+
+    def test_run_case_deterministic(self):
+        """Test that writes per tick are the same from run to run"""
+        first = benchmark.run_case(2, 'gamepad', 'channels', ticks=50)
+        second = benchmark.run_case(2, 'gamepad', 'channels', ticks=50)
+
+        self.assertEqual(first['puts_per_tick'], second['puts_per_tick'])
+        self.assertGreater(first['puts_per_tick'], 0)
+        self.assertGreater(first['ticks_per_sec'], 0)
+
+    def test_run_case_allocations(self):
+        """Test that memory allocated and freed within a tick is counted"""
+        result = benchmark.run_case(1, 'gamepad', 'packed', ticks=20)
+        # Every tick allocates at least the `DisplayState` it hands over
+        self.assertGreater(result['alloc_bytes_per_tick'], 0)
+        self.assertGreaterEqual(result['max_alloc_bytes_per_tick'],
+                                result['alloc_bytes_per_tick'])
+
+    def test_packed_mode_fewer_puts(self):
+        """Test that packed mode makes fewer writes for the same input"""
+        channels = benchmark.run_case(1, 'wheel', 'channels', ticks=50)
+        packed = benchmark.run_case(1, 'wheel', 'packed', ticks=50)
+        self.assertLess(packed['puts_per_tick'], channels['puts_per_tick'])
+
+    def test_loopback_case(self):
+        """Test that the control loop runs end to end against the
+         loopback server, with latency bounded by the send interval"""
+        result = benchmark.run_loopback_case(2, 'packed', 100, duration=0.3,
+                                             update_rate=0.02)
+        self.assertGreater(result['ticks'], 10)
+        self.assertGreater(result['entries_per_sec'], 0)
+        self.assertGreater(result['writes_per_sec'],
+                           result['entries_per_sec'])
+        self.assertGreater(result['cpu_us_per_tick'], 0)
+        self.assertGreater(result['latency_ms']['p50'], 0)
+        # Generous, test machines can be slow
+        self.assertLess(result['latency_ms']['p50'], 200)
+        self.assertGreater(result['delivered'], 0)
+
+    def test_compare(self):
+        """Test that sweeps are compared case by case"""
+        old = {'results': [{'sticks': 1, 'layout': 'gamepad',
+                            'publish_mode': 'packed', 'us_per_tick': 10.0,
+                            'puts_per_tick': 2.0}]}
+        new = {'results': [{'sticks': 1, 'layout': 'gamepad',
+                            'publish_mode': 'packed', 'us_per_tick': 12.0,
+                            'puts_per_tick': 1.5}]}
+        self.assertEqual(benchmark.compare(old, new),
+                         ["1 sticks, gamepad, packed: +20.0% us/tick, "
+                          "-0.500 puts/tick"])
+
+        old['results'][0]['alloc_bytes_per_tick'] = 200.0
+        new['results'][0]['alloc_bytes_per_tick'] = 150.0
+        self.assertEqual(benchmark.compare(old, new),
+                         ["1 sticks, gamepad, packed: +20.0% us/tick, "
+                          "-0.500 puts/tick, -50.0 alloc bytes/tick"])
+
+        old = {'results': [{'sticks': 1, 'layout': 'gamepad',
+                            'publish_mode': 'packed', 'rate': 100,
+                            'cpu_us_per_tick': 50.0,
+                            'latency_ms': {'p50': 50.0}}]}
+        new = {'results': [dict(old['results'][0], cpu_us_per_tick=40.0,
+                                latency_ms={'p50': 45.0})]}
+        self.assertEqual(benchmark.compare(old, new),
+                         ["1 sticks, packed, 100 Hz: -20.0% CPU us/tick, "
+                          "-5.000 ms p50 latency"])
@@ -0,0 +1,140 @@
+"""Test module for `control_loop.py`"""
+
+import time
+import unittest
+import unittest.mock
+
+import control_loop
+
+
+class TestControlLoop(unittest.TestCase):
+    """Test class for `ControlLoop`"""
+
+    def test_next_deadline(self):
+        """Test that deadlines advance by whole periods without drift"""
+        self.assertEqual(control_loop.next_deadline(1.0, 1.003, 0.01),
+                         (1.01, 0))
+
+        # Tick overran by two and a half periods
+        deadline, missed = control_loop.next_deadline(1.0, 1.035, 0.01)
+        self.assertEqual(missed, 3)
+        self.assertAlmostEqual(deadline, 1.04)
+
+    def test_rate_range(self):
+        """Test that rates outside the supported range are rejected"""
+        with self.assertRaises(ValueError):
+            control_loop.ControlLoop(None, None, rate=10)
+        with self.assertRaises(ValueError):
+            control_loop.ControlLoop(None, None, rate=1000)
+
+    def test_tick(self):
+        """Test that a tick polls joysticks, publishes them and
+         hands display state back"""
+        joysticks_mock = unittest.mock.Mock()
+        snapshot_mock = unittest.mock.Mock(sequence=7, timestamp=2.0,
+                                           axes=[[0.0], [0.0]])
+        joysticks_mock.snapshot.return_value = snapshot_mock
+        network_mock = unittest.mock.Mock()
+        network_mock.connected.return_value = True
+
+        loop = control_loop.ControlLoop(joysticks_mock, network_mock)
+        self.assertIsNone(loop.latest_display_state())
+
+        loop.tick()
+        self.assertTrue(joysticks_mock.update.called)
+        network_mock.publish_snapshot.assert_called_once_with(snapshot_mock)
+
+        state = loop.latest_display_state()
+        self.assertTrue(state.connected)
+        self.assertEqual(state.sequence, 7)
+        self.assertEqual(state.num_joysticks, 2)
+
+    def test_display_snapshot(self):
+        """Test that snapshots are only copied for display when asked"""
+        joysticks_mock = unittest.mock.Mock()
+        joysticks_mock.snapshot.return_value = unittest.mock.Mock(axes=[])
+        loop = control_loop.ControlLoop(joysticks_mock, unittest.mock.Mock())
+        loop.tick()
+        self.assertIsNone(loop.latest_snapshot())
+        self.assertFalse(joysticks_mock.snapshot.return_value.copy.called)
+
+        loop.request_snapshot()
+        loop.tick()
+        loop.tick()
+        copy = joysticks_mock.snapshot.return_value.copy
+        copy.assert_called_once_with()
+        self.assertIs(loop.latest_snapshot(), copy.return_value)
+
+    def test_tick_shared_state(self):
+        """Test that each published snapshot is shared locally"""
+        joysticks_mock = unittest.mock.Mock()
+        joysticks_mock.snapshot.return_value = unittest.mock.Mock(axes=[])
+        shared_state_mock = unittest.mock.Mock()
+        loop = control_loop.ControlLoop(joysticks_mock, unittest.mock.Mock(),
+                                        shared_state=shared_state_mock)
+        loop.tick()
+        shared_state_mock.write.assert_called_once_with(
+            joysticks_mock.snapshot.return_value)
+
+    def test_thread(self):
+        """Test that the loop ticks on its own thread until stopped"""
+        joysticks_mock = unittest.mock.Mock(event_driven=False)
+        joysticks_mock.snapshot.return_value = unittest.mock.Mock(axes=[])
+        network_mock = unittest.mock.Mock()
+
+        loop = control_loop.ControlLoop(joysticks_mock, network_mock,
+                                        rate=200)
+        loop.start()
+        self.assertTrue(loop.running)
+        time.sleep(0.1)
+        loop.stop()
+        self.assertFalse(loop.running)
+
+        ticks = network_mock.publish_snapshot.call_count
+        self.assertGreater(ticks, 5)
+        time.sleep(0.02)
+        self.assertEqual(network_mock.publish_snapshot.call_count, ticks)
+
+    def test_tick_stats(self):
+        """Test that ticks are timed when stats are enabled"""
+        joysticks_mock = unittest.mock.Mock()
+        joysticks_mock.snapshot.return_value = unittest.mock.Mock(axes=[])
+        network_mock = unittest.mock.Mock()
+        network_mock.write_stats.published = 0
+
+        def publish(_snapshot):
+            network_mock.write_stats.published += 4
+        network_mock.publish_snapshot.side_effect = publish
+
+        stats_mock = unittest.mock.Mock()
+        loop = control_loop.ControlLoop(joysticks_mock, network_mock,
+                                        stats=stats_mock)
+        loop.tick(0.002)
+
+        lateness, poll_time, publish_time, puts = \
+            stats_mock.record_tick.call_args[0]
+        self.assertEqual(lateness, 0.002)
+        self.assertGreaterEqual(poll_time, 0.0)
+        self.assertGreaterEqual(publish_time, 0.0)
+        self.assertEqual(puts, 4)
+
+    def test_wait_for_input(self):
+        """Test that joystick changes are published as soon as
+         their events arrive"""
+        joysticks_mock = unittest.mock.Mock()
+        joysticks_mock.wait_for_events.side_effect = [{1}, set(), {0, 1}]
+        network_mock = unittest.mock.Mock()
+        clock = unittest.mock.Mock(side_effect=[0.0, 0.003, 0.006, 0.01])
+
+        loop = control_loop.ControlLoop(joysticks_mock, network_mock,
+                                        clock=clock)
+        loop.wait_for_input(0.01)
+
+        joysticks_mock.wait_for_events.assert_has_calls([
+            unittest.mock.call(0.01), unittest.mock.call(0.007),
+            unittest.mock.call(0.004)])
+        snapshot = joysticks_mock.snapshot.return_value
+        network_mock.publish_snapshot.assert_has_calls([
+            unittest.mock.call(snapshot, {1}),
+            unittest.mock.call(snapshot, {0, 1})])
+        self.assertEqual(network_mock.publish_snapshot.call_count, 2)
@@ -0,0 +1,147 @@
+"""Test module for `controller_mapping.py`"""
+
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+from array import array
+
+import joysticks
+from axis_processing import AxisPipeline, AxisProfile
+from controller_mapping import ControllerMapper, ControllerMapping, \
+    MappingStore
+
+
+def make_snapshot():
+    """Returns a `JoystickSnapshot` of a gamepad and a flight stick"""
+    snapshot = joysticks.JoystickSnapshot()
+    snapshot.sequence = 3
+    snapshot.axes = [array('d', [0.1, 0.2, 0.3]), array('d', [0.5])]
+    snapshot.buttons = [0b1000000101, 1]
+    snapshot.num_buttons = [10, 1]
+    snapshot.povs = [array('h', [90]), array('h')]
+    snapshot.connected = [True, True]
+    snapshot.guids = ['gamepad', 'flight']
+    return snapshot
+
+
+class TestControllerMapping(unittest.TestCase):
+    """Test class for `ControllerMapping`, `MappingStore` and
+     `ControllerMapper`"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_name = os.path.join(directory.name, 'mappings.json')
+        self.mapping = ControllerMapping(
+            "Gamepad", axes=[1, 0, None, 2], buttons=[9, 2, None, 0],
+            povs=[None, 0])
+
+    def write_mappings(self, mappings):
+        """Write `mappings`, by GUID, to the mappings file"""
+        with open(self.file_name, 'w') as mappings_file:
+            json.dump({guid: mapping.to_dict()
+                       for guid, mapping in mappings.items()}, mappings_file)
+
+    def test_bad_mappings(self):
+        """Test that bad indexes are rejected"""
+        with self.assertRaises(ValueError):
+            ControllerMapping(axes=[0, -1])
+        with self.assertRaises(ValueError):
+            ControllerMapping(buttons=['A'])
+        with self.assertRaises(ValueError):
+            ControllerMapping(buttons=list(range(65)))
+
+    def test_store(self):
+        """Test that mappings are read when first needed, and read again
+         for a joystick without one once the file changes"""
+        store = MappingStore(self.file_name)
+        self.assertIsNone(store.get('gamepad'))
+
+        store.put('gamepad', self.mapping)
+        self.assertEqual(MappingStore(self.file_name).get(
+            'gamepad').to_dict(), self.mapping.to_dict())
+
+        other_store = MappingStore(self.file_name)
+        self.assertIsNone(other_store.get('flight'))
+        store.put('flight', ControllerMapping("Flight", axes=[0]))
+        # Make sure the file looks changed on coarse clocks
+        os.utime(self.file_name, ns=(0, 0))
+        self.assertEqual(other_store.get('flight').name, "Flight")
+
+        # Known joysticks don't check the file
+        with unittest.mock.patch('os.stat') as stat_mock:
+            other_store.get('gamepad')
+            self.assertFalse(stat_mock.called)
+
+    def test_mapper(self):
+        """Test that mapped joysticks are rearranged, others
+         passed through"""
+        self.write_mappings({'gamepad': self.mapping})
+        mapper = ControllerMapper(MappingStore(self.file_name))
+        snapshot = make_snapshot()
+        mapped = mapper.apply(snapshot)
+
+        self.assertEqual(mapped.sequence, 3)
+        self.assertEqual(list(mapped.axes[0]), [0.2, 0.1, 0.0, 0.3])
+        self.assertEqual(mapped.unpack_buttons(0), [1, 1, 0, 1])
+        self.assertEqual(mapped.num_buttons, [4, 1])
+        self.assertEqual(list(mapped.povs[0]), [-1, 90])
+        self.assertIs(mapped.axes[1], snapshot.axes[1])
+        self.assertEqual(mapped.buttons[1], 1)
+        # Raw state is left alone
+        self.assertEqual(list(snapshot.axes[0]), [0.1, 0.2, 0.3])
+        self.assertEqual(snapshot.buttons[0], 0b1000000101)
+
+        # Changes are picked up without rebuilding
+        mapped_axes = mapped.axes[0]
+        snapshot.axes[0][2] = -0.5
+        snapshot.buttons[0] = 0b100
+        snapshot.povs[0][0] = -1
+        mapped = mapper.apply(snapshot)
+        self.assertIs(mapped.axes[0], mapped_axes)
+        self.assertEqual(list(mapped.axes[0]), [0.2, 0.1, 0.0, -0.5])
+        self.assertEqual(mapped.unpack_buttons(0), [0, 1, 0, 0])
+        self.assertEqual(list(mapped.povs[0]), [-1, -1])
+
+    def test_mapper_hot_plug(self):
+        """Test that a joystick plugged in with fewer inputs than its
+         mapping, or a mapping added later, is handled"""
+        store = MappingStore(self.file_name)
+        mapper = ControllerMapper(store)
+        snapshot = make_snapshot()
+        self.assertIs(mapper.apply(snapshot).axes[0], snapshot.axes[0])
+
+        self.write_mappings({'gamepad': self.mapping})
+        os.utime(self.file_name, ns=(0, 0))
+        snapshot.axes[0] = array('d', [0.1])
+        snapshot.num_buttons[0] = 3
+        snapshot.buttons[0] = 0b111
+        mapped = mapper.apply(snapshot)
+        self.assertEqual(list(mapped.axes[0]), [0.0, 0.1, 0.0, 0.0])
+        self.assertEqual(mapped.unpack_buttons(0), [0, 1, 0, 1])
+
+    def test_joysticks(self):
+        """Test that `Joysticks` remaps before conditioning axes, so
+         profiles use mapped axis numbers"""
+        self.write_mappings({'gamepad': ControllerMapping(axes=[1, 0])})
+        pygame_mock = unittest.mock.Mock()
+        joystick_mock = unittest.mock.Mock()
+        joystick_mock.get_instance_id.return_value = 10
+        joystick_mock.get_guid.return_value = 'gamepad'
+        joystick_mock.get_numaxes.return_value = 2
+        joystick_mock.get_numbuttons.return_value = 0
+        joystick_mock.get_numhats.return_value = 0
+        joystick_mock.get_axis.side_effect = lambda axis: (0.5, 0.25)[axis]
+        pygame_mock.joystick.Joystick.return_value = joystick_mock
+        pygame_mock.joystick.get_count.return_value = 1
+        pygame_mock.event.get.return_value = []
+        stick = joysticks.Joysticks(
+            pygame_mock,
+            axis_pipeline=AxisPipeline({'gamepad': {0: AxisProfile(
+                invert=True)}}, use_numpy=False),
+            mapper=ControllerMapper(MappingStore(self.file_name)))
+
+        self.assertEqual(list(stick.snapshot().axes[0]), [-0.25, 0.5])
+        self.assertEqual(stick.get_joystick(0)["axes"], [-0.25, 0.5])
@@ -0,0 +1,164 @@
+"""Test module for `fleet.py`"""
+
+import threading
+import time
+import unittest
+import unittest.mock
+
+import fleet
+import joysticks
+
+
+def make_snapshot(sequence):
+    """Returns a `JoystickSnapshot` of two joysticks"""
+    snapshot = joysticks.JoystickSnapshot()
+    snapshot.sequence = sequence
+    snapshot.axes = [[0.0], [0.0]]
+    return snapshot
+
+
+def wait_for(condition, timeout=1.0):
+    """Wait until `condition()` is true, returns whether it became true"""
+    give_up = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > give_up:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+class TestRobotFleet(unittest.TestCase):
+    """Test class for `RobotLink` and `RobotFleet`"""
+
+    def setUp(self):
+        self.robots = []
+
+    def tearDown(self):
+        for robot in self.robots:
+            robot.stop()
+
+    def make_robot(self, name, joystick_map=None):
+        """Returns a `RobotLink` publishing to a mock `Network`"""
+        robot = fleet.RobotLink(name, unittest.mock.Mock(), joystick_map)
+        self.robots.append(robot)
+        return robot
+
+    def block_publishing(self, robot):
+        """Make `robot`'s publishes wait until the returned event is set"""
+        release = threading.Event()
+        robot.network.publish_snapshot.side_effect = (
+            lambda *args: release.wait(1.0))
+        return release
+
+    def test_submit_publishes_with_joystick_map(self):
+        """Test that submitted snapshots are published with the
+         robot's joystick map"""
+        robot = self.make_robot("alpha", [1, 0])
+        snapshot = make_snapshot(1)
+        robot.submit(snapshot, [1])
+        self.assertTrue(wait_for(
+            lambda: robot.network.publish_snapshot.called))
+        robot.network.publish_snapshot.assert_called_once_with(
+            snapshot, {1}, (1, 0))
+
+    def test_submit_coalesces(self):
+        """Test that a snapshot waiting to be published is replaced
+         by a newer one, keeping both snapshots' changed joysticks"""
+        robot = self.make_robot("alpha")
+        release = self.block_publishing(robot)
+
+        robot.submit(make_snapshot(1), [0])
+        self.assertTrue(wait_for(
+            lambda: robot.network.publish_snapshot.called))
+
+        robot.submit(make_snapshot(2), [0])
+        latest = make_snapshot(3)
+        robot.submit(latest, [1])
+        self.assertEqual(robot.skipped_snapshots, 1)
+
+        release.set()
+        self.assertTrue(wait_for(
+            lambda: robot.network.publish_snapshot.call_count == 2))
+        robot.network.publish_snapshot.assert_called_with(latest, {0, 1},
+                                                          None)
+
+        # All joysticks changed in a skipped snapshot means all joysticks
+        robot.network.publish_snapshot.side_effect = None
+        robot.submit(make_snapshot(4), None)
+        robot.submit(make_snapshot(5), [1])
+        self.assertTrue(wait_for(
+            lambda: robot.network.publish_snapshot.call_args[0][1] is None))
+
+    def test_slow_robot_doesnt_stall_others(self):
+        """Test that publishing returns straight away, and robots
+         publish independently"""
+        slow = self.make_robot("slow")
+        fast = self.make_robot("fast", [1])
+        release = self.block_publishing(slow)
+        robot_fleet = fleet.RobotFleet([slow, fast])
+
+        snapshot = make_snapshot(1)
+        start = time.monotonic()
+        for _ in range(5):
+            robot_fleet.publish_snapshot(snapshot)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        self.assertTrue(wait_for(
+            lambda: fast.network.publish_snapshot.called))
+        self.assertEqual(slow.network.publish_snapshot.call_count, 1)
+        release.set()
+
+        # Robots are handed a copy, not the reused snapshot
+        published = fast.network.publish_snapshot.call_args[0][0]
+        self.assertIsNot(published, snapshot)
+        self.assertEqual(published.sequence, 1)
+
+    def test_mode_and_enabled(self):
+        """Test that mode and enabled go to every robot, or one"""
+        alpha = self.make_robot("alpha")
+        bravo = self.make_robot("bravo")
+        robot_fleet = fleet.RobotFleet([alpha, bravo])
+
+        robot_fleet.set_game_mode("teleop")
+        robot_fleet.set_enabled(True, "bravo")
+        self.assertEqual((alpha.mode, alpha.enabled), ("teleop", False))
+        self.assertEqual((bravo.mode, bravo.enabled), ("teleop", True))
+        alpha.network.set_enabled.assert_not_called()
+        bravo.network.set_enabled.assert_called_once_with(True)
+
+        robot_fleet.set_game_mode("test", "alpha")
+        alpha.network.set_game_mode.assert_called_with("test")
+        bravo.network.set_game_mode.assert_called_once_with("teleop")
+
+        with self.assertRaises(ValueError):
+            robot_fleet.set_enabled(True, "charlie")
+        with self.assertRaises(ValueError):
+            robot_fleet.change_server("10.0.0.2")
+        robot_fleet.change_server("10.0.0.2", "alpha")
+        alpha.network.change_server.assert_called_once_with("10.0.0.2")
+
+    def test_fleet_stats_and_connection(self):
+        """Test that write counts add up and connected means every
+         robot is connected"""
+        alpha = self.make_robot("alpha")
+        bravo = self.make_robot("bravo")
+        alpha.network.write_stats.published = 3
+        alpha.network.write_stats.suppressed = 1
+        alpha.network.write_stats.deferred = 2
+        bravo.network.write_stats.published = 4
+        bravo.network.write_stats.suppressed = 0
+        bravo.network.write_stats.deferred = 0
+        alpha.network.connected.return_value = True
+        bravo.network.connected.return_value = False
+        robot_fleet = fleet.RobotFleet([alpha, bravo])
+
+        self.assertEqual(robot_fleet.published_writes, 7)
+        self.assertEqual(robot_fleet.suppressed_writes, 1)
+        self.assertEqual(robot_fleet.write_stats.deferred, 2)
+        self.assertFalse(robot_fleet.connected())
+        bravo.network.connected.return_value = True
+        self.assertTrue(robot_fleet.connected())
+
+        robot_fleet.shutdown()
+        self.assertTrue(alpha.network.shutdown.called)
+        self.assertTrue(bravo.network.shutdown.called)
@@ -0,0 +1,171 @@
+"""Test module for `headless.py`"""
+
+import io
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+import unittest.mock
+
+import headless
+import recording
+from tests.test_recording import make_snapshot
+
+
+class TestHeadlessDriverStation(unittest.TestCase):
+    """Test class for `HeadlessDriverStation`"""
+
+    def setUp(self):
+        self.network_mock = unittest.mock.Mock()
+        self.network_mock.write_stats.published = 0
+        # A single robot `Network`, not a `RobotFleet`
+        del self.network_mock.robots
+        # No heartbeat echoed
+        self.network_mock.table.getNumber.return_value = 0
+        self.joysticks_mock = unittest.mock.Mock(event_driven=False)
+        self.joysticks_mock.snapshot.return_value = unittest.mock.Mock(
+            axes=[])
+        self.config_mock = unittest.mock.Mock(
+            loop_rate=100, instrumentation=True, watchdog_timeout=0.2)
+        self.config_mock.reload_if_changed.return_value = frozenset()
+        self.recorder_mock = unittest.mock.Mock()
+        self.driver_station = headless.HeadlessDriverStation(
+            self.network_mock, self.config_mock, self.joysticks_mock,
+            self.recorder_mock)
+
+    def test_starts_disabled(self):
+        """Test that the robot starts disabled in autonomous"""
+        self.network_mock.set_enabled.assert_called_once_with(False)
+        self.network_mock.set_game_mode.assert_called_once_with('autonomous')
+
+    def test_commands(self):
+        """Test that commands set mode and enabled"""
+        station = self.driver_station
+        station.handle_command("enable\n")
+        self.network_mock.set_enabled.assert_called_with(True)
+        self.recorder_mock.record_enabled.assert_called_with(True, None)
+
+        # Changing mode disables the robot
+        station.handle_command("mode Teleop")
+        self.network_mock.set_enabled.assert_called_with(False)
+        self.network_mock.set_game_mode.assert_called_with('teleop')
+        self.recorder_mock.record_mode.assert_called_with('teleop', None)
+
+        self.assertTrue(station.handle_command("status").startswith(
+            "teleop, disabled"))
+        self.assertIn("Usage", station.handle_command("mode practice"))
+        self.assertIn("Unknown command", station.handle_command("fly"))
+        self.assertIn("jitter", station.handle_command("timings"))
+
+        self.assertFalse(station.quitting)
+        station.handle_command("quit")
+        self.assertTrue(station.quitting)
+
+    def test_run_terminal(self):
+        """Test that terminal commands run until the input ends, then
+         the robot is disabled and everything shut down"""
+        output = io.StringIO()
+        self.driver_station.start()
+        self.driver_station.run(io.StringIO("enable\nstatus\n"), output)
+
+        self.assertIn("autonomous, enabled", output.getvalue())
+        self.network_mock.set_enabled.assert_called_with(False)
+        self.assertFalse(self.driver_station.control_loop.running)
+        self.assertTrue(self.joysticks_mock.quit.called)
+        self.assertTrue(self.recorder_mock.close.called)
+        self.assertTrue(self.network_mock.shutdown.called)
+        self.assertTrue(self.config_mock.close.called)
+
+    def test_reload_config(self):
+        """Test that axis profiles and the robot ip changed in the
+         config file are applied"""
+        self.driver_station.set_enabled(True)
+        self.config_mock.reload_if_changed.return_value = frozenset(
+            ['axis_profiles', 'remote_ip'])
+        self.config_mock.axis_profiles = {}
+        self.config_mock.remote_ip = '10.0.0.9'
+        with unittest.mock.patch('sys.stderr'):
+            changed = self.driver_station.reload_config()
+
+        self.assertEqual(changed, {'axis_profiles', 'remote_ip'})
+        self.assertIsNone(self.joysticks_mock.axis_pipeline)
+        self.network_mock.set_enabled.assert_called_with(False)
+        self.network_mock.change_server_async.assert_called_once_with(
+            '10.0.0.9')
+
+    def test_profile_command(self):
+        """Test that the profile command starts a single capture"""
+        self.driver_station.profiler = unittest.mock.Mock()
+        self.driver_station.profiler.capture.return_value = True
+        self.assertTrue(self.driver_station.handle_command(
+            "profile 2").startswith("Profiling for 2.0 s to ds_profile_"))
+        self.assertEqual(
+            self.driver_station.profiler.capture.call_args[0][1], 2.0)
+        self.assertEqual(self.driver_station.handle_command("profile x"),
+                         "Usage: profile [SECONDS]")
+
+    def test_control_socket(self):
+        """Test that commands are accepted on the control socket"""
+        port = self.driver_station.serve(0)
+        with socket.create_connection(('127.0.0.1', port), 1.0) as client:
+            client_file = client.makefile('rw')
+            client_file.write("enable\nquit\n")
+            client_file.flush()
+            self.assertTrue(client_file.readline().startswith(
+                "autonomous, enabled"))
+            self.assertEqual(client_file.readline(), "Quitting\n")
+
+        self.network_mock.set_enabled.assert_called_with(True)
+        self.driver_station.run(io.StringIO(), io.StringIO())
+        self.assertTrue(self.network_mock.shutdown.called)
+
+    def test_robot_commands(self):
+        """Test that commands naming a robot only change that robot,
+         and are recorded"""
+        self.network_mock.robots = {'alpha': unittest.mock.Mock(),
+                                    'bravo': unittest.mock.Mock()}
+        station = self.driver_station
+
+        station.handle_command("enable bravo")
+        self.network_mock.set_enabled.assert_called_with(True, 'bravo')
+        self.recorder_mock.record_enabled.assert_called_with(True, 'bravo')
+        self.assertFalse(station.enabled)
+
+        station.handle_command("mode test alpha")
+        self.network_mock.set_enabled.assert_called_with(False, 'alpha')
+        self.network_mock.set_game_mode.assert_called_with('test', 'alpha')
+        self.recorder_mock.record_mode.assert_called_with('test', 'alpha')
+        self.assertEqual(station.mode, 'autonomous')
+
+        self.assertEqual(station.handle_command("enable charlie"),
+                         "Unknown robot: charlie")
+        self.assertIn("  alpha: ", station.handle_command("status"))
+
+    def test_replay_goes_through_station(self):
+        """Test that a replayed enable changes driver station state
+         as well as the robot's, so status and robot agree"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        file_name = os.path.join(directory, 'match.dsrec')
+        clock = unittest.mock.Mock(return_value=10.0)
+        recorder = recording.Recorder(file_name, clock=clock)
+        recorder.record_snapshot(make_snapshot(10.0, 1, 0.1, 0))
+        recorder.record_mode("teleop")
+        recorder.record_enabled(True)
+        recorder.close()
+
+        replay = recording.ReplayJoysticks(
+            file_name, clock=unittest.mock.Mock(return_value=100.0))
+        self.addCleanup(replay.quit)
+        station = headless.HeadlessDriverStation(
+            self.network_mock, unittest.mock.Mock(loop_rate=100,
+                                                  instrumentation=False,
+                                                  watchdog_timeout=0.2),
+            replay, self.recorder_mock)
+        replay.update()
+
+        self.assertEqual((station.mode, station.enabled), ("teleop", True))
+        self.network_mock.set_game_mode.assert_called_with("teleop")
+        self.network_mock.set_enabled.assert_called_with(True)
+        self.assertTrue(station.status().startswith("teleop, enabled"))
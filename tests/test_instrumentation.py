@@ -0,0 +1,95 @@
+"""Test module for `instrumentation.py`"""
+
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import instrumentation
+
+
+class TestHistogram(unittest.TestCase):
+    """Test class for `Histogram`"""
+
+    def test_percentiles(self):
+        """Test that percentiles are within bucket precision"""
+        histogram = instrumentation.Histogram(1000000)
+        for value in range(1, 10001):
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, 10000)
+        self.assertEqual(histogram.max, 10000)
+        self.assertAlmostEqual(histogram.percentile(50), 5000, delta=5000 * 0.035)
+        self.assertAlmostEqual(histogram.percentile(99), 9900, delta=9900 * 0.035)
+        self.assertEqual(histogram.percentile(100), 10000)
+
+    def test_small_values_exact(self):
+        """Test that small values are recorded exactly"""
+        histogram = instrumentation.Histogram(1000)
+        for value in (3, 3, 3, 7):
+            histogram.record(value)
+        self.assertEqual(histogram.summary(),
+                         {'count': 4, 'p50': 3, 'p99': 7, 'max': 7})
+
+    def test_overflow_and_reset(self):
+        """Test that values above `max_value` are clamped into
+         the last bucket, and that `reset` clears the histogram"""
+        histogram = instrumentation.Histogram(1000)
+        histogram.record(10 ** 9)
+        histogram.record(-5)
+        self.assertEqual(histogram.count, 2)
+        self.assertEqual(histogram.max, 10 ** 9)
+        self.assertEqual(histogram.percentile(50), 0)
+
+        histogram.reset()
+        self.assertEqual(histogram.summary(),
+                         {'count': 0, 'p50': 0, 'p99': 0, 'max': 0})
+
+
+class TestLoopStats(unittest.TestCase):
+    """Test class for `LoopStats`"""
+
+    def test_record_and_dump(self):
+        """Test that tick timings are recorded in microseconds
+         and dumped as JSON"""
+        stats = instrumentation.LoopStats()
+        stats.record_tick(0.001, 0.0002, 0.0005, 12)
+
+        summary = stats.summary()
+        self.assertEqual(summary['jitter']['max'], 1000)
+        self.assertEqual(summary['poll']['max'], 200)
+        self.assertEqual(summary['publish']['max'], 500)
+        self.assertEqual(summary['puts']['p50'], 12)
+        self.assertIn("puts: p50 12, p99 12, max 12",
+                      stats.format_summary())
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'timing.json')
+            stats.dump(file_name)
+            with open(file_name) as dump_file:
+                data = json.load(dump_file)
+
+        self.assertEqual(data['puts']['count'], 1)
+        self.assertEqual(data['puts']['buckets'], {'12': 1})
+
+
+class TestStartupTimer(unittest.TestCase):
+    """Test class for `StartupTimer`"""
+
+    def test_phases(self):
+        """Test that each phase is timed and reported in order"""
+        clock = unittest.mock.Mock(side_effect=[0.0, 0.001, 0.0015, 0.002,
+                                                0.0045, 0.005])
+        timer = instrumentation.StartupTimer(clock)
+        with timer.phase("config"):
+            pass
+        with timer.phase("network"):
+            pass
+
+        self.assertEqual([name for name, _ in timer.phases],
+                         ["config", "network"])
+        self.assertEqual(timer.format_report().splitlines(), [
+            "      0.5 ms  config",
+            "      2.5 ms  network",
+            "      5.0 ms  total"])
@@ -1,5 +1,6 @@
 """Test module for `joysticks.py`"""
 
+import time
 import unittest
 import unittest.mock
 
@@ -27,6 +28,7 @@ class TestJoysticks(unittest.TestCase):
         # Mock object must report a number of
         # joysticks for Joysticks to be initialized correctly
         pygame_mock.joystick.get_count.return_value = 0
+        pygame_mock.event.get.return_value = []
         stick = joysticks.Joysticks(pygame_mock)
         stick.update()
         self.assertTrue(pygame_mock.event.get.called)
@@ -47,6 +49,7 @@ class TestJoysticks(unittest.TestCase):
         joystick_mock = unittest.mock.Mock()
         joystick_mock.get_numaxes.return_value = 3
         joystick_mock.get_numbuttons.return_value = 3
+        joystick_mock.get_numhats.return_value = 0
         joystick_mock.get_axis.side_effect = self.joystick_get_axis
         joystick_mock.get_button.side_effect = self.joystick_get_button
         pygame_mock.joystick.Joystick.return_value = joystick_mock
@@ -79,3 +82,253 @@ class TestJoysticks(unittest.TestCase):
     def joystick_get_button(self, button):
         """Mock function for `oygame.joystick.get_button`"""
         return [0, 1, 1][button]
+
+    def test_snapshot(self):
+        """Test `Joysticks.snapshot` reads every joystick and
+         reuses its buffers"""
+        pygame_mock = unittest.mock.Mock()
+        joystick_mock = unittest.mock.Mock()
+        joystick_mock.get_numaxes.return_value = 3
+        joystick_mock.get_numbuttons.return_value = 3
+        joystick_mock.get_numhats.return_value = 0
+        joystick_mock.get_axis.side_effect = self.joystick_get_axis
+        joystick_mock.get_button.side_effect = self.joystick_get_button
+        pygame_mock.joystick.Joystick.return_value = joystick_mock
+        pygame_mock.joystick.get_count.return_value = 2
+        clock = unittest.mock.Mock(return_value=5.0)
+        stick = joysticks.Joysticks(pygame_mock, clock=clock)
+
+        snapshot = stick.snapshot()
+        self.assertEqual(snapshot.sequence, 1)
+        self.assertEqual(snapshot.timestamp, 5.0)
+        self.assertEqual(len(snapshot.axes), 2)
+        self.assertEqual(list(snapshot.axes[1]), [0.0, 1.0, -1.0])
+        self.assertEqual(snapshot.buttons, [0b110, 0b110])
+        self.assertEqual(snapshot.num_buttons, [3, 3])
+        self.assertEqual(snapshot.unpack_buttons(0), [0, 1, 1])
+
+        axes_buffer = snapshot.axes[0]
+        clock.return_value = 6.0
+        next_snapshot = stick.snapshot()
+        self.assertIs(next_snapshot, snapshot)
+        self.assertIs(next_snapshot.axes[0], axes_buffer)
+        self.assertEqual(next_snapshot.sequence, 2)
+        self.assertEqual(next_snapshot.timestamp, 6.0)
+
+    def test_snapshot_copy(self):
+        """Test that a snapshot copy isn't changed by later snapshots"""
+        pygame_mock = unittest.mock.Mock()
+        joystick_mock = unittest.mock.Mock()
+        joystick_mock.get_numaxes.return_value = 3
+        joystick_mock.get_numbuttons.return_value = 3
+        joystick_mock.get_numhats.return_value = 0
+        joystick_mock.get_axis.side_effect = self.joystick_get_axis
+        joystick_mock.get_button.side_effect = self.joystick_get_button
+        pygame_mock.joystick.Joystick.return_value = joystick_mock
+        pygame_mock.joystick.get_count.return_value = 1
+        stick = joysticks.Joysticks(pygame_mock, clock=lambda: 5.0)
+
+        copy = stick.snapshot().copy()
+        joystick_mock.get_axis.side_effect = None
+        joystick_mock.get_axis.return_value = 0.5
+        joystick_mock.get_button.side_effect = None
+        joystick_mock.get_button.return_value = 0
+        snapshot = stick.snapshot()
+
+        self.assertEqual(list(snapshot.axes[0]), [0.5, 0.5, 0.5])
+        self.assertEqual(list(copy.axes[0]), [0.0, 1.0, -1.0])
+        self.assertEqual(copy.buttons, [0b110])
+        self.assertEqual(copy.sequence, 1)
+        self.assertIsNot(copy.povs[0], snapshot.povs[0])
+
+    def make_joystick_mock(self, instance_id, guid="guid", num_axes=3,
+                           num_buttons=3, num_hats=0):
+        """Returns mock of a `pygame.joystick.Joystick`"""
+        joystick_mock = unittest.mock.Mock()
+        joystick_mock.get_instance_id.return_value = instance_id
+        joystick_mock.get_guid.return_value = guid
+        joystick_mock.get_numaxes.return_value = num_axes
+        joystick_mock.get_numbuttons.return_value = num_buttons
+        joystick_mock.get_numhats.return_value = num_hats
+        joystick_mock.get_axis.side_effect = self.joystick_get_axis
+        joystick_mock.get_button.side_effect = self.joystick_get_button
+        joystick_mock.get_hat.return_value = (0, 0)
+        return joystick_mock
+
+    def test_event_driven(self):
+        """Test that event driven joysticks apply pygame events
+         without reading joysticks again"""
+        pygame_mock = unittest.mock.Mock()
+        joystick_mocks = [self.make_joystick_mock(10, num_hats=1),
+                          self.make_joystick_mock(11, num_hats=1)]
+        pygame_mock.joystick.Joystick.side_effect = joystick_mocks
+        pygame_mock.joystick.get_count.return_value = 2
+        stick = joysticks.Joysticks(pygame_mock, event_driven=True)
+
+        # Joysticks are read once to get their initial state
+        self.assertEqual(joystick_mocks[1].get_axis.call_count, 3)
+
+        pygame_mock.event.get.return_value = [
+            unittest.mock.Mock(type=pygame_mock.JOYAXISMOTION, instance_id=11,
+                               axis=0, value=0.5),
+            unittest.mock.Mock(type=pygame_mock.JOYAXISMOTION, instance_id=11,
+                               axis=0, value=0.75),
+            unittest.mock.Mock(type=pygame_mock.JOYBUTTONDOWN, instance_id=11,
+                               button=0),
+            unittest.mock.Mock(type=pygame_mock.JOYBUTTONUP, instance_id=11,
+                               button=2),
+            unittest.mock.Mock(type=pygame_mock.JOYHATMOTION, instance_id=11,
+                               hat=0, value=(1, 1)),
+            # Events for joysticks that don't exist are ignored
+            unittest.mock.Mock(type=pygame_mock.JOYBUTTONDOWN, instance_id=5,
+                               button=0)
+        ]
+        stick.update()
+        snapshot = stick.snapshot()
+
+        self.assertEqual(joystick_mocks[1].get_axis.call_count, 3)
+        self.assertEqual(list(snapshot.axes[1]), [0.75, 1.0, -1.0])
+        self.assertEqual(snapshot.unpack_buttons(1), [1, 1, 0])
+        self.assertEqual(list(snapshot.povs[1]), [45])
+        self.assertEqual(list(snapshot.povs[0]), [-1])
+        self.assertEqual(stick.take_changed(), {1})
+        self.assertEqual(stick.take_changed(), set())
+
+    def test_wait_for_events(self):
+        """Test that `wait_for_events` applies the awaited event and
+         any queued behind it"""
+        pygame_mock = unittest.mock.Mock()
+        pygame_mock.joystick.Joystick.side_effect = [
+            self.make_joystick_mock(0), self.make_joystick_mock(1)]
+        pygame_mock.joystick.get_count.return_value = 2
+        stick = joysticks.Joysticks(pygame_mock, event_driven=True)
+
+        pygame_mock.event.wait.return_value = unittest.mock.Mock(
+            type=pygame_mock.JOYAXISMOTION, instance_id=0, axis=0, value=-0.5)
+        pygame_mock.event.get.return_value = [unittest.mock.Mock(
+            type=pygame_mock.JOYAXISMOTION, instance_id=1, axis=0, value=0.5)]
+
+        self.assertEqual(stick.wait_for_events(0.01), {0, 1})
+        pygame_mock.event.wait.assert_called_with(10)
+
+        pygame_mock.event.wait.return_value = unittest.mock.Mock(
+            type=pygame_mock.NOEVENT)
+        self.assertEqual(stick.wait_for_events(0.01), set())
+
+    @staticmethod
+    def make_pygame1_mock(joystick_mocks):
+        """Returns a mock of pygame 1, which has no hot-plug events or
+         joystick GUIDs and instance ids"""
+        pygame_mock = unittest.mock.Mock()
+        pygame_mock.version.vernum = (1, 9, 3)
+        del pygame_mock.JOYDEVICEADDED
+        del pygame_mock.JOYDEVICEREMOVED
+        for device_index, joystick_mock in enumerate(joystick_mocks):
+            del joystick_mock.get_guid
+            del joystick_mock.get_instance_id
+            joystick_mock.get_id.return_value = device_index
+            joystick_mock.get_name.return_value = "Gamepad"
+        pygame_mock.joystick.Joystick.side_effect = joystick_mocks
+        pygame_mock.joystick.get_count.return_value = len(joystick_mocks)
+        return pygame_mock
+
+    def test_pygame1(self):
+        """Test that joysticks work with pygame 1, polled and event
+         driven"""
+        stick = joysticks.Joysticks(self.make_pygame1_mock(
+            [self.make_joystick_mock(None), self.make_joystick_mock(None)]))
+        snapshot = stick.snapshot()
+        self.assertEqual(list(snapshot.axes[1]), [0.0, 1.0, -1.0])
+        self.assertEqual(snapshot.guids, ["Gamepad", "Gamepad"])
+
+        pygame_mock = self.make_pygame1_mock(
+            [self.make_joystick_mock(None), self.make_joystick_mock(None)])
+        stick = joysticks.Joysticks(pygame_mock, event_driven=True)
+        pygame_mock.event.get.return_value = [
+            unittest.mock.Mock(type=pygame_mock.JOYAXISMOTION, joy=1, axis=2,
+                               value=0.25),
+            unittest.mock.Mock(type=pygame_mock.JOYBUTTONDOWN, joy=0,
+                               button=0)]
+        stick.update()
+        self.assertEqual(stick.take_changed(), {0, 1})
+        snapshot = stick.snapshot()
+        self.assertEqual(list(snapshot.axes[1]), [0.0, 1.0, 0.25])
+        self.assertEqual(snapshot.unpack_buttons(0), [1, 1, 1])
+
+    def test_wait_for_events_polls_old_pygame(self):
+        """Test that `wait_for_events` polls the event queue when
+         pygame can't time out waiting"""
+        pygame_mock = self.make_pygame1_mock([self.make_joystick_mock(0)])
+        stick = joysticks.Joysticks(pygame_mock, event_driven=True)
+
+        motion = unittest.mock.Mock(type=pygame_mock.JOYAXISMOTION, joy=0,
+                                    axis=0, value=-0.5)
+        pygame_mock.event.get.side_effect = [[], [], [motion]]
+        self.assertEqual(stick.wait_for_events(1.0), {0})
+        self.assertEqual(pygame_mock.event.get.call_count, 3)
+
+        pygame_mock.event.get.side_effect = None
+        pygame_mock.event.get.return_value = []
+        start = time.monotonic()
+        self.assertEqual(stick.wait_for_events(0.02), set())
+        self.assertGreaterEqual(time.monotonic() - start, 0.02)
+        pygame_mock.event.wait.assert_not_called()
+
+    def test_hot_plug(self):
+        """Test that joysticks keep their slots when others are
+         unplugged, and get them back when plugged back in"""
+        pygame_mock = unittest.mock.Mock()
+        gamepad = self.make_joystick_mock(0, guid="gamepad")
+        flight_stick = self.make_joystick_mock(1, guid="flight")
+        pygame_mock.joystick.Joystick.side_effect = [gamepad, flight_stick]
+        pygame_mock.joystick.get_count.return_value = 2
+        stick = joysticks.Joysticks(pygame_mock)
+
+        # Unplug the gamepad
+        pygame_mock.event.get.return_value = [unittest.mock.Mock(
+            type=pygame_mock.JOYDEVICEREMOVED, instance_id=0)]
+        stick.update()
+        self.assertTrue(gamepad.quit.called)
+        self.assertEqual(stick.get_num_joysticks(), 2)
+
+        snapshot = stick.snapshot()
+        self.assertEqual(snapshot.connected, [False, True])
+        self.assertEqual(list(snapshot.axes[0]), [])
+        self.assertEqual(list(snapshot.axes[1]), [0.0, 1.0, -1.0])
+        self.assertEqual(stick.get_joystick(0), {'axes': [], 'buttons': []})
+        self.assertEqual(stick.take_changed(), {0})
+
+        # Plug in a new joystick, then the gamepad again with a new
+        #  instance id. The gamepad gets its old slot back
+        other = self.make_joystick_mock(2, guid="other", num_axes=1)
+        replugged_gamepad = self.make_joystick_mock(3, guid="gamepad",
+                                                    num_axes=2)
+        pygame_mock.joystick.Joystick.side_effect = [other, replugged_gamepad]
+        pygame_mock.event.get.return_value = [
+            unittest.mock.Mock(type=pygame_mock.JOYDEVICEADDED,
+                               device_index=1),
+            unittest.mock.Mock(type=pygame_mock.JOYDEVICEADDED,
+                               device_index=0)]
+        stick.update()
+
+        self.assertEqual(stick.get_num_joysticks(), 3)
+        snapshot = stick.snapshot()
+        self.assertEqual(snapshot.connected, [True, True, True])
+        self.assertEqual(snapshot.guids, ["gamepad", "flight", "other"])
+        self.assertEqual(list(snapshot.axes[0]), [0.0, 1.0])
+        self.assertEqual(list(snapshot.axes[2]), [0.0])
+        self.assertEqual(stick.take_changed(), {0, 2})
+
+    def test_hot_plug_ignores_known_joysticks(self):
+        """Test that added events for joysticks found at startup
+         don't add them twice"""
+        pygame_mock = unittest.mock.Mock()
+        gamepad = self.make_joystick_mock(7)
+        pygame_mock.joystick.Joystick.return_value = gamepad
+        pygame_mock.joystick.get_count.return_value = 1
+        stick = joysticks.Joysticks(pygame_mock)
+
+        pygame_mock.event.get.return_value = [unittest.mock.Mock(
+            type=pygame_mock.JOYDEVICEADDED, device_index=0)]
+        stick.update()
+        self.assertEqual(stick.get_num_joysticks(), 1)
@@ -0,0 +1,197 @@
+"""Test module for `link_monitor.py`"""
+
+import random
+import unittest
+import unittest.mock
+
+import control_loop
+import link_monitor
+import network
+
+
+class FakeTable:
+    """NetworkTables table shared by driver station and robot"""
+
+    def __init__(self):
+        self.values = {}
+
+    def putNumber(self, key, value):  # pylint: disable=invalid-name
+        """Set number `key`"""
+        self.values[key] = value
+
+    def getNumber(self, key, default):  # pylint: disable=invalid-name
+        """Get number `key`"""
+        return self.values.get(key, default)
+
+
+class TestLinkMonitor(unittest.TestCase):
+    """Test class for `LinkMonitor` and `HeartbeatEcho`"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.table = FakeTable()
+        self.network_mock = unittest.mock.Mock(table=self.table)
+        del self.network_mock.robots
+
+    def run_link(self, monitor, echo, seconds, step=0.01):
+        """Tick `monitor` and poll `echo` for `seconds`"""
+        for _ in range(int(seconds / step)):
+            self.now += step
+            monitor.tick(self.now)
+            echo.poll()
+
+    def test_round_trip_time(self):
+        """Test that echo delay is measured as round trip time"""
+        monitor = link_monitor.LinkMonitor(self.network_mock)
+        echo = link_monitor.HeartbeatEcho(self.table, delay=0.05,
+                                          clock=lambda: self.now)
+        self.assertEqual(monitor.state.format(self.now),
+                         "RTT: --  Loss: --  Age: --")
+
+        self.run_link(monitor, echo, 2.0)
+        self.assertAlmostEqual(monitor.state.rtt, 0.06, delta=0.011)
+        self.assertEqual(monitor.state.loss, 0.0)
+        self.assertLess(monitor.state.staleness(self.now), 0.3)
+        self.assertFalse(monitor.degraded)
+        self.assertIn("RTT: 6", monitor.state.format(self.now))
+        # Slow echoes are a congested link
+        self.network_mock.adapt_write_budget.assert_called_with(False)
+        echo.delay = 0.6
+        self.run_link(monitor, echo, 2.0)
+        self.network_mock.adapt_write_budget.assert_called_with(True)
+
+    def test_steady_slow_link_not_congested(self):
+        """Test that round trips of 150-200 ms, NetworkTables' send
+         interval each way, don't shrink the write budget"""
+        network_instance = network.Network(
+            unittest.mock.Mock(), 'driver_station', "10.0.0.1")
+        network_instance.table = self.table
+        monitor = link_monitor.LinkMonitor(network_instance)
+        echo = link_monitor.HeartbeatEcho(self.table, delay=0.15,
+                                          clock=lambda: self.now)
+        rng = random.Random(3)
+        for _ in range(100):
+            echo.delay = rng.uniform(0.14, 0.19)
+            self.run_link(monitor, echo, 0.1)
+        self.assertGreater(monitor.state.rtt, 0.14)
+        self.assertFalse(monitor.degraded)
+        self.assertIsNone(network_instance.write_budget)
+
+    def test_loss_and_staleness(self):
+        """Test that lost heartbeats and a silent robot degrade the
+         link, and that publishing is throttled while degraded"""
+        monitor = link_monitor.LinkMonitor(self.network_mock,
+                                           degraded_divisor=4)
+        echo = link_monitor.HeartbeatEcho(self.table, loss=0.5,
+                                          clock=lambda: self.now,
+                                          rng=random.Random(1))
+        self.run_link(monitor, echo, 10.0)
+        self.assertAlmostEqual(monitor.state.loss, 0.5, delta=0.2)
+        self.assertTrue(monitor.degraded)
+        self.assertEqual([monitor.should_publish() for _ in range(8)],
+                         [False, False, False, True] * 2)
+
+        # Robot stops echoing
+        monitor = link_monitor.LinkMonitor(self.network_mock)
+        echo = link_monitor.HeartbeatEcho(self.table,
+                                          clock=lambda: self.now)
+        self.run_link(monitor, echo, 1.0)
+        self.assertFalse(monitor.degraded)
+        for _ in range(150):
+            self.now += 0.01
+            monitor.tick(self.now)
+        self.assertTrue(monitor.degraded)
+
+    def test_no_echo_not_degraded(self):
+        """Test that robot code without an echo isn't throttled"""
+        monitor = link_monitor.LinkMonitor(self.network_mock)
+        for _ in range(500):
+            self.now += 0.01
+            monitor.tick(self.now)
+        self.assertGreater(self.table.values[link_monitor.HEARTBEAT_KEY], 10)
+        self.assertFalse(monitor.degraded)
+        self.assertTrue(monitor.should_publish())
+
+    def test_switch_server(self):
+        """Test that switching to a robot that doesn't echo starts
+         measuring afresh, rather than staying degraded"""
+        tables = {"10.0.0.1": self.table, "10.0.0.2": FakeTable()}
+
+        def create():
+            instance = unittest.mock.Mock()
+            instance.isConnected.return_value = True
+            instance.initialize.side_effect = (
+                lambda server: setattr(instance, 'server', server))
+            instance.getTable.side_effect = (
+                lambda name: tables[instance.server])
+            return instance
+
+        first_instance = create()
+        network_instance = network.Network(
+            first_instance, 'driver_station', "10.0.0.1",
+            instance_factory=create)
+        monitor = link_monitor.LinkMonitor(network_instance)
+        echo = link_monitor.HeartbeatEcho(self.table, delay=0.05,
+                                          clock=lambda: self.now)
+        self.run_link(monitor, echo, 1.0)
+        self.assertIsNotNone(monitor.state.rtt)
+        network_instance.adapt_write_budget(True)
+
+        network_instance.change_server_async("10.0.0.2").join(1.0)
+        self.assertIs(network_instance.table, tables["10.0.0.2"])
+        self.assertIsNone(network_instance.write_budget)
+        for _ in range(300):
+            self.now += 0.01
+            monitor.tick(self.now)
+        self.assertIs(monitor.state, link_monitor.NO_ECHO)
+        self.assertFalse(monitor.degraded)
+        self.assertTrue(all(monitor.should_publish() for _ in range(4)))
+        self.assertIsNone(network_instance.write_budget)
+
+        # Echoes from the new robot are measured from scratch
+        new_echo = link_monitor.HeartbeatEcho(tables["10.0.0.2"],
+                                              delay=0.05,
+                                              clock=lambda: self.now)
+        self.run_link(monitor, new_echo, 2.0)
+        self.assertEqual(monitor.state.loss, 0.0)
+        self.assertFalse(monitor.degraded)
+
+    def test_control_loop(self):
+        """Test that the control loop sends heartbeats, shows link state
+         and publishes less while the link is degraded"""
+        monitors = link_monitor.monitor_network(self.network_mock)
+        monitor = monitors[None]
+        joysticks_mock = unittest.mock.Mock()
+        joysticks_mock.snapshot.return_value = unittest.mock.Mock(axes=[])
+        loop = control_loop.ControlLoop(joysticks_mock, self.network_mock,
+                                        clock=lambda: self.now,
+                                        link_monitors=monitors)
+        echo = link_monitor.HeartbeatEcho(self.table,
+                                          clock=lambda: self.now)
+        for _ in range(100):
+            self.now += 0.01
+            loop.tick()
+            echo.poll()
+        self.assertIs(loop.latest_display_state().links[None], monitor.state)
+        self.assertIsNotNone(monitor.state.rtt)
+        self.assertEqual(self.network_mock.publish_snapshot.call_count, 100)
+
+        self.network_mock.publish_snapshot.reset_mock()
+        for _ in range(200):
+            self.now += 0.01
+            loop.tick()
+        self.assertTrue(monitor.degraded)
+        # Degraded a second after the last echo
+        self.assertLess(self.network_mock.publish_snapshot.call_count, 150)
+
+    def test_monitor_fleet(self):
+        """Test that each robot of a fleet gets a monitor of its own"""
+        fleet_mock = unittest.mock.Mock()
+        fleet_mock.robots = {'alpha': unittest.mock.Mock(),
+                             'bravo': unittest.mock.Mock()}
+        monitors = link_monitor.monitor_network(fleet_mock)
+        self.assertEqual(sorted(monitors), ['alpha', 'bravo'])
+        self.assertIs(fleet_mock.robots['alpha'].link_monitor,
+                      monitors['alpha'])
+        self.assertIs(monitors['bravo'].network,
+                      fleet_mock.robots['bravo'].network)
@@ -0,0 +1,71 @@
+"""Test module for `loopback.py`"""
+
+import time
+import unittest
+
+import loopback
+import network
+
+
+class TestLoopback(unittest.TestCase):
+    """Test class for the loopback NetworkTables stand-in"""
+
+    def setUp(self):
+        self.server = loopback.LoopbackServer()
+        self.client = loopback.LoopbackNetworkTables(self.server,
+                                                     update_rate=10.0)
+        self.addCleanup(self.client.shutdown)
+
+    def wait_for_entries(self, count):
+        """Wait until the server has received `count` entry updates"""
+        give_up = time.monotonic() + 1.0
+        while self.server.entries_received < count:
+            self.assertLess(time.monotonic(), give_up)
+            time.sleep(0.001)
+
+    def test_coalesced_until_flush(self):
+        """Test that only the latest value of each entry is sent, when
+         flushed"""
+        self.client.initialize(server='loopback')
+        self.assertTrue(self.client.isConnected())
+        table = self.client.getTable('driver_station')
+        values = []
+        table.putNumberArray("/axes", values)
+        for value in range(5):
+            table.putNumber("/axis", value)
+        values.append(1.0)
+        self.assertEqual(self.server.entries_received, 0)
+
+        self.client.flush()
+        self.wait_for_entries(2)
+        self.assertEqual(self.server.entries, {"/axes": (), "/axis": 4})
+        self.assertEqual(self.client.writes, 6)
+        self.assertEqual(table.getNumber("/axis", 0), 4)
+
+    def test_network(self):
+        """Test that `Network` publishes through the stand-in, and values
+         reach the robot side with their latency measured"""
+        publisher = network.Network(self.client, 'driver_station',
+                                    'loopback')
+        probe = loopback.ProbeSubscriber(self.server, "/enabled")
+        probe.expect(True, time.perf_counter())
+        publisher.set_enabled(True)
+        self.wait_for_entries(1)
+        self.assertTrue(self.server.entries["/enabled"])
+        self.assertEqual(probe.delivered_count, 1)
+        self.assertEqual(len(probe.latencies), 1)
+        self.assertLess(probe.latencies[0], 1.0)
+        publisher.shutdown()
+        self.assertFalse(self.client.isConnected())
+
+    def test_probe_replaced_values(self):
+        """Test that values replaced before being sent are timed until
+         the value replacing them arrives"""
+        probe = loopback.ProbeSubscriber(self.server, "/axes", 0)
+        probe.expect(0.5, 1.0)
+        probe.expect(0.25, 2.0)
+        probe.expect(0.75, 3.0)
+        self.server.receive({"/axes": (0.25, 0.0), "/other": 1})
+        self.assertEqual(probe.delivered_count, 1)
+        self.assertEqual(len(probe.latencies), 2)
+        self.assertAlmostEqual(probe.latencies[0] - probe.latencies[1], 1.0)
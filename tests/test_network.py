@@ -1,5 +1,6 @@
 """Test module for `network.py`"""
 
+import threading
 import unittest
 import unittest.mock
 
@@ -116,3 +117,458 @@ class TestNetwork(unittest.TestCase):
 
         network_instance.set_joystick_button_value(0, 3, 0)
         table_mock.putBoolean.assert_called_with("/joystick-0/button-3", 0)
+
+    def test_unchanged_values_suppressed(self):
+        """Test that repeated joystick values are only published once"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None,
+                                           clock=lambda: 0.0)
+
+        network_instance.set_joystick_axis_value(0, 0, 0.5)
+        network_instance.set_joystick_axis_value(0, 0, 0.5)
+        network_instance.set_joystick_button_value(0, 0, True)
+        network_instance.set_joystick_button_value(0, 0, True)
+        network_instance.set_joystick_button_value(0, 0, False)
+
+        self.assertEqual(table_mock.putNumber.call_count, 1)
+        self.assertEqual(table_mock.putBoolean.call_count, 2)
+        self.assertEqual(network_instance.published_writes, 3)
+        self.assertEqual(network_instance.suppressed_writes, 2)
+
+    def test_axis_threshold(self):
+        """Test that axis changes within `axis_threshold` are suppressed,
+         except for a return to center"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None,
+                                           axis_threshold=0.05,
+                                           clock=lambda: 0.0)
+
+        network_instance.set_joystick_axis_value(0, 0, 0.02)
+        network_instance.set_joystick_axis_value(0, 0, 0.04)
+        table_mock.putNumber.assert_called_once_with("/joystick-0/axis-0",
+                                                     0.02)
+
+        network_instance.set_joystick_axis_value(0, 0, 0.0)
+        table_mock.putNumber.assert_called_with("/joystick-0/axis-0", 0.0)
+
+        network_instance.set_joystick_axis_value(0, 0, 0.5)
+        table_mock.putNumber.assert_called_with("/joystick-0/axis-0", 0.5)
+        self.assertEqual(table_mock.putNumber.call_count, 3)
+
+    def test_keyframe_interval(self):
+        """Test that unchanged values are republished once
+         `keyframe_interval` has passed"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+        clock = unittest.mock.Mock(return_value=0.0)
+
+        network_instance = network.Network(networktables_mock, None, None,
+                                           keyframe_interval=1.0, clock=clock)
+
+        network_instance.set_joystick_axis_value(0, 0, 0.5)
+        clock.return_value = 0.9
+        network_instance.set_joystick_axis_value(0, 0, 0.5)
+        self.assertEqual(table_mock.putNumber.call_count, 1)
+
+        clock.return_value = 1.0
+        network_instance.set_joystick_axis_value(0, 0, 0.5)
+        self.assertEqual(table_mock.putNumber.call_count, 2)
+
+    def test_change_server_republishes(self):
+        """Test that all values are republished after `change_server`"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None,
+                                           clock=lambda: 0.0)
+
+        network_instance.set_joystick_button_value(0, 1, True)
+        network_instance.change_server("localhost")
+        network_instance.set_joystick_button_value(0, 1, True)
+        self.assertEqual(table_mock.putBoolean.call_count, 2)
+
+    def test_joystick_channel_cache(self):
+        """Test that joystick channels are only rebuilt when the
+         joystick layout changes"""
+        networktables_mock = unittest.mock.Mock()
+
+        network_instance = network.Network(networktables_mock, None, None)
+
+        channel = network_instance.joystick_channel(1, 2, 3)
+        self.assertEqual(channel.axis_keys,
+                         ("/joystick-1/axis-0", "/joystick-1/axis-1"))
+        self.assertEqual(channel.button_keys,
+                         ("/joystick-1/button-0", "/joystick-1/button-1",
+                          "/joystick-1/button-2"))
+
+        self.assertIs(network_instance.joystick_channel(1, 2, 3), channel)
+        self.assertIsNot(network_instance.joystick_channel(1, 4, 3), channel)
+
+    def test_joystick_channel_publish(self):
+        """Test that a joystick channel publishes a full joystick state"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None,
+                                           clock=lambda: 0.0)
+
+        channel = network_instance.joystick_channel(0, 2, 1)
+        channel.publish([0.25, -1.0], [1])
+        table_mock.putNumber.assert_has_calls([
+            unittest.mock.call("/joystick-0/axis-0", 0.25),
+            unittest.mock.call("/joystick-0/axis-1", -1.0)])
+        table_mock.putBoolean.assert_called_once_with("/joystick-0/button-0",
+                                                      1)
+
+        channel.publish([0.25, -1.0], [1])
+        self.assertEqual(network_instance.published_writes, 3)
+        self.assertEqual(network_instance.suppressed_writes, 3)
+
+    def test_joystick_channel_rebinds(self):
+        """Test that joystick channels publish to the new table
+         after `change_server`"""
+        networktables_mock = unittest.mock.Mock()
+        first_table = unittest.mock.Mock()
+        second_table = unittest.mock.Mock()
+        networktables_mock.getTable.side_effect = [first_table, second_table]
+
+        network_instance = network.Network(networktables_mock, None, None,
+                                           clock=lambda: 0.0)
+        channel = network_instance.joystick_channel(0, 1, 0)
+        channel.set_axis(0, 0.5)
+
+        network_instance.change_server("localhost")
+        channel.set_axis(0, 0.5)
+        first_table.putNumber.assert_called_once_with("/joystick-0/axis-0",
+                                                      0.5)
+        second_table.putNumber.assert_called_once_with("/joystick-0/axis-0",
+                                                       0.5)
+
+    def test_joystick_channel_publish_state(self):
+        """Test that a joystick channel publishes a button bitmask"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None)
+
+        channel = network_instance.joystick_channel(0, 1, 3)
+        channel.publish_state([0.5], 0b101)
+        table_mock.putNumber.assert_called_once_with("/joystick-0/axis-0", 0.5)
+        table_mock.putBoolean.assert_has_calls([
+            unittest.mock.call("/joystick-0/button-0", True),
+            unittest.mock.call("/joystick-0/button-1", False),
+            unittest.mock.call("/joystick-0/button-2", True)])
+
+    def test_packed_publish_mode(self):
+        """Test that packed mode publishes one axes array and one
+         button bitmask per joystick"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None,
+                                           clock=lambda: 0.0,
+                                           publish_mode='packed')
+
+        channel = network_instance.joystick_channel(1, 2, 3)
+        table_mock.putNumberArray.assert_called_with("/joystick-1/layout",
+                                                     (2, 3, 0))
+        table_mock.putNumber.assert_called_with("/layout-version", 1)
+
+        channel.publish_state([0.5, -0.5], 0b100)
+        table_mock.putNumberArray.assert_called_with("/joystick-1/axes",
+                                                     (0.5, -0.5))
+        table_mock.putNumber.assert_called_with("/joystick-1/buttons", 0b100)
+        self.assertEqual(network_instance.published_writes, 2)
+
+        channel.publish_state([0.5, -0.5], 0b100)
+        self.assertEqual(network_instance.suppressed_writes, 2)
+
+        channel.publish([0.5, 0.0], [0, 1, 0])
+        table_mock.putNumberArray.assert_called_with("/joystick-1/axes",
+                                                     (0.5, 0.0))
+        table_mock.putNumber.assert_called_with("/joystick-1/buttons", 0b010)
+
+        network_instance.set_joystick_button_value(1, 0, True)
+        table_mock.putNumber.assert_called_with("/joystick-1/buttons", 0b011)
+
+    def test_unknown_publish_mode(self):
+        """Test that an unknown publish mode is rejected"""
+        with self.assertRaises(ValueError):
+            network.Network(unittest.mock.Mock(), None, None,
+                            publish_mode='bogus')
+
+    def test_publish_snapshot(self):
+        """Test that `publish_snapshot` publishes every joystick"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None)
+
+        snapshot_mock = unittest.mock.Mock(axes=[[0.5], [-0.5]],
+                                           buttons=[0, 1], num_buttons=[0, 1],
+                                           povs=[[], [90]])
+        network_instance.publish_snapshot(snapshot_mock)
+        table_mock.putNumber.assert_has_calls([
+            unittest.mock.call("/joystick-0/axis-0", 0.5),
+            unittest.mock.call("/joystick-1/axis-0", -0.5)])
+        table_mock.putBoolean.assert_called_once_with("/joystick-1/button-0",
+                                                      True)
+        table_mock.putNumber.assert_called_with("/joystick-1/pov-0", 90)
+
+        network_instance.publish_snapshot(snapshot_mock, [1])
+        self.assertEqual(network_instance.published_writes, 4)
+        self.assertEqual(network_instance.suppressed_writes, 3)
+
+    def test_publish_snapshot_joystick_map(self):
+        """Test that mapped joysticks are published under their new
+         numbers, and missing ones skipped"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None)
+
+        snapshot_mock = unittest.mock.Mock(axes=[[0.5], [-0.5], [0.25]],
+                                           buttons=[0, 0, 0],
+                                           num_buttons=[0, 0, 0],
+                                           povs=[[], [], []])
+        network_instance.publish_snapshot(snapshot_mock,
+                                          joystick_map=(2, 0, 5))
+        self.assertEqual(table_mock.putNumber.call_args_list, [
+            unittest.mock.call("/joystick-0/axis-0", 0.25),
+            unittest.mock.call("/joystick-1/axis-0", 0.5)])
+
+        # Only changed joysticks are republished
+        table_mock.putNumber.reset_mock()
+        snapshot_mock.axes[0][0] = 0.75
+        snapshot_mock.axes[2][0] = -0.75
+        network_instance.publish_snapshot(snapshot_mock, {0},
+                                          joystick_map=(2, 0, 5))
+        table_mock.putNumber.assert_called_once_with("/joystick-1/axis-0",
+                                                     0.75)
+
+    def test_packed_povs(self):
+        """Test that packed mode publishes POV angles as one array"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+
+        network_instance = network.Network(networktables_mock, None, None,
+                                           clock=lambda: 0.0,
+                                           publish_mode='packed')
+
+        channel = network_instance.joystick_channel(0, 0, 0, 2)
+        channel.publish_state([], 0, [90, -1])
+        table_mock.putNumberArray.assert_called_with("/joystick-0/povs",
+                                                     (90, -1))
+
+        channel.set_pov(1, 180)
+        table_mock.putNumberArray.assert_called_with("/joystick-0/povs",
+                                                     (90, 180))
+
+    def test_write_budget(self):
+        """Test that writes past `write_budget` are deferred to the next
+         snapshot, changed values before refreshes of unchanged ones"""
+        clock = unittest.mock.Mock(return_value=0.0)
+        networktables_mock = unittest.mock.Mock()
+        table_mock = unittest.mock.Mock()
+        networktables_mock.getTable.return_value = table_mock
+        network_instance = network.Network(networktables_mock, None, None,
+                                           clock=clock)
+        network_instance.write_budget = 4
+
+        snapshot_mock = unittest.mock.Mock(axes=[[0.5] * 6], buttons=[0],
+                                           num_buttons=[0], povs=[[]])
+        network_instance.publish_snapshot(snapshot_mock)
+        self.assertEqual(network_instance.published_writes, 4)
+        self.assertEqual(network_instance.write_stats.deferred, 2)
+        self.assertEqual(network_instance.last_snapshot_writes, 4)
+
+        # Deferred changes go out next time
+        network_instance.publish_snapshot(snapshot_mock)
+        self.assertEqual(network_instance.published_writes, 6)
+        table_mock.putNumber.assert_called_with("/joystick-0/axis-5", 0.5)
+
+        # Only one of four refreshes fits the refresh share, the rest
+        #  of the budget is left for changes
+        clock.return_value = 2.0
+        snapshot_mock.axes = [[0.5] * 4 + [0.25] * 2]
+        network_instance.publish_snapshot(snapshot_mock)
+        self.assertEqual(network_instance.published_writes, 9)
+        table_mock.putNumber.assert_has_calls([
+            unittest.mock.call("/joystick-0/axis-0", 0.5),
+            unittest.mock.call("/joystick-0/axis-4", 0.25),
+            unittest.mock.call("/joystick-0/axis-5", 0.25)])
+
+    def test_adapt_write_budget(self):
+        """Test that the write budget halves on congestion and grows back
+         until it's lifted"""
+        network_instance = network.Network(unittest.mock.Mock(), None, None,
+                                           max_write_budget=60)
+        network_instance.last_snapshot_writes = 100
+        network_instance.adapt_write_budget(False)
+        self.assertIsNone(network_instance.write_budget)
+        network_instance.adapt_write_budget(True)
+        self.assertEqual(network_instance.write_budget, 50)
+        for _ in range(4):
+            network_instance.adapt_write_budget(True)
+        self.assertEqual(network_instance.write_budget,
+                         network.MIN_WRITE_BUDGET)
+        network_instance.adapt_write_budget(False)
+        self.assertEqual(network_instance.write_budget,
+                         network.MIN_WRITE_BUDGET + network.WRITE_BUDGET_STEP)
+        for _ in range(20):
+            network_instance.adapt_write_budget(False)
+        self.assertIsNone(network_instance.write_budget)
+
+    def test_safety_writes_not_held_back(self):
+        """Test that mode and enabled are sent and flushed while
+         joysticks are being published"""
+        networktables_mock = unittest.mock.Mock()
+        network_instance = network.Network(networktables_mock, None, None)
+        network_instance.write_budget = 0
+
+        with network_instance.lock:
+            disable = threading.Thread(target=network_instance.set_enabled,
+                                       args=(False,))
+            disable.start()
+            disable.join(1.0)
+            self.assertFalse(disable.is_alive())
+        networktables_mock.getTable.return_value.putBoolean.assert_called_with(
+            "/enabled", False)
+        self.assertTrue(networktables_mock.flush.called)
+
+    def test_zero_joysticks(self):
+        """Test that joysticks are zeroed and flushed at once, and the
+         next snapshot is published in full"""
+        networktables_mock = unittest.mock.Mock()
+        table_mock = networktables_mock.getTable.return_value
+        network_instance = network.Network(networktables_mock, None, None)
+        snapshot_mock = unittest.mock.Mock(axes=[[0.5, 0.25]], buttons=[1],
+                                           num_buttons=[1], povs=[[]])
+        network_instance.publish_snapshot(snapshot_mock)
+        table_mock.reset_mock()
+        networktables_mock.flush.reset_mock()
+
+        with network_instance.lock:
+            zero = threading.Thread(target=network_instance.zero_joysticks)
+            zero.start()
+            zero.join(1.0)
+            self.assertFalse(zero.is_alive())
+        table_mock.putNumber.assert_has_calls([
+            unittest.mock.call("/joystick-0/axis-0", 0.0),
+            unittest.mock.call("/joystick-0/axis-1", 0.0)])
+        table_mock.putBoolean.assert_called_once_with(
+            "/joystick-0/button-0", False)
+        networktables_mock.flush.assert_called_once_with()
+
+        table_mock.reset_mock()
+        network_instance.publish_snapshot(snapshot_mock)
+        self.assertEqual(table_mock.putNumber.call_count, 2)
+        table_mock.putBoolean.assert_called_once_with(
+            "/joystick-0/button-0", True)
+
+    def make_switching_network(self):
+        """Returns a `Network` with an `instance_factory` making a
+         NetworkTables mock per server, and the mocks by server ip"""
+        instances = {}
+
+        def create():
+            instance = unittest.mock.Mock()
+            instance.isConnected.return_value = False
+            instance.initialize.side_effect = (
+                lambda server: instances.setdefault(server, instance))
+            return instance
+
+        first_instance = create()
+        network_instance = network.Network(
+            first_instance, 'driver_station', "10.0.0.1",
+            instance_factory=create, switch_timeout=5.0)
+        return network_instance, instances
+
+    def test_change_server_async(self):
+        """Test that joysticks keep going to the old server until the
+         new one connects, then switch over with the driver station
+         state"""
+        network_instance, instances = self.make_switching_network()
+        old_table = network_instance.table
+        network_instance.set_game_mode("teleop")
+        network_instance.set_enabled(False)
+
+        switched = unittest.mock.Mock()
+        thread = network_instance.change_server_async("10.0.0.2", switched)
+        new_instance = instances["10.0.0.2"]
+        self.assertIs(network_instance.table, old_table)
+        self.assertEqual(network_instance.server_ip, "10.0.0.1")
+
+        new_instance.isConnected.return_value = True
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        switched.assert_called_once_with("10.0.0.2", True)
+        self.assertIs(network_instance.networktables, new_instance)
+        new_table = new_instance.getTable.return_value
+        new_table.putString.assert_called_with("/mode", "teleop")
+        new_table.putBoolean.assert_called_with("/enabled", False)
+
+        # The old server is kept as a warm standby
+        self.assertEqual(network_instance.standby_ips, ["10.0.0.1"])
+        # Only shut down before first connecting
+        instances["10.0.0.1"].shutdown.assert_called_once_with()
+
+    def test_warm_standby(self):
+        """Test that switching to a warm standby reuses its connection,
+         and that the least recently used standby is dropped"""
+        network_instance, instances = self.make_switching_network()
+        network_instance.max_standbys = 2
+        for server_ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"):
+            network_instance.warm_standby(server_ip)
+        self.assertEqual(network_instance.standby_ips,
+                         ["10.0.0.3", "10.0.0.4"])
+        self.assertTrue(instances["10.0.0.2"].shutdown.called)
+
+        standby = instances["10.0.0.3"]
+        standby.isConnected.return_value = True
+        network_instance.change_server_async("10.0.0.3").join(1.0)
+        self.assertIs(network_instance.networktables, standby)
+        standby.initialize.assert_called_once_with(server="10.0.0.3")
+
+        network_instance.shutdown()
+        self.assertTrue(instances["10.0.0.4"].shutdown.called)
+        self.assertTrue(instances["10.0.0.1"].shutdown.called)
+        self.assertEqual(network_instance.standby_ips, [])
+
+    def test_change_server_async_overtaken(self):
+        """Test that a switch overtaken by a newer one is dropped"""
+        network_instance, instances = self.make_switching_network()
+        switched = unittest.mock.Mock()
+        first = network_instance.change_server_async("10.0.0.2", switched)
+        second = network_instance.change_server_async("10.0.0.3", switched)
+        instances["10.0.0.2"].isConnected.return_value = True
+        first.join(1.0)
+        instances["10.0.0.3"].isConnected.return_value = True
+        second.join(1.0)
+
+        switched.assert_called_once_with("10.0.0.3", True)
+        self.assertEqual(network_instance.server_ip, "10.0.0.3")
+        self.assertIn("10.0.0.2", network_instance.standby_ips)
+
+    def test_change_server_async_without_factory(self):
+        """Test that without an `instance_factory` the server is
+         changed in the background as `change_server` does"""
+        networktables_mock = unittest.mock.Mock()
+        network_instance = network.Network(networktables_mock, None, None)
+        network_instance.change_server_async("localhost").join(1.0)
+        networktables_mock.initialize.assert_called_with(server="localhost")
+        self.assertEqual(network_instance.server_ip, "localhost")
@@ -0,0 +1,186 @@
+"""Test module for `py_driverstation.py`"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+import py_driverstation
+from axis_processing import AxisProfile
+
+
+class TestPyDriverStation(unittest.TestCase):
+    """Test class for driver station startup"""
+
+    def test_no_eager_gui_imports(self):
+        """Test that importing the driver station doesn't import
+         Qt, pygame or NetworkTables"""
+        modules = subprocess.check_output([
+            sys.executable, '-c',
+            "import sys, py_driverstation; print(' '.join(sys.modules))"
+        ]).decode().split()
+        for module in ('PyQt5', 'pygame', 'networktables',
+                       'driverstation_gui'):
+            self.assertNotIn(module, modules)
+
+    def test_parse_args(self):
+        """Test headless arguments"""
+        args = py_driverstation.parse_args(
+            ['10.0.0.2', '--headless', '--control-port', '5800'])
+        self.assertEqual(args.server_ip, '10.0.0.2')
+        self.assertTrue(args.headless)
+        self.assertEqual(args.control_port, 5800)
+        self.assertFalse(args.startup_times)
+        self.assertIsNone(args.profile)
+        self.assertEqual(py_driverstation.parse_args(
+            ['--profile']).profile, 10.0)
+
+    def test_config_robots(self):
+        """Test that `[Robot <name>]` sections are read as robots"""
+        directory = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(directory, 'ds_config.cfg')
+            with open(file_name, 'w') as config_file:
+                config_file.write("[NetworkTables]\nremote_ip = 10.0.0.1\n"
+                                  "[Robot alpha]\nremote_ip = 10.0.0.2\n"
+                                  "joysticks = 1, 0\n"
+                                  "[Robot bravo]\nremote_ip = 10.0.0.3\n")
+            config = py_driverstation.DriverStationConfig(file_name)
+            self.assertEqual(config.robots, [
+                ('alpha', '10.0.0.2', (1, 0)),
+                ('bravo', '10.0.0.3', None)])
+
+            os.remove(file_name)
+            self.assertEqual(
+                py_driverstation.DriverStationConfig(file_name).robots, [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_config_recent_ips(self):
+        """Test that changing robot ip remembers the previous ones,
+         most recent first"""
+        directory = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(directory, 'ds_config.cfg')
+            config = py_driverstation.DriverStationConfig(file_name)
+            self.assertEqual(config.recent_ips, [])
+            for server_ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3',
+                              '10.0.0.1', '10.0.0.4'):
+                config.change_remote_ip(server_ip)
+            config.save_config()
+            config.close()
+
+            config = py_driverstation.DriverStationConfig(file_name)
+            self.assertEqual(config.remote_ip, '10.0.0.4')
+            self.assertEqual(config.recent_ips,
+                             ['10.0.0.1', '10.0.0.3', '10.0.0.2'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_config_axis_profiles(self):
+        """Test that axis profiles are saved and read back per GUID"""
+        directory = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(directory, 'ds_config.cfg')
+            config = py_driverstation.DriverStationConfig(file_name)
+            self.assertEqual(config.axis_profiles, {})
+            config.set_axis_profile(
+                "Logitech Extreme 3D", 1,
+                AxisProfile(deadband=0.05, curve='expo', expo=0.4,
+                            invert=True, trim=0.01, minimum=-0.9))
+            config.save_config()
+            config.close()
+
+            profiles = py_driverstation.DriverStationConfig(
+                file_name).axis_profiles
+            profile = profiles["Logitech Extreme 3D"][1]
+            self.assertEqual((profile.deadband, profile.curve, profile.expo,
+                              profile.invert, profile.trim, profile.minimum,
+                              profile.maximum),
+                             (0.05, 'expo', 0.4, True, 0.01, -0.9, 1.0))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_config_debounced_save(self):
+        """Test that saves are written once, from another thread, after
+         the last of a burst of changes"""
+        directory = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(directory, 'ds_config.cfg')
+            config = py_driverstation.DriverStationConfig(file_name,
+                                                          save_delay=0.05)
+            with unittest.mock.patch('os.replace',
+                                     wraps=os.replace) as replace:
+                for server_ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+                    config.change_remote_ip(server_ip)
+                    config.save_config()
+                self.assertFalse(replace.called)
+                self.assertEqual(py_driverstation.DriverStationConfig(
+                    file_name).remote_ip, 'localhost')
+
+                deadline = time.monotonic() + 5.0
+                while not replace.called and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                config.close()
+                replace.assert_called_once()
+
+            self.assertEqual(py_driverstation.DriverStationConfig(
+                file_name).remote_ip, '10.0.0.3')
+            # Temporary files were renamed into place
+            self.assertEqual(os.listdir(directory), ['ds_config.cfg'])
+        finally:
+            shutil.rmtree(directory)
+
+    @unittest.skipIf(os.name == 'nt', "POSIX permissions")
+    def test_config_save_keeps_mode(self):
+        """Test that saving keeps the config file's permissions, and a
+         new file gets the umask's"""
+        directory = tempfile.mkdtemp()
+        umask = os.umask(0o022)
+        try:
+            file_name = os.path.join(directory, 'ds_config.cfg')
+            config = py_driverstation.DriverStationConfig(file_name)
+            self.assertEqual(os.stat(file_name).st_mode & 0o777, 0o644)
+
+            os.chmod(file_name, 0o640)
+            config.change_remote_ip('10.0.0.1')
+            config.save_config()
+            config.close()
+            self.assertEqual(os.stat(file_name).st_mode & 0o777, 0o640)
+        finally:
+            os.umask(umask)
+            shutil.rmtree(directory)
+
+    def test_config_reload(self):
+        """Test that edits made to the file are picked up, and reported
+         by setting name"""
+        directory = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(directory, 'ds_config.cfg')
+            config = py_driverstation.DriverStationConfig(file_name)
+            self.assertEqual(config.reload_if_changed(), frozenset())
+
+            with open(file_name, 'w') as config_file:
+                config_file.write("[NetworkTables]\nremote_ip = 10.0.0.7\n"
+                                  "[ControlLoop]\nloop_rate = 50\n"
+                                  "[Axis Gamepad 1]\ndeadband = 0.1\n")
+            self.assertEqual(config.reload_if_changed(),
+                             {'remote_ip', 'loop_rate', 'axis_profiles'})
+            self.assertEqual(config.remote_ip, '10.0.0.7')
+            self.assertEqual(config.loop_rate, 50.0)
+            self.assertEqual(config.axis_profiles['Gamepad'][1].deadband, 0.1)
+            self.assertEqual(config.reload_if_changed(), frozenset())
+
+            # Changes not saved yet aren't replaced by the file's
+            config.save_config()
+            with open(file_name, 'a') as config_file:
+                config_file.write("[Robot alpha]\nremote_ip = 10.0.0.8\n")
+            self.assertEqual(config.reload_if_changed(), frozenset())
+            self.assertEqual(config.robots, [])
+            config.close()
+        finally:
+            shutil.rmtree(directory)
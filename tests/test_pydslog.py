@@ -0,0 +1,77 @@
+"""Test module for `pydslog.py`"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import pydslog
+import recording
+from tests.test_recording import make_snapshot
+
+
+class TestPyDSLog(unittest.TestCase):
+    """Test class for the recording command line tool"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'match.dsrec')
+
+        writer = recording.RecordingWriter(self.file_name)
+        writer.write_record(recording.RECORD_MODE, 50.0, b'teleop')
+        for tick in range(40):
+            timestamp = 50.0 + tick / 4.0
+            if tick == 20:
+                writer.write_record(recording.RECORD_ENABLED, timestamp,
+                                    b'\x01')
+            writer.write_record(recording.RECORD_SNAPSHOT, timestamp,
+                                recording.pack_snapshot(make_snapshot(
+                                    timestamp, tick, tick / 100.0, tick)))
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_summary(self):
+        """Test that summary reports duration, records and changes"""
+        output = io.StringIO()
+        pydslog.summary(pydslog.parse_args(['summary', self.file_name]),
+                        output)
+        text = output.getvalue()
+        self.assertIn("Duration: 9.75 s", text)
+        self.assertIn("Snapshot records: 40", text)
+        self.assertIn("5.000 s  enabled -> True", text)
+
+    def test_slice(self):
+        """Test that a slice starts with the state at its start time"""
+        slice_name = os.path.join(self.directory, 'slice.dsrec')
+        pydslog.main(['slice', self.file_name, slice_name,
+                      '--start', '6.1', '--end', '7'])
+
+        with recording.RecordingReader(slice_name) as reader:
+            self.assertEqual(reader.start_time, 56.1)
+            self.assertEqual(list(reader.keyframe_times), [56.1])
+            mode, enabled, snapshot = reader.state_at(56.1)
+            self.assertEqual(mode, "teleop")
+            self.assertTrue(enabled)
+            self.assertEqual(snapshot.sequence, 24)
+
+            records = list(reader.records())
+        self.assertEqual([record[1] for record in records],
+                         [56.1, 56.25, 56.5, 56.75, 57.0])
+
+    def test_export(self):
+        """Test CSV export of a time range"""
+        output = io.StringIO()
+        pydslog.export(pydslog.parse_args(
+            ['export', self.file_name, '--start', '4.9', '--end', '5.0']),
+                       output)
+        rows = output.getvalue().splitlines()
+        self.assertEqual(rows[0].split(',')[:3], ['time', 'record', 'mode'])
+        self.assertEqual(rows[1].split(',')[:4],
+                         ['5.0000', 'enabled', '', '1'])
+        self.assertEqual(rows[2].split(',')[:7],
+                         ['5.0000', 'snapshot', '', '', '0', '1',
+                          '0.2000 -1.0000'])
+        self.assertEqual(len(rows), 4)
@@ -0,0 +1,234 @@
+"""Test module for `recording.py`"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from array import array
+
+import joysticks
+import recording
+
+
+def make_snapshot(timestamp, sequence, axis_value, buttons):
+    """Returns a `JoystickSnapshot` with two joysticks"""
+    snapshot = joysticks.JoystickSnapshot()
+    snapshot.timestamp = timestamp
+    snapshot.sequence = sequence
+    snapshot.axes = [array('d', [axis_value, -1.0]), array('d')]
+    snapshot.buttons = [buttons, 0]
+    snapshot.num_buttons = [10, 0]
+    snapshot.povs = [array('h', [90]), array('h')]
+    snapshot.connected = [True, False]
+    snapshot.guids = ["gamepad", "flight"]
+    return snapshot
+
+
+class TestRecording(unittest.TestCase):
+    """Test class for recording and replay"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'match.dsrec')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pack_snapshot(self):
+        """Test that snapshots survive packing and unpacking"""
+        snapshot = make_snapshot(3.5, 12, 0.25, 0b1000000001)
+        unpacked = recording.unpack_snapshot(
+            recording.pack_snapshot(snapshot), 3.5)
+
+        self.assertEqual(unpacked.timestamp, 3.5)
+        self.assertEqual(unpacked.sequence, 12)
+        self.assertEqual(unpacked.axes, snapshot.axes)
+        self.assertEqual(unpacked.buttons, snapshot.buttons)
+        self.assertEqual(unpacked.num_buttons, snapshot.num_buttons)
+        self.assertEqual(unpacked.povs, snapshot.povs)
+        self.assertEqual(unpacked.connected, snapshot.connected)
+
+    def test_record_and_read(self):
+        """Test that recorded snapshots, mode and enabled changes
+         are read back in order"""
+        recorder = recording.Recorder(self.file_name, clock=lambda: 1.5)
+        recorder.record_snapshot(make_snapshot(1.0, 1, 0.0, 0))
+        recorder.record_mode("teleop")
+        recorder.record_enabled(True)
+        recorder.record_snapshot(make_snapshot(2.0, 2, 0.5, 1))
+        recorder.record_snapshot(make_snapshot(2.5, 3, 0.75, 1))
+        recorder.close()
+
+        records = list(recording.read_records(self.file_name))
+        self.assertEqual([record[0] for record in records], [
+            recording.RECORD_KEYFRAME, recording.RECORD_MODE,
+            recording.RECORD_ENABLED, recording.RECORD_KEYFRAME,
+            recording.RECORD_SNAPSHOT])
+        self.assertEqual(records[1][1:], (1.5, "teleop"))
+        self.assertEqual(records[2][1:], (1.5, True))
+
+        mode, enabled, snapshot = records[3][2]
+        self.assertEqual((mode, enabled), ("teleop", True))
+        self.assertEqual(records[3][1], 2.0)
+        self.assertEqual(list(snapshot.axes[0]), [0.5, -1.0])
+        self.assertEqual(list(records[4][2].axes[0]), [0.75, -1.0])
+        self.assertEqual(recorder.dropped, 0)
+
+    def write_match(self, close=True):
+        """Record ten seconds of snapshots at 10 Hz, turning on
+         and off every two seconds"""
+        writer = recording.RecordingWriter(self.file_name)
+        enabled = False
+        for tick in range(100):
+            timestamp = 50.0 + tick / 10.0
+            if tick % 20 == 0:
+                enabled = not enabled
+                writer.write_record(recording.RECORD_ENABLED, timestamp,
+                                    b'\x01' if enabled else b'\x00')
+            snapshot = make_snapshot(timestamp, tick, tick / 100.0, 0)
+            if tick % 10 == 0:
+                writer.write_record(recording.RECORD_KEYFRAME, timestamp,
+                                    recording.pack_keyframe("teleop", enabled,
+                                                            snapshot))
+            else:
+                writer.write_record(recording.RECORD_SNAPSHOT, timestamp,
+                                    recording.pack_snapshot(snapshot))
+        if close:
+            writer.close()
+        else:
+            writer.flush()
+
+    def test_reader_index(self):
+        """Test that the reader finds keyframes through the index"""
+        self.write_match()
+
+        with recording.RecordingReader(self.file_name) as reader:
+            self.assertEqual(reader.start_time, 50.0)
+            self.assertAlmostEqual(reader.end_time, 59.9)
+            self.assertEqual(len(reader.keyframe_times), 10)
+            self.assertIsInstance(reader.keyframe_times, memoryview)
+
+            mode, enabled, snapshot = reader.state_at(54.35)
+            self.assertEqual(mode, "teleop")
+            self.assertTrue(enabled)
+            self.assertEqual(snapshot.sequence, 43)
+
+            times = [record[1] for record in reader.records(57.0, 57.2)
+                     if record[0] != recording.RECORD_ENABLED]
+            self.assertEqual(len(times), 3)
+            self.assertEqual(times[0], 57.0)
+
+    def test_truncated_recording(self):
+        """Test that a recording cut short is readable, its index
+         rebuilt and the partial record ignored"""
+        self.write_match(close=False)
+        with open(self.file_name, 'ab') as recording_file:
+            recording_file.write(recording.RECORD_HEADER.pack(
+                recording.RECORD_SNAPSHOT, 60.0, 100) + b'partial')
+
+        with recording.RecordingReader(self.file_name) as reader:
+            self.assertEqual(len(reader.keyframe_times), 10)
+            self.assertAlmostEqual(reader.end_time, 59.9)
+            self.assertTrue(reader.state_at(58.0)[1])
+
+        self.assertEqual(len(list(recording.read_records(self.file_name))),
+                         105)
+
+    def test_not_a_recording(self):
+        """Test that other files are rejected"""
+        with open(self.file_name, 'wb') as other_file:
+            other_file.write(b'[NetworkTables]\n')
+
+        with self.assertRaises(ValueError):
+            list(recording.read_records(self.file_name))
+
+    def test_replay(self):
+        """Test that replay returns snapshots at their original timing
+         and passes on mode and enabled changes"""
+        clock = unittest.mock.Mock(return_value=10.0)
+        recorder = recording.Recorder(self.file_name, clock=clock)
+        recorder.record_snapshot(make_snapshot(10.0, 1, 0.1, 0))
+        clock.return_value = 10.0625
+        recorder.record_enabled(True)
+        recorder.record_snapshot(make_snapshot(10.125, 2, 0.2, 0))
+        recorder.record_snapshot(make_snapshot(10.25, 3, 0.3, 0))
+        recorder.close()
+
+        on_enabled = unittest.mock.Mock()
+        replay_clock = unittest.mock.Mock(return_value=100.0)
+        replay = recording.ReplayJoysticks(self.file_name, speed=2.0,
+                                           on_enabled=on_enabled,
+                                           clock=replay_clock)
+
+        self.assertEqual(replay.snapshot().axes[0][0], 0.1)
+        on_enabled.assert_not_called()
+
+        # 1/16 second at double speed is 1/8 second of recording
+        replay_clock.return_value = 100.0625
+        snapshot = replay.snapshot()
+        self.assertEqual(snapshot.axes[0][0], 0.2)
+        self.assertEqual(snapshot.timestamp, 100.0625)
+        on_enabled.assert_called_once_with(True)
+        self.assertFalse(replay.finished)
+
+        replay_clock.return_value = 100.125
+        self.assertEqual(replay.get_joystick(0)["axes"], [0.2, -1.0])
+        replay.update()
+        self.assertEqual(replay.get_joystick(0)["axes"], [0.3, -1.0])
+        self.assertTrue(replay.finished)
+        replay.quit()
+
+    def test_robot_records(self):
+        """Test that mode and enabled of one robot are recorded
+         and replayed apart from whole-station changes"""
+        clock = unittest.mock.Mock(return_value=10.0)
+        recorder = recording.Recorder(self.file_name, clock=clock)
+        recorder.record_snapshot(make_snapshot(10.0, 1, 0.1, 0))
+        recorder.record_mode("teleop", "alpha")
+        recorder.record_enabled(True, "alpha")
+        recorder.close()
+
+        records = list(recording.read_records(self.file_name))
+        self.assertEqual([record[0] for record in records], [
+            recording.RECORD_KEYFRAME, recording.RECORD_ROBOT_MODE,
+            recording.RECORD_ROBOT_ENABLED])
+        self.assertEqual(records[1][2], ("alpha", "teleop"))
+        self.assertEqual(records[2][2], ("alpha", True))
+        # Whole-station state in keyframes is unchanged
+        self.assertEqual(records[0][2][:2], ("", False))
+
+        on_enabled = unittest.mock.Mock()
+        on_robot_enabled = unittest.mock.Mock()
+        on_robot_mode = unittest.mock.Mock()
+        replay = recording.ReplayJoysticks(
+            self.file_name, on_enabled=on_enabled,
+            clock=unittest.mock.Mock(return_value=100.0),
+            on_robot_mode=on_robot_mode, on_robot_enabled=on_robot_enabled)
+        replay.update()
+        on_robot_mode.assert_called_once_with("alpha", "teleop")
+        on_robot_enabled.assert_called_once_with("alpha", True)
+        on_enabled.assert_not_called()
+        replay.quit()
+
+    def test_replay_from_start_time(self):
+        """Test that replay can start part way through a recording"""
+        self.write_match()
+
+        on_enabled = unittest.mock.Mock()
+        on_mode = unittest.mock.Mock()
+        replay_clock = unittest.mock.Mock(return_value=0.0)
+        replay = recording.ReplayJoysticks(self.file_name, start=4.25,
+                                           on_mode=on_mode,
+                                           on_enabled=on_enabled,
+                                           clock=replay_clock)
+        on_mode.assert_not_called()
+        self.assertEqual(replay.snapshot().axes[0][0], 0.42)
+        on_mode.assert_called_once_with("teleop")
+        on_enabled.assert_called_once_with(True)
+
+        replay_clock.return_value = 2.0
+        replay.update()
+        on_enabled.assert_called_with(False)
+        self.assertEqual(replay.get_joystick(0)["axes"], [0.62, -1.0])
+        replay.quit()
@@ -0,0 +1,145 @@
+"""Test module for `safety_watchdog.py`"""
+
+import time
+import unittest
+import unittest.mock
+
+import control_loop
+import fleet
+import safety_watchdog
+
+
+class TestWatchdog(unittest.TestCase):
+    """Test class for `Watchdog`"""
+
+    def setUp(self):
+        self.now = 10.0
+        self.loop_mock = unittest.mock.Mock(last_tick_time=self.now,
+                                            missed_ticks=0)
+        self.display_state = control_loop.DisplayState(
+            True, 1, self.now, 2, {}, 2)
+        self.loop_mock.latest_display_state.side_effect = (
+            lambda: self.display_state)
+        self.network_mock = unittest.mock.Mock()
+        # A single robot `Network`, not a `RobotFleet`
+        del self.network_mock.robots
+        self.on_trip = unittest.mock.Mock()
+        self.watchdog = safety_watchdog.Watchdog(
+            self.loop_mock, self.network_mock, bound=0.2,
+            clock=lambda: self.now, on_trip=self.on_trip)
+
+    def assert_tripped(self, reason):
+        """Assert the robot was disabled and zeroed once for `reason`"""
+        self.network_mock.set_enabled.assert_called_once_with(False)
+        self.network_mock.zero_joysticks.assert_called_once_with()
+        self.assertEqual([trip.reason for trip in self.watchdog.trips],
+                         [reason])
+        self.on_trip.assert_called_once_with(self.watchdog.trips[0])
+
+    def test_stall(self):
+        """Test that a stalled control loop trips once, within bound"""
+        self.watchdog.check()
+        self.now += 0.14
+        self.watchdog.check()
+        self.network_mock.set_enabled.assert_not_called()
+
+        # The next check would be past the bound
+        self.now += 0.02
+        self.watchdog.check()
+        self.now += 0.05
+        self.watchdog.check()
+        self.assert_tripped(safety_watchdog.STALLED)
+        self.assertAlmostEqual(self.watchdog.trips[0].tick_age, 0.16)
+
+        # Ticking again rearms the watchdog
+        self.loop_mock.last_tick_time = self.now
+        self.watchdog.check()
+        self.now += 0.3
+        self.watchdog.check()
+        self.assertEqual(len(self.watchdog.trips), 2)
+
+    def test_network_lost(self):
+        """Test that losing the connection trips, not being without one"""
+        self.display_state.connected = False
+        self.watchdog.check()
+        self.network_mock.set_enabled.assert_not_called()
+
+        self.display_state.connected = True
+        self.watchdog.check()
+        self.display_state.connected = False
+        self.watchdog.check()
+        self.watchdog.check()
+        self.assert_tripped(safety_watchdog.NETWORK_LOST)
+
+    def test_fleet_robot_lost(self):
+        """Test that one robot of several losing its connection only
+         disables and zeroes that robot"""
+        links = {}
+        for name in ('alpha', 'bravo', 'charlie'):
+            network_mock = unittest.mock.Mock()
+            network_mock.connected.return_value = True
+            links[name] = fleet.RobotLink(name, network_mock)
+        robot_fleet = fleet.RobotFleet(links.values())
+        self.addCleanup(robot_fleet.shutdown)
+        robot_fleet.set_enabled(True)
+        watchdog = safety_watchdog.Watchdog(
+            self.loop_mock, robot_fleet, bound=0.2, clock=lambda: self.now,
+            on_trip=self.on_trip)
+        # The fleet isn't connected once any robot isn't
+        self.display_state.connected = False
+
+        watchdog.check()
+        links['bravo'].network.connected.return_value = False
+        watchdog.check()
+        watchdog.check()
+
+        self.assertEqual([(trip.reason, trip.robot) for trip in watchdog.trips],
+                         [(safety_watchdog.NETWORK_LOST, 'bravo')])
+        self.assertIn("network lost (bravo)", watchdog.format_trips())
+        self.assertFalse(links['bravo'].enabled)
+        links['bravo'].network.set_enabled.assert_called_with(False)
+        links['bravo'].network.zero_joysticks.assert_called_once_with()
+        for name in ('alpha', 'charlie'):
+            self.assertTrue(links[name].enabled)
+            links[name].network.set_enabled.assert_called_once_with(True)
+            links[name].network.zero_joysticks.assert_not_called()
+
+    def test_joystick_lost(self):
+        """Test that unplugging a joystick trips, plugging one in
+         doesn't"""
+        self.watchdog.check()
+        self.display_state.connected_joysticks = 3
+        self.watchdog.check()
+        self.network_mock.set_enabled.assert_not_called()
+
+        self.display_state.connected_joysticks = 2
+        self.watchdog.check()
+        self.watchdog.check()
+        self.assert_tripped(safety_watchdog.JOYSTICK_LOST)
+        self.assertIn("joystick disconnected", self.watchdog.format_trips())
+        self.assertEqual(
+            sorted(self.watchdog.trips[0].to_dict()),
+            ['missed_ticks', 'reaction', 'reason', 'robot', 'tick_age',
+             'time'])
+
+    def test_not_started(self):
+        """Test that nothing trips before the control loop's first tick"""
+        self.display_state = None
+        self.now += 10.0
+        self.watchdog.check()
+        self.network_mock.set_enabled.assert_not_called()
+        self.assertEqual(self.watchdog.format_trips(), "Watchdog trips: none")
+
+    def test_thread(self):
+        """Test that the watchdog thread trips on a stall"""
+        self.watchdog = safety_watchdog.Watchdog(
+            self.loop_mock, self.network_mock, bound=0.02)
+        self.loop_mock.last_tick_time = time.monotonic()
+        self.watchdog.start()
+        self.addCleanup(self.watchdog.stop)
+        give_up = time.monotonic() + 1.0
+        while not self.watchdog.trips and time.monotonic() < give_up:
+            time.sleep(0.005)
+        self.watchdog.stop()
+        self.assertEqual(self.watchdog.trips[0].reason,
+                         safety_watchdog.STALLED)
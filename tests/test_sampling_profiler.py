@@ -0,0 +1,93 @@
+"""Test module for `sampling_profiler.py`"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import sampling_profiler
+
+
+def _spin(stop_event):
+    """Busy thread for the profiler to find"""
+    while not stop_event.is_set():
+        sum(range(100))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test class for the sampling profiler"""
+
+    def test_phase_of(self):
+        """Test that stacks get the phase of their innermost driver
+         station frame"""
+        phase_of = sampling_profiler.phase_of
+        self.assertEqual(phase_of([
+            ('threading.py', 'wait'), ('control_loop.py', '_run')]), 'idle')
+        self.assertEqual(phase_of([
+            ('axis_processing.py', 'apply'), ('joysticks.py', '_process'),
+            ('joysticks.py', 'snapshot'), ('control_loop.py', 'tick'),
+            ('control_loop.py', '_run')]), 'process')
+        self.assertEqual(phase_of([
+            ('joysticks.py', 'snapshot'), ('control_loop.py', 'tick')]),
+                         'poll')
+        self.assertEqual(phase_of([
+            ('network.py', 'publish_snapshot'), ('control_loop.py', 'tick')]),
+                         'publish')
+        self.assertEqual(phase_of([
+            ('control_loop.py', 'latest_snapshot'),
+            ('driverstation_gui.py', 'update')]), 'ui')
+        self.assertEqual(phase_of([('threading.py', 'run')]), 'other')
+
+    def test_sample(self):
+        """Test that other threads' stacks are counted, outermost
+         frame first, and the caller's aren't"""
+        stop_event = threading.Event()
+        thread = threading.Thread(target=_spin, args=(stop_event,),
+                                  name="Spin Thread")
+        thread.start()
+        try:
+            profiler = sampling_profiler.SamplingProfiler()
+            for _ in range(5):
+                profiler.sample()
+        finally:
+            stop_event.set()
+            thread.join()
+
+        self.assertEqual(profiler.samples, 5)
+        spin_stacks = [stack for stack in profiler.stacks
+                       if stack.startswith("Spin_Thread;other;")]
+        self.assertTrue(spin_stacks)
+        for stack in spin_stacks:
+            frames = stack.split(';')
+            self.assertEqual(frames[2], "threading.py:_bootstrap")
+            self.assertIn("test_sampling_profiler.py:_spin", frames)
+        self.assertFalse([stack for stack in profiler.stacks
+                          if "test_sample" in stack])
+        self.assertEqual(profiler.phase_shares()["Spin_Thread"],
+                         {'other': 1.0})
+
+    def test_capture(self):
+        """Test that a capture ends after its window and writes one
+         collapsed stack line per stack"""
+        directory = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(directory, 'profile.folded')
+            profiler = sampling_profiler.SamplingProfiler(interval=0.001)
+            done = threading.Event()
+            self.assertTrue(profiler.capture(
+                file_name, 0.05, on_done=lambda name: done.set()))
+            self.assertFalse(profiler.capture(file_name, 0.05))
+            self.assertTrue(done.wait(5.0))
+            profiler.stop()
+            self.assertFalse(profiler.running)
+
+            with open(file_name) as profile_file:
+                lines = profile_file.read().splitlines()
+            self.assertTrue(lines)
+            self.assertEqual(sum(int(line.rsplit(' ', 1)[1])
+                                 for line in lines),
+                             sum(profiler.stacks.values()))
+            self.assertIn("samples", profiler.format_summary())
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,151 @@
+"""Test module for `shared_state.py`"""
+
+import multiprocessing
+import os
+import unittest
+from array import array
+
+import joysticks
+import shared_state
+
+SNAPSHOTS = 2000
+
+
+def make_snapshot(sequence):
+    """Returns a `JoystickSnapshot` of two joysticks, every value
+     derived from `sequence` so torn reads show"""
+    snapshot = joysticks.JoystickSnapshot()
+    snapshot.timestamp = sequence / 100.0
+    snapshot.sequence = sequence
+    snapshot.axes = [array('d', [sequence / SNAPSHOTS] * 4),
+                     array('d', [-sequence / SNAPSHOTS] * 2)]
+    snapshot.buttons = [sequence & 0xfff, 1]
+    snapshot.num_buttons = [12, 1]
+    snapshot.povs = [array('h', [sequence % 360]), array('h')]
+    snapshot.connected = [True, sequence % 2 == 0]
+    snapshot.guids = ['gamepad', 'flight']
+    return snapshot
+
+
+def read_until_last(name, results):
+    """Read joystick state `name` until the last snapshot, checking
+     each read is whole, then put reads and torn reads on `results`"""
+    reader = shared_state.SharedJoystickReader(name)
+    results.put('ready')
+    reads = 0
+    torn = 0
+    sequence = -1
+    while sequence < SNAPSHOTS:
+        try:
+            snapshot = reader.read()
+        except RuntimeError:
+            # Overtaken by the writer every attempt, try again
+            continue
+        if snapshot is None:
+            continue
+        sequence = snapshot.sequence
+        reads += 1
+        expected = make_snapshot(sequence)
+        if (snapshot.axes != expected.axes or
+                snapshot.buttons != expected.buttons or
+                snapshot.povs != expected.povs or
+                snapshot.connected != expected.connected or
+                snapshot.timestamp != expected.timestamp):
+            torn += 1
+    reader.close()
+    results.put((reads, torn))
+
+
+@unittest.skipIf(shared_state.shared_memory is None,
+                 "needs multiprocessing.shared_memory, Python 3.8+")
+class TestSharedState(unittest.TestCase):
+    """Test class for `SharedJoystickState` and `SharedJoystickReader`"""
+
+    def setUp(self):
+        self.name = 'pyds_test_{}_{}'.format(os.getpid(), id(self))
+        self.state = shared_state.SharedJoystickState(self.name, num_slots=4)
+        self.addCleanup(self.state.close)
+
+    def test_round_trip(self):
+        """Test that the latest snapshot is read back as written"""
+        reader = shared_state.SharedJoystickReader(self.name)
+        self.addCleanup(reader.close)
+        self.assertIsNone(reader.read())
+
+        for sequence in range(1, 11):
+            self.state.write(make_snapshot(sequence))
+        self.assertEqual(reader.write_count, 10)
+        snapshot = reader.read()
+        expected = make_snapshot(10)
+        for name in joysticks.JoystickSnapshot.__slots__:
+            self.assertEqual(getattr(snapshot, name), getattr(expected, name),
+                             name)
+
+        # Fewer joysticks next time
+        expected.axes.pop()
+        self.state.write(expected)
+        self.assertEqual(len(reader.read().axes), 1)
+
+    def test_limits(self):
+        """Test that joysticks, axes and buttons past WPILib's limits
+         are left out"""
+        snapshot = make_snapshot(1)
+        snapshot.axes = [array('d', [0.5] * 20)] * 8
+        snapshot.buttons = [(1 << 70) - 1] * 8
+        snapshot.num_buttons = [70] * 8
+        snapshot.povs = [array('h')] * 8
+        snapshot.guids = ['x' * 40] * 8
+        snapshot.connected = [True] * 8
+        self.state.write(snapshot)
+
+        reader = shared_state.SharedJoystickReader(self.name)
+        self.addCleanup(reader.close)
+        read = reader.read()
+        self.assertEqual(len(read.axes), shared_state.MAX_JOYSTICKS)
+        self.assertEqual(len(read.axes[0]), shared_state.MAX_AXES)
+        self.assertEqual(read.buttons[0], (1 << 64) - 1)
+        self.assertEqual(read.guids[0], 'x' * shared_state.GUID_SIZE)
+
+    def test_slot_being_written(self):
+        """Test that a slot mid-write isn't read"""
+        self.state.write(make_snapshot(1))
+        reader = shared_state.SharedJoystickReader(self.name)
+        self.addCleanup(reader.close)
+        slot = shared_state.SLOTS_OFFSET + shared_state.SLOT_SIZE
+        # pylint: disable=protected-access
+        shared_state.SLOT_SEQUENCE.pack_into(self.state._buf, slot, 1)
+        with self.assertRaises(RuntimeError):
+            reader.read()
+        self.assertEqual(reader.retries, shared_state.READ_ATTEMPTS)
+
+    def test_wrong_block(self):
+        """Test that other shared memory isn't read as joystick state"""
+        # pylint: disable=protected-access
+        self.state._buf[0:4] = b'NOPE'
+        with self.assertRaises(ValueError):
+            shared_state.SharedJoystickReader(self.name)
+
+    def test_close_twice(self):
+        """Test that closing again, as quitting the GUI does, is fine"""
+        reader = shared_state.SharedJoystickReader(self.name)
+        reader.close()
+        reader.close()
+        self.state.close()
+        self.state.close()
+
+    def test_other_process(self):
+        """Test that another process reads every snapshot whole while
+         they're written as fast as possible"""
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        reader = context.Process(target=read_until_last,
+                                 args=(self.name, results))
+        reader.start()
+        self.addCleanup(reader.join, 5.0)
+        self.assertEqual(results.get(timeout=10.0), 'ready')
+
+        for sequence in range(1, SNAPSHOTS + 1):
+            self.state.write(make_snapshot(sequence))
+        reads, torn = results.get(timeout=10.0)
+        self.assertGreater(reads, 0)
+        self.assertEqual(torn, 0)
@@ -0,0 +1,63 @@
+"""Test module for `ui_refresh.py`"""
+
+import unittest
+import unittest.mock
+
+import ui_refresh
+
+
+class TestRefreshPipeline(unittest.TestCase):
+    """Test class for `RefreshPipeline`"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.pipeline = ui_refresh.RefreshPipeline(
+            max_rate=30, clock=lambda: self.now)
+        self.label = unittest.mock.Mock()
+        self.indicator = unittest.mock.Mock()
+        self.pipeline.bind('label', self.label, "")
+        self.pipeline.bind('indicator', self.indicator, False)
+
+    def test_coalesced(self):
+        """Test that only the latest value is applied, once"""
+        for value in range(100):
+            self.pipeline.set('label', str(value))
+        self.assertEqual(self.pipeline.dirty, {'label'})
+        self.assertEqual(self.pipeline.refresh(), 1)
+        self.label.assert_called_once_with("99")
+        self.indicator.assert_not_called()
+        self.assertEqual(self.pipeline.dirty, set())
+
+    def test_unchanged_skipped(self):
+        """Test that widgets aren't touched for unchanged values, or
+         values changed back before they were shown"""
+        self.pipeline.set('indicator', False)
+        self.pipeline.set('label', "x")
+        self.pipeline.set('label', "")
+        self.assertEqual(self.pipeline.refresh(), 0)
+
+        self.pipeline.set('indicator', True)
+        self.pipeline.refresh()
+        self.now += 1.0
+        self.pipeline.set('indicator', True)
+        self.assertEqual(self.pipeline.refresh(), 0)
+        self.indicator.assert_called_once_with(True)
+        self.assertEqual(self.pipeline.applied_count, 1)
+
+    def test_rate_capped(self):
+        """Test that refreshes closer together than the display rate
+         wait for the next one"""
+        self.pipeline.set('label', "a")
+        self.pipeline.refresh()
+        self.now += 0.01
+        self.pipeline.set('label', "b")
+        self.assertEqual(self.pipeline.refresh(), 0)
+        self.assertEqual(self.pipeline.refresh(force=True), 1)
+
+        self.pipeline.set('label', "c")
+        self.now += 0.02
+        self.assertEqual(self.pipeline.refresh(), 0)
+        self.now += 0.02
+        self.assertEqual(self.pipeline.refresh(), 1)
+        self.assertEqual(self.label.call_args_list,
+                         [unittest.mock.call(value) for value in "abc"])
@@ -0,0 +1,81 @@
+"""Coalesced refreshing of GUI widgets
+
+Widgets are bound to named values. Values can be set any number of
+ times between refreshes, each refresh only touches widgets whose value
+ changed since the last one, with the latest value. Refreshes are
+ capped at `RefreshPipeline.max_rate`, so GUI cost stays bounded however
+ fast the control loop runs.
+
+Nothing here needs Qt, widget setters are passed in.
+"""
+
+import time
+
+# Refreshes per second, about as often as anyone can read them
+DISPLAY_RATE = 30
+
+
+class RefreshPipeline:
+    """Named values bound to widget setters, applied at display rate"""
+
+    def __init__(self, max_rate=DISPLAY_RATE, clock=time.monotonic):
+        self.max_rate = max_rate
+        self.min_interval = 1.0 / max_rate
+        self._clock = clock
+
+        # Setter of each value
+        self._setters = {}
+        # Value each widget was last set to
+        self._applied = {}
+        # Latest value of each value changed since the last refresh
+        self._dirty = {}
+        self._last_refresh = None
+
+        # Widget updates made, for diagnostics
+        self.applied_count = 0
+
+    def bind(self, name: str, setter, initial=None):
+        """Call `setter` with value `name` when it changes, the widget is
+         taken to show `initial` to begin with"""
+        self._setters[name] = setter
+        self._applied[name] = initial
+
+    def set(self, name: str, value):
+        """Set value `name`, shown by the next refresh if it changed"""
+        if value == self._applied[name]:
+            # Changed back before it was shown
+            self._dirty.pop(name, None)
+        else:
+            self._dirty[name] = value
+
+    def set_many(self, values: dict):
+        """Set several values at once"""
+        for name, value in values.items():
+            self.set(name, value)
+
+    @property
+    def dirty(self) -> set:
+        """Names of values changed since the last refresh"""
+        return set(self._dirty)
+
+    def refresh(self, force=False) -> int:
+        """Update widgets whose value changed, unless the last refresh
+         was under `min_interval` ago, returns widgets updated
+
+        `force` - `bool`: Refresh even if the last refresh was recent
+        """
+        if not self._dirty:
+            return 0
+        now = self._clock()
+        if (not force and self._last_refresh is not None and
+                now - self._last_refresh < self.min_interval):
+            return 0
+        self._last_refresh = now
+
+        dirty = self._dirty
+        self._dirty = {}
+        for name, value in dirty.items():
+            self._setters[name](value)
+            self._applied[name] = value
+        self.applied_count += len(dirty)
+        return len(dirty)